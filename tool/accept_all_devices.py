@@ -16,11 +16,15 @@
 import os
 import logging
 import mender
-import threading
+
+from mender import bulk
 
 username = os.getenv("USERNAME")
 password = os.getenv("PASSWORD")
 base_url = os.getenv("URL")
+workers = int(os.getenv("ACCEPT_WORKERS", "16"))
+rate = float(os.getenv("ACCEPT_RATE", "0")) or None
+retries = int(os.getenv("ACCEPT_RETRIES", "0"))
 
 logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
 logging.basicConfig(format=logs_format, level=logging.INFO)
@@ -39,18 +43,9 @@ if __name__ == "__main__":
     )
 
     mender.authenticate(email=username, password=password, server_url=base_url)
-    while True:
-        devices = mender.dev_auth.get_devices(status="pending", per_page=50)
-        if len(devices) == 0:
-            break
-        threads = []
-        for device in devices:
-            thread = threading.Thread(
-                target=mender.dev_auth.accept_devices, args=([device],)
-            )
-            thread.start()
-            threads.append(thread)
-        for thread in threads:
-            thread.join()
+    report = bulk.BulkAccept(
+        mender.dev_auth, workers=workers, rate=rate, retries=retries
+    ).run()
+    report.log()
 
     log.info("Finished accepting devices")
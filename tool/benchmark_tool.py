@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import configargparse
+import logging
+
+from mender import benchmark
+
+
+def parse_config():
+    parser = configargparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        type=str,
+        required=False,
+        default=",".join(str(_size) for _size in benchmark.DEFAULT_SIZES),
+        env_var="BENCHMARK_SIZES",
+        help="Comma separated fleet sizes",
+    )
+    parser.add_argument(
+        "--cases",
+        type=str,
+        required=False,
+        default=",".join(benchmark.CASES),
+        env_var="BENCHMARK_CASES",
+        help="Comma separated operations to benchmark",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        required=False,
+        default=1,
+        env_var="BENCHMARK_REPEAT",
+        help="Runs of every operation, the fastest one is kept",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        required=False,
+        default=0,
+        env_var="BENCHMARK_LATENCY",
+        help="Milliseconds added by the mock server to every call",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        required=False,
+        default=0,
+        env_var="BENCHMARK_ERROR_RATE",
+        help="Share of the calls failing on the mock server, from 0 to 1",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        required=False,
+        default=1800,
+        env_var="BENCHMARK_TIMEOUT",
+        help="Max seconds of one operation",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=False,
+        default="benchmark.json",
+        env_var="BENCHMARK_OUTPUT",
+        help="JSON file the results are saved to",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        required=False,
+        default=None,
+        env_var="BENCHMARK_BASELINE",
+        help="JSON file of an earlier run to compare the results with",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        required=False,
+        default=0.2,
+        env_var="BENCHMARK_TOLERANCE",
+        help="Accepted relative change compared to the baseline",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    conf = parse_config()
+
+    logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+    logging.basicConfig(format=logs_format, level=logging.INFO)
+    log = logging.getLogger()
+
+    bench = benchmark.Benchmark(
+        sizes=tuple(int(_size) for _size in conf.sizes.split(",")),
+        cases=conf.cases.split(","),
+        repeat=conf.repeat,
+        latency=conf.latency / 1000,
+        error_rate=conf.error_rate,
+        timeout=conf.timeout,
+    )
+    results = bench.run()
+    bench.save(conf.output)
+    log.info("Results saved to %s" % conf.output)
+
+    failed = [_result for _result in results if not _result["ok"]]
+    regressions = []
+    if conf.baseline:
+        regressions = benchmark.compare(
+            results, benchmark.load_results(conf.baseline), conf.tolerance
+        )
+        for regression in regressions:
+            log.error("Regression: %s" % regression)
+        if not regressions:
+            log.info("No regression compared to %s" % conf.baseline)
+    if failed or regressions:
+        exit(1)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+import logging
+import time
+
+import configargparse
+
+from mender import identity
+from mender import keystore
+
+
+logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+logging.basicConfig(format=logs_format, level=logging.INFO)
+log = logging.getLogger()
+
+
+def get_config():
+    parser = configargparse.ArgumentParser()
+    parser.add_argument(
+        "key_sets",
+        nargs="+",
+        help="Archives (.tgz) or directories with the keys, one per instance.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=True,
+        help="Key store file to write.",
+        env_var="KEYSTORE",
+    )
+    parser.add_argument(
+        "--start-count",
+        type=int,
+        required=False,
+        default=0,
+        help="Sequence number of the instance of the first key set.",
+        env_var="START_COUNT",
+    )
+    parser.add_argument(
+        "--keys-per-archive",
+        type=int,
+        required=False,
+        default=identity.DEVICES_PER_INSTANCE,
+        help="Number of keys in every key set.",
+        env_var="DEVICES_PER_INSTANCE",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    conf = get_config()
+    key_sets = sorted(conf.key_sets, key=keystore.natural_sort_key)
+    first_index = conf.start_count * conf.keys_per_archive
+    start = time.time()
+    count = keystore.convert_key_sets(
+        key_sets,
+        conf.output,
+        first_index=first_index,
+        keys_per_set=conf.keys_per_archive,
+    )
+    log.info(
+        "Key store '%s' written with the keys of devices %d..%d in %.1f sec"
+        % (conf.output, first_index, first_index + count, time.time() - start)
+    )
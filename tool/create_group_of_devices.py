@@ -17,10 +17,12 @@ import configargparse
 import logging
 import random
 
-from math import ceil
+from itertools import islice
 
 import mender
 
+from mender import ratelimit
+
 
 devices_requested_pr_page = 500
 
@@ -55,6 +57,22 @@ def parse_config():
         env_var="GROUP_NAME",
         help="Group name",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        required=False,
+        default=1000,
+        env_var="BATCH_SIZE",
+        help="Devices added to the group per API call",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        required=False,
+        default=4,
+        env_var="CONCURRENCY",
+        help="API calls running at the same time",
+    )
     parser.add_argument(
         "--debug",
         type=bool,
@@ -63,22 +81,22 @@ def parse_config():
         env_var="DEBUG",
         help="Enables debug logging",
     )
+    ratelimit.add_arguments(parser)
     return parser.parse_args()
 
 
 # get all ungrouped devices
 def get_ungrouped_devices(wanted_devices_in_group):
-    pages = ceil(wanted_devices_in_group / devices_requested_pr_page)
-    _devices = []
-    for page in range(1, pages + 1):
-        _result = mender.inventory.get_devices(
-            page=page, per_page=devices_requested_pr_page, has_group=False
+    # stop requesting pages as soon as there are enough devices
+    _devices = [
+        _device["id"]
+        for _device in islice(
+            mender.inventory.iter_devices(
+                has_group=False, per_page=devices_requested_pr_page, fields=("id",)
+            ),
+            wanted_devices_in_group,
         )
-        for _device in _result:
-            if len(_devices) < wanted_devices_in_group:
-                _devices.append(_device["id"])
-            else:
-                break
+    ]
     # check if it's enough ungrouped devices to create a group with requested amount of devices in it
     if len(_devices) < wanted_devices_in_group:
         log.error(
@@ -90,11 +108,16 @@ def get_ungrouped_devices(wanted_devices_in_group):
 
 
 # add devices into a group
-def add_devices_to_group(devices, group_name):
-    for device in devices:
-        mender.inventory.add_device_to_group(device, group_name)
-
-    log.info("'%s' devices added to group '%s'" % (len(devices), group_name))
+def add_devices_to_group(devices, group_name, batch_size, concurrency):
+    report = mender.inventory.add_devices_to_group(
+        group_name, devices, batch_size=batch_size, concurrency=concurrency
+    )
+    report.log()
+    log.info(
+        "'%s' devices added to group '%s' (%.1f devices/sec)"
+        % (report.done, group_name, report.throughput)
+    )
+    return report.failed == 0
 
 
 if __name__ == "__main__":
@@ -118,6 +141,8 @@ if __name__ == "__main__":
         logging.basicConfig(format=logs_format, level=logging.INFO)
     log = logging.getLogger()
 
+    ratelimit.configure_from_args(conf)
+
     # authenticate on the server
     mender.authenticate(email=username, password=password, server_url=url)
 
@@ -127,4 +152,5 @@ if __name__ == "__main__":
         exit(1)
 
     # add devices to a group
-    add_devices_to_group(devices, group_name)
+    if not add_devices_to_group(devices, group_name, conf.batch_size, conf.concurrency):
+        exit(1)
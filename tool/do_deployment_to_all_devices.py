@@ -15,11 +15,11 @@
 
 import logging
 import os
-import requests
-import time
 
 from random import randint
 
+import mender
+
 
 username = os.getenv("USERNAME")
 password = os.getenv("PASSWORD")
@@ -45,63 +45,31 @@ if username is None or password is None or base_url is None:
 log.info("Starting creating deployment. USERNAME='%s', URL='%s'" % (username, base_url))
 log.debug("trying to login.")
 
-r = requests.post(
-    "%s/api/management/v1/useradm/auth/login" % base_url,
-    auth=(username, password),
-    verify=False,
-)
-if r.status_code != 200:
-    log.error("failed to login with %s:%s", username, password)
+mender.authenticate(email=username, password=password, server_url=base_url)
+if mender.user_adm.get_auth_header() is None:
+    log.error("failed to login with %s", username)
     exit(1)
-token = r.text
-
-devices = []
 
 log.debug("getting devices list...")
-page = 1
-while True:
-    start = time.time()
-    url = (
-        "%s/api/management/v2/devauth/devices?status=accepted&per_page=500&page=%s"
-        % (base_url, page)
+fetcher = mender.dev_auth.device_fetcher(status="accepted", strict=False)
+# only the ids are kept, not the whole device documents
+devices = [device["id"] for page in fetcher for device in page]
+if fetcher.failed_pages or not fetcher.consistent:
+    log.error(
+        "Failed to list all the accepted devices: fetched %s of %s, failed pages %s"
+        % (fetcher.fetched, fetcher.final_count, fetcher.failed_pages)
     )
-    r = requests.get(url, headers={"Authorization": "Bearer " + token}, verify=False)
-
-    if r.status_code != 200:
-        print("Error: status code: %s, page: %s" % (r.status_code, page))
-        exit(1)
-
-    if len(r.json()) == 0:
-        break
-
-    for e in r.json():
-        devices.append(e["id"])
-
-    end = time.time()
-    log.debug("page: %s time: %s sec" % (page, round(end - start, 2)))
-    page += 1
+    exit(1)
 
 log.debug("Accepted devices count: %s" % len(devices))
 
-deployment = {
-    "artifact_name": artifact_name,
-    "name": deployment_name,
-    "devices": devices,
-}
-
-url = "%s/api/management/v1/deployments/deployments" % base_url
-r = requests.post(
-    url, headers={"Authorization": "Bearer " + token}, json=deployment, verify=False
-)
+r = mender.deployments.create_deployment(deployment_name, artifact_name, devices)
 
-if r.status_code == 201:
+if r is not None:
     log.info(
         "Deployment successfully created: devices qty - %s, name - %s"
         % (len(devices), deployment_name)
     )
 else:
-    log.error(
-        "Failed to create deployment. Status code: %s. Content: %s"
-        % (r.status_code, r.text)
-    )
+    log.error("Failed to create deployment.")
     exit(1)
@@ -15,10 +15,11 @@
 
 import logging
 import os
-import requests
 
 from random import randint
 
+import mender
+
 
 username = os.getenv("USERNAME")
 password = os.getenv("PASSWORD")
@@ -47,37 +48,20 @@ if username is None or password is None or base_url is None or group_name is Non
 log.info("Starting creating deployment. USERNAME='%s', URL='%s'" % (username, base_url))
 log.debug("trying to login.")
 
-r = requests.post(
-    "%s/api/management/v1/useradm/auth/login" % base_url,
-    auth=(username, password),
-    verify=False,
-)
-if r.status_code != 200:
-    log.error("failed to login with %s:%s", username, password)
+mender.authenticate(email=username, password=password, server_url=base_url)
+if mender.user_adm.get_auth_header() is None:
+    log.error("failed to login with %s", username)
     exit(1)
-token = r.text
-
-devices = []
 
-deployment = {
-    "artifact_name": artifact_name,
-    "name": deployment_name,
-    "group": group_name,
-}
-
-url = "%s/api/management/v1/deployments/deployments/group/%s" % (base_url, group_name)
-r = requests.post(
-    url, headers={"Authorization": "Bearer " + token}, json=deployment, verify=False
+r = mender.deployments.create_deployment_for_group(
+    deployment_name, artifact_name, group_name
 )
 
-if r.status_code == 201:
+if r is not None:
     log.info(
         "Deployment successfully created: group - %s, name - %s"
         % (group_name, deployment_name)
     )
 else:
-    log.error(
-        "Failed to create deployment. Status code: %s. Content: %s"
-        % (r.status_code, r.text)
-    )
+    log.error("Failed to create deployment.")
     exit(1)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import configargparse
+import logging
+
+from mender import gui
+from mender import ratelimit
+
+
+def parse_config():
+    parser = configargparse.ArgumentParser()
+    parser.add_argument(
+        "--username", type=str, required=True, env_var="USERNAME", help="Username"
+    )
+    parser.add_argument(
+        "--password", type=str, required=True, env_var="PASSWORD", help="Password"
+    )
+    parser.add_argument(
+        "--url",
+        type=str,
+        required=True,
+        env_var="URL",
+        help="URL of the Mender server",
+    )
+    parser.add_argument(
+        "--users",
+        type=int,
+        required=False,
+        default=10,
+        env_var="GUI_USERS",
+        help="Number of users browsing the devices at the same time",
+    )
+    parser.add_argument(
+        "--duration",
+        type=int,
+        required=False,
+        default=300,
+        env_var="GUI_DURATION",
+        help="Seconds every user browses the devices",
+    )
+    parser.add_argument(
+        "--think-min",
+        type=float,
+        required=False,
+        default=2,
+        env_var="GUI_THINK_MIN",
+        help="Min seconds between two actions of a user",
+    )
+    parser.add_argument(
+        "--think-max",
+        type=float,
+        required=False,
+        default=10,
+        env_var="GUI_THINK_MAX",
+        help="Max seconds between two actions of a user",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        required=False,
+        default=50,
+        env_var="GUI_PAGE_SIZE",
+        help="Devices per page when the users open the devices list",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        required=False,
+        default=None,
+        env_var="GUI_SEED",
+        help="Seed of the random actions, to replay the same ones",
+    )
+    ratelimit.add_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    conf = parse_config()
+    ratelimit.configure_from_args(conf)
+
+    logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+    logging.basicConfig(format=logs_format, level=logging.INFO)
+
+    gui.GuiEmulator(
+        conf.username,
+        conf.password,
+        conf.url,
+        users=conf.users,
+        page_size=conf.page_size,
+        think_time=(conf.think_min, conf.think_max),
+        seed=conf.seed,
+    ).run(duration=conf.duration)
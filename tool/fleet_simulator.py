@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+import asyncio
+import logging
+
+import configargparse
+
+from mender import identity
+from mender import sharding
+from mender import simulator
+from mender import stats
+from mender.aio import common
+
+
+logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+logging.basicConfig(format=logs_format, level=logging.INFO)
+log = logging.getLogger()
+
+
+def get_config():
+    parser = configargparse.ArgumentParser()
+    parser.add_argument(
+        "--server-url",
+        type=str,
+        required=True,
+        help="Mender backend URL.",
+        env_var="MENDER_SERVER_URL",
+    )
+    parser.add_argument(
+        "--tenant-key",
+        type=str,
+        required=False,
+        default=None,
+        help="Mender tenant key.",
+        env_var="TENANT_KEY",
+    )
+    parser.add_argument(
+        "--devices-qty",
+        type=int,
+        required=False,
+        default=1000,
+        help="Number of devices to simulate.",
+        env_var="DEVICES_QTY",
+    )
+    parser.add_argument(
+        "--start-count",
+        type=int,
+        required=False,
+        default=0,
+        help="Sequence number of the first instance of stress clients replaced.",
+        env_var="START_COUNT",
+    )
+    parser.add_argument(
+        "--devices-per-instance",
+        type=int,
+        required=False,
+        default=identity.DEVICES_PER_INSTANCE,
+        help="Number of device identities reserved for each instance.",
+        env_var="DEVICES_PER_INSTANCE",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        required=False,
+        default=1,
+        help="Number of processes sharing the devices, 0 for one per CPU core.",
+        env_var="SIMULATOR_PROCESSES",
+    )
+    parser.add_argument(
+        "--stress-test-client-startup-interval",
+        type=int,
+        required=False,
+        default=1750000,
+        help="Time in milliseconds over which the devices are started.",
+        env_var="STRESS_TEST_CLIENT_STARTUP_INTERVAL",
+    )
+    parser.add_argument(
+        "--stress-test-client-inventory-freq",
+        type=int,
+        required=False,
+        default=28800,
+        help="Inventory update interval.",
+        env_var="STRESS_TEST_CLIENT_INVENTORY_FREQ",
+    )
+    parser.add_argument(
+        "--stress-test-client-poll-interval-freq",
+        type=int,
+        required=False,
+        default=1800,
+        help="Poll interval.",
+        env_var="STRESS_TEST_CLIENT_POLL_INTERVAL_FREQ",
+    )
+    parser.add_argument(
+        "--wait",
+        type=int,
+        required=False,
+        default=30,
+        help="Max seconds between the steps of a deployment.",
+        env_var="STRESS_TEST_CLIENT_WAIT",
+    )
+    parser.add_argument(
+        "--current-artifact",
+        type=str,
+        required=False,
+        default="base-image-1019",
+        help="Artifact installed on the devices at start.",
+        env_var="STRESS_TEST_CLIENT_CURRENT_ARTIFACT",
+    )
+    parser.add_argument(
+        "--current-device",
+        type=str,
+        required=False,
+        default="cl-som-imx8",
+        help="Device type.",
+        env_var="STRESS_TEST_CLIENT_CURRENT_DEVICE",
+    )
+    parser.add_argument(
+        "--inventory",
+        type=str,
+        required=False,
+        default="device_type:cl-som-imx8,image_id:base-image-1019",
+        help="Inventory attributes, as 'name:value' separated by commas.",
+        env_var="STRESS_TEST_CLIENT_INVENTORY",
+    )
+    parser.add_argument(
+        "--auth-retry-interval",
+        type=int,
+        required=False,
+        default=60,
+        help="Seconds between auth requests while a device is not accepted.",
+        env_var="AUTH_RETRY_INTERVAL",
+    )
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        required=False,
+        default=0.0,
+        help="Share (0..1) of deployments reported as failed.",
+        env_var="FAILURE_RATE",
+    )
+    parser.add_argument(
+        "--keys-dir",
+        type=str,
+        required=False,
+        default=None,
+        help="Directory with one private key per device, generated if not set.",
+        env_var="KEYS_DIR",
+    )
+    parser.add_argument(
+        "--identity-fields",
+        type=str,
+        required=False,
+        default=",".join(identity.DEFAULT_FIELDS),
+        help="Identity attributes of the devices, among mac, sku and sn.",
+        env_var="IDENTITY_FIELDS",
+    )
+    parser.add_argument(
+        "--identity-sku",
+        type=str,
+        required=False,
+        default=identity.DEFAULT_SKU,
+        help="Value of the sku identity attribute.",
+        env_var="IDENTITY_SKU",
+    )
+    parser.add_argument(
+        "--identity-layout",
+        type=str,
+        required=False,
+        default="sequential",
+        choices=identity.LAYOUTS,
+        help="MAC addresses and groups of the devices, see the predefined filters.",
+        env_var="IDENTITY_LAYOUT",
+    )
+    parser.add_argument(
+        "--keystore",
+        type=str,
+        required=False,
+        default=None,
+        help="Key store file with the private keys of the devices.",
+        env_var="KEYSTORE",
+    )
+    parser.add_argument(
+        "--key-bits",
+        type=int,
+        required=False,
+        default=2048,
+        help="Size of the generated RSA keys.",
+        env_var="KEY_BITS",
+    )
+    parser.add_argument(
+        "--duration",
+        type=int,
+        required=False,
+        default=0,
+        help="Seconds to run the devices for, 0 runs them until interrupted.",
+        env_var="DURATION",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        required=False,
+        default=common.concurrency,
+        help="Max number of calls in flight.",
+        env_var="MENDER_AIO_CONCURRENCY",
+    )
+    return parser.parse_args()
+
+
+def get_fleet_options(conf):
+    return dict(
+        server_url=conf.server_url,
+        tenant_token=conf.tenant_key,
+        startup_interval=conf.stress_test_client_startup_interval / 1000.0,
+        keys_path=conf.keystore or conf.keys_dir,
+        identity_fields=identity.parse_fields(conf.identity_fields),
+        identity_sku=conf.identity_sku,
+        layout=identity.get_layout(conf.identity_layout, conf.devices_per_instance),
+        key_bits=conf.key_bits,
+        artifact_name=conf.current_artifact,
+        device_type=conf.current_device,
+        inventory=simulator.parse_inventory(conf.inventory),
+        poll_interval=conf.stress_test_client_poll_interval_freq,
+        inventory_interval=conf.stress_test_client_inventory_freq,
+        wait=conf.wait,
+        auth_retry=conf.auth_retry_interval,
+        failure_rate=conf.failure_rate,
+    )
+
+
+async def run_fleet(conf, start_index):
+    fleet = simulator.Fleet(
+        count=conf.devices_qty, start_index=start_index, **get_fleet_options(conf)
+    )
+    await fleet.run(duration=conf.duration or None)
+    log.info("Devices states at the end: %s" % fleet.states())
+
+
+def run_sharded_fleet(conf, start_index):
+    fleet = sharding.ShardedFleet(
+        start_index,
+        conf.devices_qty,
+        processes=conf.processes or None,
+        **get_fleet_options(conf)
+    )
+    stats.statistics.merge(fleet.run(duration=conf.duration or None))
+
+
+if __name__ == "__main__":
+    conf = get_config()
+    common.set_concurrency(conf.concurrency)
+    # the same identities as the stress clients started by stress-clients-manager.py
+    # with the same --start-count
+    start_index = conf.start_count * conf.devices_per_instance
+    log.info(
+        "Starting %d devices from index %d against '%s'"
+        % (conf.devices_qty, start_index, conf.server_url)
+    )
+    try:
+        if conf.processes == 1:
+            asyncio.run(run_fleet(conf, start_index))
+        else:
+            run_sharded_fleet(conf, start_index)
+    except KeyboardInterrupt:
+        log.info("Interrupted")
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import json
+import logging
+
+import configargparse
+
+from mender import forecast
+from mender import stats
+from mender.scenario import Scenario
+
+
+logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+logging.basicConfig(format=logs_format, level=logging.INFO)
+log = logging.getLogger()
+
+
+def get_config():
+    parser = configargparse.ArgumentParser()
+    parser.add_argument(
+        "--devices-qty",
+        type=int,
+        required=False,
+        default=1000,
+        help="Number of devices of the fleet.",
+        env_var="DEVICES_QTY",
+    )
+    parser.add_argument(
+        "--scenario",
+        type=str,
+        required=False,
+        default=None,
+        help="Scenario file, its [clients] options and the devices of all its "
+        "steps replace the ones given here.",
+        env_var="SCENARIO",
+    )
+    parser.add_argument(
+        "--stress-test-client-startup-interval",
+        type=int,
+        required=False,
+        default=1750000,
+        help="Time in milliseconds over which the devices are started.",
+        env_var="STRESS_TEST_CLIENT_STARTUP_INTERVAL",
+    )
+    parser.add_argument(
+        "--stress-test-client-inventory-freq",
+        type=int,
+        required=False,
+        default=28800,
+        help="Inventory update interval.",
+        env_var="STRESS_TEST_CLIENT_INVENTORY_FREQ",
+    )
+    parser.add_argument(
+        "--stress-test-client-poll-interval-freq",
+        type=int,
+        required=False,
+        default=1800,
+        help="Poll interval.",
+        env_var="STRESS_TEST_CLIENT_POLL_INTERVAL_FREQ",
+    )
+    parser.add_argument(
+        "--wait",
+        type=int,
+        required=False,
+        default=30,
+        help="Max seconds between the steps of a deployment.",
+        env_var="STRESS_TEST_CLIENT_WAIT",
+    )
+    parser.add_argument(
+        "--token-lifetime",
+        type=int,
+        required=False,
+        default=forecast.DEFAULT_TOKEN_LIFETIME,
+        help="Seconds the device tokens are valid.",
+        env_var="TOKEN_LIFETIME",
+    )
+    parser.add_argument(
+        "--auth-retry-interval",
+        type=int,
+        required=False,
+        default=60,
+        help="Seconds between the auth requests of a pending device.",
+        env_var="AUTH_RETRY_INTERVAL",
+    )
+    parser.add_argument(
+        "--accept-delay",
+        type=float,
+        required=False,
+        default=0,
+        help="Seconds the devices stay pending, 0 when they are preauthorized.",
+        env_var="ACCEPT_DELAY",
+    )
+    parser.add_argument(
+        "--deployment-devices",
+        type=int,
+        required=False,
+        default=0,
+        help="Number of devices targeted by a deployment, 0 for none.",
+        env_var="DEPLOYMENT_DEVICES",
+    )
+    parser.add_argument(
+        "--deployment-start",
+        type=float,
+        required=False,
+        default=None,
+        help="Seconds after the start of the fleet the deployment is created, "
+        "defaults to once all the devices have started.",
+        env_var="DEPLOYMENT_START",
+    )
+    parser.add_argument(
+        "--window",
+        type=float,
+        required=False,
+        default=1,
+        help="Seconds over which the peak rates are measured.",
+        env_var="FORECAST_WINDOW",
+    )
+    parser.add_argument(
+        "--stats",
+        type=str,
+        required=False,
+        default=None,
+        help="Statistics file of a run (MENDER_STATS_FILE) to compare with.",
+        env_var="FORECAST_STATS",
+    )
+    parser.add_argument(
+        "--offset",
+        type=float,
+        required=False,
+        default=0,
+        help="Seconds between the start of the statistics and the start of "
+        "the fleet.",
+        env_var="FORECAST_OFFSET",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        required=False,
+        default=0.1,
+        help="Accepted shortfall of the measured calls, e.g. 0.1 for 10%%.",
+        env_var="FORECAST_TOLERANCE",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=False,
+        default=None,
+        help="File the forecast (and the comparison) is saved to, as JSON.",
+        env_var="FORECAST_OUTPUT",
+    )
+    return parser.parse_args()
+
+
+def apply_scenario(conf):
+    """
+    Takes the options of the clients and the size of the fleet from a scenario
+    """
+    _scenario = Scenario.load(conf.scenario)
+    _clients = _scenario.clients
+    conf.devices_qty = _scenario.expected_devices(_scenario.steps - 1)
+    conf.stress_test_client_startup_interval = _clients.get(
+        "startup_interval", conf.stress_test_client_startup_interval
+    )
+    conf.stress_test_client_inventory_freq = _clients.get(
+        "inventory_freq", conf.stress_test_client_inventory_freq
+    )
+    conf.stress_test_client_poll_interval_freq = _clients.get(
+        "poll_interval_freq", conf.stress_test_client_poll_interval_freq
+    )
+    conf.wait = _clients.get("wait", conf.wait)
+
+
+def log_forecast(report):
+    log.info(
+        "%d devices: steady after %.0f sec at %.2f calls/sec, peak %.2f calls/sec "
+        "at %.0f sec"
+        % (
+            report["devices"],
+            report["steady_after"],
+            report["steady_rps"],
+            report["peak_rps"],
+            report["peak_at"],
+        )
+    )
+    for _key, _values in report["endpoints"].items():
+        log.info(
+            "%-50s steady %10.3f/sec  peak %10.3f/sec at %.0f sec"
+            % (_key, _values["steady_rps"], _values["peak_rps"], _values["peak_at"])
+        )
+    if report["deployment_end"] is not None:
+        log.info(
+            "The deployment is installed after %.0f sec" % report["deployment_end"]
+        )
+
+
+def log_comparison(rows):
+    for _row in rows:
+        _log = log.error if _row["short"] else log.info
+        _log(
+            "%-50s expected %10.1f (%.3f/sec)  measured %10d (%.3f/sec)%s"
+            % (
+                _row["endpoint"],
+                _row["expected_calls"],
+                _row["expected_rps"],
+                _row["measured_calls"],
+                _row["measured_rps"],
+                "  SHORT" if _row["short"] else "",
+            )
+        )
+
+
+if __name__ == "__main__":
+    conf = get_config()
+    if conf.scenario:
+        apply_scenario(conf)
+
+    load_forecast = forecast.LoadForecast(
+        conf.devices_qty,
+        startup_interval=conf.stress_test_client_startup_interval / 1000.0,
+        poll_interval=conf.stress_test_client_poll_interval_freq,
+        inventory_interval=conf.stress_test_client_inventory_freq,
+        token_lifetime=conf.token_lifetime,
+        accept_delay=conf.accept_delay,
+        auth_retry=conf.auth_retry_interval,
+        deployment_devices=conf.deployment_devices,
+        deployment_start=conf.deployment_start,
+        wait=conf.wait,
+        window=conf.window,
+    )
+    report = load_forecast.report()
+    log_forecast(report)
+
+    short = False
+    if conf.stats:
+        rows = forecast.compare(
+            load_forecast,
+            stats.Statistics.load(conf.stats),
+            tolerance=conf.tolerance,
+            offset=conf.offset,
+        )
+        log_comparison(rows)
+        report["comparison"] = rows
+        short = any(_row["short"] for _row in rows)
+        if short:
+            log.error("The load generator fell short of the forecast")
+
+    if conf.output:
+        with open(conf.output, "w") as f:
+            json.dump(report, f, indent=2)
+        log.info("Forecast saved to %s" % conf.output)
+    if short:
+        exit(1)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+import logging
+
+import configargparse
+
+from mender import identity
+from mender import keygen
+
+
+logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+logging.basicConfig(format=logs_format, level=logging.INFO)
+log = logging.getLogger()
+
+
+def get_config():
+    parser = configargparse.ArgumentParser()
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        required=False,
+        default="keys",
+        help="Directory where the archives are written.",
+        env_var="KEYS_OUTPUT_DIR",
+    )
+    parser.add_argument(
+        "--archives",
+        type=int,
+        required=False,
+        default=None,
+        help="Number of archives (instances of stress clients) to generate, 1 by "
+        "default or all the instances of the identity layout.",
+        env_var="KEYS_ARCHIVES",
+    )
+    parser.add_argument(
+        "--start-count",
+        type=int,
+        required=False,
+        default=0,
+        help="Sequence number of the first archive.",
+        env_var="START_COUNT",
+    )
+    parser.add_argument(
+        "--keys-per-archive",
+        type=int,
+        required=False,
+        default=identity.DEVICES_PER_INSTANCE,
+        help="Number of keys in every archive.",
+        env_var="DEVICES_PER_INSTANCE",
+    )
+    parser.add_argument(
+        "--key-bits",
+        type=int,
+        required=False,
+        default=2048,
+        help="Size of the RSA keys.",
+        env_var="KEY_BITS",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        required=False,
+        default=0,
+        help="Number of processes generating keys, 0 for one per CPU core.",
+        env_var="KEYGEN_PROCESSES",
+    )
+    parser.add_argument(
+        "--archive-name-format",
+        type=str,
+        required=False,
+        default="keys-%05d",
+        help="Name of an archive from its sequence number.",
+        env_var="KEYS_ARCHIVE_NAME_FORMAT",
+    )
+    parser.add_argument(
+        "--key-file-format",
+        type=str,
+        required=False,
+        default="%d.key",
+        help="Name of a key file from its index in the archive.",
+        env_var="KEYS_FILE_FORMAT",
+    )
+    parser.add_argument(
+        "--identity-layout",
+        type=str,
+        required=False,
+        default="sequential",
+        choices=identity.LAYOUTS,
+        help="Layout of the devices, to generate the keys of all its instances.",
+        env_var="IDENTITY_LAYOUT",
+    )
+    parser.add_argument(
+        "--keystore",
+        type=str,
+        required=False,
+        default=None,
+        help="Key store file to write with all the generated keys.",
+        env_var="KEYSTORE",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    conf = get_config()
+    layout = identity.get_layout(conf.identity_layout, conf.keys_per_archive)
+    if conf.archives is None:
+        conf.archives = 1 if layout is None else layout.instances - conf.start_count
+    log.info(
+        "Generating %d archives of %d keys in '%s'"
+        % (conf.archives, conf.keys_per_archive, conf.output_dir)
+    )
+    generator = keygen.KeySetGenerator(
+        conf.output_dir,
+        conf.archives,
+        start_count=conf.start_count,
+        keys_per_archive=conf.keys_per_archive,
+        bits=conf.key_bits,
+        processes=conf.processes or None,
+        archive_name_format=conf.archive_name_format,
+        key_file_format=conf.key_file_format,
+    )
+    generator.run().log()
+    if conf.keystore is not None:
+        count = generator.write_keystore(conf.keystore)
+        log.info("Key store '%s' written with %d keys" % (conf.keystore, count))
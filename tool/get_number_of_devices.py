@@ -46,4 +46,7 @@ if status not in ("accepted", "pending"):
 mender.authenticate(email=username, password=password, server_url=base_url)
 
 devices_count = mender.dev_auth.get_devices_count(status=status)
+if devices_count is None:
+    log.error("Failed to count the %s devices" % status)
+    exit(1)
 print(devices_count)
@@ -12,8 +12,10 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import atexit
 import os
 
+from mender import stats
 from mender import device_authentication
 from mender import user_administration
 from mender import inventory as inventory_lib
@@ -55,4 +57,12 @@ def authenticate(email, password, server_url):
     _init(email=email, password=password, server_url=server_url)
 
 
+def _report_stats():
+    if os.getenv("MENDER_STATS_REPORT", "true").lower() == "true":
+        stats.log_report(file_name=os.getenv("MENDER_STATS_FILE"))
+
+
+atexit.register(_report_stats)
+
+
 _init()
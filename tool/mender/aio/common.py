@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import asyncio
+import json
+import logging
+import os
+import time
+
+import aiohttp
+
+from mender import common as sync_common
+from mender import ratelimit
+from mender import stats
+
+
+logger = logging.getLogger()
+
+# max number of calls in flight at the same time for the whole process
+concurrency = int(os.getenv("MENDER_AIO_CONCURRENCY", "500"))
+
+_session = None
+_semaphore = None
+_loop = None
+
+
+def get_session():
+    """
+    Returns the aiohttp session shared by all the async clients of the running
+    event loop, a new one is created if the loop has changed
+    :return: 'aiohttp.ClientSession' shared session
+    """
+    global _session
+    global _semaphore
+    global _loop
+    _running_loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _loop is not _running_loop:
+        if _session is not None and not _session.closed:
+            _drop_session(_session)
+        _connector = aiohttp.TCPConnector(limit=concurrency, ssl=False)
+        _session = aiohttp.ClientSession(connector=_connector)
+        _semaphore = asyncio.Semaphore(concurrency)
+        _loop = _running_loop
+    return _session
+
+
+def _drop_session(session):
+    """
+    Closes the session of a previous event loop, which can't be awaited from
+    the running one: the connector is detached, which closes the session, and
+    its connections are closed if that loop is still open
+    """
+    _connector = session.connector
+    session.detach()
+    if _connector is not None:
+        # close() would return an awaitable bound to the previous loop
+        _connector._close()
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+def set_concurrency(limit):
+    """
+    Changes the max number of calls in flight, before the session is opened
+    or after close_session(): an open session can't be closed from here and
+    would leak its connections
+    :param limit: 'int' max number of concurrent calls
+    """
+    global concurrency
+    global _session
+    if _session is not None and not _session.closed:
+        raise RuntimeError("close the session before changing the concurrency")
+    concurrency = limit
+    _session = None
+
+
+async def map_bounded(func, items, limit=None):
+    """
+    Calls the coroutine function for every item keeping at most 'limit' calls
+    running, the items are consumed lazily so big iterables can be used
+    :param func: coroutine function called with one item
+    :param items: iterable of items
+    :param limit: 'int' number of workers, defaults to the session concurrency
+    :return: 'list' results in the same order as the items
+    """
+    _results = {}
+    _iterator = iter(enumerate(items))
+
+    async def _worker():
+        for _index, _item in _iterator:
+            _results[_index] = await func(_item)
+
+    await asyncio.gather(*[_worker() for _ in range(limit or concurrency)])
+    return [_results[_index] for _index in range(len(_results))]
+
+
+async def do_raw_call(method, url, **kwargs):
+    """
+    Does one call without retries nor rate limit, for callers which handle the
+    status codes themselves (e.g. virtual devices)
+    :return: 'tuple' status code and body of the response
+    """
+    _session = get_session()
+    async with _semaphore:
+        _start = time.perf_counter()
+        try:
+            async with _session.request(method, url, **kwargs) as _r:
+                _body = await _r.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            stats.record(method, url, time.perf_counter() - _start, stats.STATUS_ERROR)
+            raise
+        stats.record(method, url, time.perf_counter() - _start, _r.status)
+    return _r.status, _body
+
+
+async def _do_call(
+    method, url, status_code=200, text=False, retry=None, idempotent=None, **kwargs
+):
+    _session = get_session()
+    _policy = retry or sync_common.retry_policy
+    _service = stats.service_name(url)
+    _started = time.monotonic()
+    _attempt = 0
+    _renewed = False
+    while True:
+        _attempt += 1
+        _renew = False
+        if ratelimit.limiter.enabled:
+            _wait = ratelimit.limiter.reserve(_service)
+            ratelimit.record_wait(_service, _wait)
+            if _wait > 0:
+                await asyncio.sleep(_wait)
+        async with _semaphore:
+            _start = time.perf_counter()
+            try:
+                _r = await _session.request(method, url, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                stats.record(
+                    method, url, time.perf_counter() - _start, stats.STATUS_ERROR
+                )
+                _delay = _policy.next_delay(
+                    method, _attempt, _started, idempotent=idempotent
+                )
+                if _delay is None:
+                    raise
+                logger.debug(
+                    "Call: %s %s failed (%s), retrying in %.2f sec"
+                    % (method, url, e, _delay)
+                )
+                _r = None
+            except aiohttp.ClientError:
+                stats.record(
+                    method, url, time.perf_counter() - _start, stats.STATUS_ERROR
+                )
+                raise
+            if _r is not None:
+                async with _r:
+                    _body = await _r.text()
+                    stats.record(method, url, time.perf_counter() - _start, _r.status)
+                    _renew = sync_common._must_renew(
+                        _r.status, status_code, kwargs, _renewed
+                    )
+                    if not _renew and (
+                        _r.status in sync_common._expected(status_code)
+                        or _r.status not in _policy.status_codes
+                    ):
+                        break
+                    if not _renew:
+                        _delay = _policy.next_delay(
+                            method,
+                            _attempt,
+                            _started,
+                            retry_after=_r.headers.get("Retry-After"),
+                            idempotent=idempotent,
+                        )
+                        if _delay is None:
+                            break
+                        logger.debug(
+                            "Call: %s %s. Status code: %s, retrying in %.2f sec"
+                            % (method, url, _r.status, _delay)
+                        )
+        if _renew:
+            # the token has expired or was revoked, log in and call again
+            logger.info("Call: %s %s. Token rejected, renewing it" % (method, url))
+            kwargs["headers"] = await kwargs["headers"].renew()
+            _renewed = True
+            stats.statistics.increment("auth.renewed")
+            continue
+        stats.record_retry(method, url)
+        await asyncio.sleep(_delay)
+    if _r.status not in sync_common._expected(status_code):
+        logger.warning(
+            "Call: %s %s. Status code: %s. Content of the response: %s"
+            % (method, url, _r.status, _body)
+        )
+        return None
+    if text:
+        return _body
+    try:
+        _content = json.loads(_body)
+    except ValueError:
+        return {}
+    if _content is None:
+        return {}
+    return _content
+
+
+async def do_get_call(url, status_code=200, **kwargs):
+    return await _do_call("GET", url, status_code=status_code, **kwargs)
+
+
+async def do_post_call(url, status_code=200, text=False, **kwargs):
+    return await _do_call("POST", url, status_code=status_code, text=text, **kwargs)
+
+
+async def do_put_call(url, status_code=200, **kwargs):
+    return await _do_call("PUT", url, status_code=status_code, **kwargs)
+
+
+async def do_patch_call(url, status_code=200, **kwargs):
+    return await _do_call("PATCH", url, status_code=status_code, **kwargs)
+
+
+async def do_delete_call(url, status_code=200, **kwargs):
+    return await _do_call("DELETE", url, status_code=status_code, **kwargs)
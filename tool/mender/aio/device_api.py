@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+import json
+import logging
+
+from mender import keys
+from mender.aio import common
+
+
+logger = logging.getLogger("aio-device-api")
+
+
+class DeviceAPI:
+    """
+    Client of the device API, acting as one device. The calls are done only
+    once, the status codes are returned to the caller which decides when to
+    call again, as the mender client does.
+    """
+
+    server_url = None
+    identity = None
+    token = None
+
+    def __init__(self, server_url, key, identity, tenant_token=None):
+        """
+        :param server_url: 'string' URL of the backend
+        :param key: 'RSAPrivateKey' private key of the device
+        :param identity: 'dict' identity data, e.g. {"mac": "..."}
+        :param tenant_token: 'string' tenant token or None
+        """
+        self.server_url = server_url
+        self._key = key
+        self.identity = identity
+        self._tenant_token = tenant_token
+
+    """
+        + POST /authentication/auth_requests
+        + PATCH /inventory/device/attributes
+        + GET /deployments/device/deployments/next
+        + PUT /deployments/device/deployments/{id}/status
+    """
+
+    def _auth_header(self):
+        return {"Authorization": "Bearer %s" % self.token}
+
+    async def auth_request(self):
+        # POST /authentication/auth_requests
+        _url = "%s/api/devices/v1/authentication/auth_requests" % self.server_url
+        _body = {
+            "id_data": json.dumps(self.identity),
+            "pubkey": keys.public_pem(self._key),
+        }
+        if self._tenant_token:
+            _body["tenant_token"] = self._tenant_token
+        _data = json.dumps(_body).encode()
+        _status, _token = await common.do_raw_call(
+            "POST",
+            _url,
+            data=_data,
+            headers={
+                "Content-Type": "application/json",
+                "X-MEN-Signature": keys.sign(self._key, _data),
+            },
+        )
+        self.token = _token if _status == 200 else None
+        return _status
+
+    async def update_inventory(self, attributes):
+        # PATCH /inventory/device/attributes
+        _url = "%s/api/devices/v1/inventory/device/attributes" % self.server_url
+        _data = [
+            {"name": _name, "value": _value} for _name, _value in attributes.items()
+        ]
+        _status, _ = await common.do_raw_call(
+            "PATCH", _url, json=_data, headers=self._auth_header()
+        )
+        return _status
+
+    async def get_next_deployment(self, artifact_name, device_type):
+        """
+        :return: 'tuple' status code and the deployment, None if there is none
+        """
+        # GET /deployments/device/deployments/next
+        _url = "%s/api/devices/v1/deployments/device/deployments/next" % (
+            self.server_url
+        )
+        _status, _body = await common.do_raw_call(
+            "GET",
+            _url,
+            params={"artifact_name": artifact_name, "device_type": device_type},
+            headers=self._auth_header(),
+        )
+        if _status != 200:
+            return _status, None
+        try:
+            return _status, json.loads(_body)
+        except ValueError:
+            logger.warning("Invalid deployment: %s" % _body)
+            return _status, None
+
+    async def update_deployment_status(self, deployment_id, status):
+        # PUT /deployments/device/deployments/{id}/status
+        _url = "%s/api/devices/v1/deployments/device/deployments/%s/status" % (
+            self.server_url,
+            deployment_id,
+        )
+        _status, _ = await common.do_raw_call(
+            "PUT", _url, json={"status": status}, headers=self._auth_header()
+        )
+        return _status
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import logging
+import time
+
+from mender.aio import common
+from mender.common import project
+from mender.paging import PagingError
+
+
+logger = logging.getLogger("aio-device-authentication")
+
+
+class DeviceAuthentication:
+    _user_adm = None
+
+    def __init__(self, email=None, password=None, server_url=None, user_adm=None):
+        self._user_adm = user_adm
+
+        if user_adm is None and (email and password and server_url):
+            from mender.aio import user_administration
+
+            self._user_adm = user_administration.UserAdministration(
+                email=email, password=password, server_url=server_url
+            )
+
+    """
+        + POST /devices
+        + GET /devices
+        + GET /devices/count
+        + GET /devices/{id}
+        + DELETE /devices/{id}
+        + DELETE /devices/{id}/auth/{aid}
+        + GET /devices/{id}/auth/{aid}/status
+        + PUT /devices/{id}/auth/{aid}/status
+        + GET /limits/max_devices
+        + DELETE /tokens/{id}
+    """
+
+    async def post_preauthorized_device(
+        self, public_key, mac=None, sku=None, sn=None, ignore_existing=False
+    ):
+        """
+        :param ignore_existing: 'boolean' a device already preauthorized with the
+                                same identity is a success, which also makes the
+                                call safe to retry
+        :return: 'dict' empty on success, None on failure
+        """
+        # POST /devices
+        _url = "%s/api/management/v2/devauth/devices" % self._user_adm.server_url
+        _identity_data = {}
+        if mac:
+            _identity_data["mac"] = mac
+        if sku:
+            _identity_data["sku"] = sku
+        if sn:
+            _identity_data["sn"] = sn
+        _body = {"identity_data": _identity_data, "pubkey": public_key}
+        return await common.do_post_call(
+            _url,
+            status_code=(201, 409) if ignore_existing else 201,
+            idempotent=ignore_existing or None,
+            json=_body,
+            headers=await self._user_adm.get_auth_header(),
+        )
+
+    async def delete_device(self, device_id):
+        # DELETE /devices/{id}
+        _url = "%s/api/management/v2/devauth/devices/%s" % (
+            self._user_adm.server_url,
+            device_id,
+        )
+        return await common.do_delete_call(
+            _url, status_code=204, headers=await self._user_adm.get_auth_header()
+        )
+
+    async def delete_all_devices(self, device_ids):
+        # DELETE /devices/{id}
+        return await common.map_bounded(self.delete_device, device_ids)
+
+    async def delete_device_auth_set(self, device_id, auth_set_id):
+        # DELETE /devices/{id}/auth/{aid}
+        _url = "%s/api/management/v2/devauth/devices/%s/auth/%s" % (
+            self._user_adm.server_url,
+            device_id,
+            auth_set_id,
+        )
+        return await common.do_delete_call(
+            _url, status_code=204, headers=await self._user_adm.get_auth_header()
+        )
+
+    async def delete_device_token(self, token_id):
+        # DELETE /tokens/{id}
+        _url = "%s/api/management/v2/devauth/tokens/%s" % (
+            self._user_adm.server_url,
+            token_id,
+        )
+        return await common.do_delete_call(
+            _url, status_code=204, headers=await self._user_adm.get_auth_header()
+        )
+
+    async def get_device(self, device_id):
+        # GET /devices/{id}
+        if isinstance(device_id, str):
+            _url = "%s/api/management/v2/devauth/devices/%s" % (
+                self._user_adm.server_url,
+                device_id,
+            )
+            return await common.do_get_call(
+                _url, headers=await self._user_adm.get_auth_header()
+            )
+        else:
+            raise ValueError
+
+    async def get_devices(self, status, page=1, per_page=20):
+        # GET /devices
+        return await self._get_devices(status=status, page=page, per_page=per_page)
+
+    async def get_all_devices(self, status, strict=True):
+        # GET /devices
+        _devices = [
+            _device async for _device in self.iter_devices(status=status, strict=strict)
+        ]
+        logger.debug("Devices count: %s" % len(_devices))
+        return _devices
+
+    async def iter_pages(self, status, per_page=500, strict=True):
+        # GET /devices
+        _page = 1
+        while True:
+            _start = time.time()
+            _resp_json = await self._get_devices(
+                status=status, page=_page, per_page=per_page
+            )
+            if _resp_json is None and strict:
+                raise PagingError("Failed to fetch page %s" % _page)
+            if not _resp_json:
+                break
+            _end = time.time()
+            logger.debug(
+                "Page '%s' fetched for: '%s' sec" % (_page, round(_end - _start, 2))
+            )
+            yield _resp_json
+            if len(_resp_json) < per_page:
+                break
+            _page += 1
+
+    async def iter_devices(self, status, per_page=500, fields=None, strict=True):
+        # GET /devices
+        async for _devices in self.iter_pages(
+            status=status, per_page=per_page, strict=strict
+        ):
+            for _device in _devices:
+                yield project(_device, fields)
+
+    async def _get_devices(self, status, page, per_page):
+        # GET /devices
+        _url = "%s/api/management/v2/devauth/devices?status=%s&per_page=%s&page=%s" % (
+            self._user_adm.server_url,
+            status,
+            per_page,
+            page,
+        )
+        return await common.do_get_call(
+            _url, headers=await self._user_adm.get_auth_header()
+        )
+
+    async def get_devices_count(self, status=None):
+        # GET /devices/count
+        _url = "%s/api/management/v2/devauth/devices/count" % self._user_adm.server_url
+        if status is not None:
+            _url = "%s?status=%s" % (_url, status)
+        data = await common.do_get_call(
+            _url, headers=await self._user_adm.get_auth_header()
+        )
+        if data is None:
+            return None
+        return data.get("count") or 0
+
+    async def get_device_auth_set_status(self, device_id, auth_set_id):
+        # GET /devices/{id}/auth/{aid}/status
+        _url = "%s/api/management/v2/devauth/devices/%s/auth/%s/status" % (
+            self._user_adm.server_url,
+            device_id,
+            auth_set_id,
+        )
+        return await common.do_get_call(
+            _url, headers=await self._user_adm.get_auth_header()
+        )
+
+    async def get_devices_limit(self):
+        # GET /limits/max_devices
+        _url = (
+            "%s/api/management/v2/devauth/limits/max_devices"
+            % self._user_adm.server_url
+        )
+        return await common.do_get_call(
+            _url, headers=await self._user_adm.get_auth_header()
+        )
+
+    async def update_device_auth_set_status(self, device_id, auth_set_id, status):
+        # PUT /devices/{id}/auth/{aid}/status
+        _url = "%s/api/management/v2/devauth/devices/%s/auth/%s/status" % (
+            self._user_adm.server_url,
+            device_id,
+            auth_set_id,
+        )
+        return await common.do_put_call(
+            _url,
+            status_code=204,
+            json={"status": status},
+            headers=await self._user_adm.get_auth_header(),
+        )
+
+    async def accept_devices(self, devices):
+        # PUT /devices/{id}/auth/{aid}/status
+        _start = time.time()
+
+        async def _accept(device):
+            if len(device["auth_sets"]) != 1:
+                logger.warning(
+                    "Skipping device %s due to it has %d auth sets."
+                    % (device["id"], len(device["auth_sets"]))
+                )
+                return False
+            _result = await self.update_device_auth_set_status(
+                device["id"], device["auth_sets"][0]["id"], "accepted"
+            )
+            return _result is not None
+
+        _results = await common.map_bounded(_accept, devices)
+        _count = sum(1 for _result in _results if _result)
+
+        _end = time.time()
+        logger.debug(
+            "Accepted '%s' devices from '%s' for '%s' secs"
+            % (_count, len(_results), round(_end - _start, 2))
+        )
+        return _count
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import logging
+import time
+
+from mender.aio import common
+from mender.bulk import BulkReport, batches
+from mender.common import project
+from mender.paging import PagingError
+
+
+logger = logging.getLogger("aio-inventory")
+
+
+class Inventory:
+    _user_adm = None
+
+    def __init__(self, email=None, password=None, server_url=None, user_adm=None):
+        self._user_adm = user_adm
+
+        if user_adm is None and (email and password and server_url):
+            from mender.aio import user_administration
+
+            self._user_adm = user_administration.UserAdministration(
+                email=email, password=password, server_url=server_url
+            )
+
+    """
+        + GET /devices
+        + GET /devices?attr_name_1=foo& attr_name_2=100& ...
+        + GET /devices/{id}
+        + DELETE /devices/{id}
+        + GET /devices/{id}/group
+        + PUT /devices/{id}/group
+        + DELETE /devices/{id}/group/{name}
+        + GET /groups
+        + GET /groups/{name}/devices
+        + PATCH /groups/{name}/devices
+    """
+
+    async def get_devices(
+        self, group=None, has_group=None, page=1, per_page=20, sort=None
+    ):
+        # GET /devices
+        return await self._get_devices(
+            page=page, per_page=per_page, group=group, has_group=has_group, sort=sort
+        )
+
+    async def get_all_devices(self, strict=True):
+        # GET /devices
+        _devices = [_device async for _device in self.iter_devices(strict=strict)]
+        logger.debug("Devices count: %s" % len(_devices))
+        return _devices
+
+    async def iter_pages(
+        self, group=None, has_group=None, per_page=500, sort=None, strict=True
+    ):
+        # GET /devices
+        _page = 1
+        while True:
+            _start = time.time()
+            _resp_json = await self._get_devices(
+                page=_page,
+                per_page=per_page,
+                group=group,
+                has_group=has_group,
+                sort=sort,
+            )
+            if _resp_json is None and strict:
+                raise PagingError("Failed to fetch page %s" % _page)
+            if not _resp_json:
+                break
+            _end = time.time()
+            logger.debug(
+                "Page '%s' fetched for: '%s' sec" % (_page, round(_end - _start, 2))
+            )
+            yield _resp_json
+            if len(_resp_json) < per_page:
+                break
+            _page += 1
+
+    async def iter_devices(
+        self,
+        group=None,
+        has_group=None,
+        per_page=500,
+        sort=None,
+        fields=None,
+        strict=True,
+    ):
+        # GET /devices
+        async for _devices in self.iter_pages(
+            group=group,
+            has_group=has_group,
+            per_page=per_page,
+            sort=sort,
+            strict=strict,
+        ):
+            for _device in _devices:
+                yield project(_device, fields)
+
+    async def _get_devices(self, page, per_page, group=None, has_group=None, sort=None):
+        # GET /devices
+        _args = "?"
+        if page is not None:
+            _args += "&page=%s" % page
+        if per_page is not None:
+            _args += "&per_page=%s" % per_page
+        if group is not None:
+            _args += "&group=%s" % group
+        if has_group is not None:
+            _args += "&has_group=%s" % has_group
+        if sort is not None:
+            _args += "&sort=%s" % sort
+        _url = "%s/api/management/v1/inventory/devices%s" % (
+            self._user_adm.server_url,
+            _args,
+        )
+        return await common.do_get_call(
+            _url, status_code=200, headers=await self._user_adm.get_auth_header()
+        )
+
+    async def get_device(self, device_id):
+        # GET /devices/{id}
+        _url = "%s/api/management/v1/inventory/devices/%s" % (
+            self._user_adm.server_url,
+            device_id,
+        )
+        return await common.do_get_call(
+            _url, status_code=200, headers=await self._user_adm.get_auth_header()
+        )
+
+    async def get_devices_group(self, device_id):
+        # GET /devices/{id}/group
+        _url = "%s/api/management/v1/inventory/devices/%s/group" % (
+            self._user_adm.server_url,
+            device_id,
+        )
+        return await common.do_get_call(
+            _url, status_code=200, headers=await self._user_adm.get_auth_header()
+        )
+
+    async def get_groups(self):
+        # GET /groups
+        _url = "%s/api/management/v1/inventory/groups" % self._user_adm.server_url
+        return await common.do_get_call(
+            _url, status_code=200, headers=await self._user_adm.get_auth_header()
+        )
+
+    async def get_groups_devices(self, group_name):
+        # GET /groups/{name}/devices
+        _url = "%s/api/management/v1/inventory/groups/%s/devices" % (
+            self._user_adm.server_url,
+            group_name,
+        )
+        return await common.do_get_call(
+            _url, status_code=200, headers=await self._user_adm.get_auth_header()
+        )
+
+    async def add_device_to_group(self, device_id, group_name):
+        # PUT /devices/{id}/group
+        _url = "%s/api/management/v1/inventory/devices/%s/group" % (
+            self._user_adm.server_url,
+            device_id,
+        )
+        _body = {"group": group_name}
+        return await common.do_put_call(
+            _url,
+            status_code=204,
+            json=_body,
+            headers=await self._user_adm.get_auth_header(),
+        )
+
+    async def add_devices_to_group(
+        self, group_name, device_ids, batch_size=1000, concurrency=4
+    ):
+        """
+        Assigns many devices to a static group, sending batches of device ids
+        to the bulk endpoint with several batches in flight
+        :param group_name: 'string' name of the group
+        :param device_ids: 'iterable' of device ids, consumed lazily
+        :param batch_size: 'int' number of devices per call
+        :param concurrency: 'int' number of calls running at the same time
+        :return: 'BulkReport' devices in the group (done), not found (skipped)
+                 or in failed calls (failed)
+        """
+        # PATCH /groups/{name}/devices
+        _url = "%s/api/management/v1/inventory/groups/%s/devices" % (
+            self._user_adm.server_url,
+            group_name,
+        )
+        _report = BulkReport("group '%s'" % group_name)
+
+        async def _assign(batch):
+            _result = await common.do_patch_call(
+                _url,
+                status_code=200,
+                json=batch,
+                idempotent=True,
+                headers=await self._user_adm.get_auth_header(),
+            )
+            if _result is None:
+                _report.add(failed=len(batch))
+                return
+            _matched = _result.get("matched_count", len(batch))
+            _report.add(done=_matched, skipped=len(batch) - _matched)
+
+        await common.map_bounded(
+            _assign, batches(device_ids, batch_size), limit=concurrency
+        )
+        _report.finished = time.time()
+        return _report
+
+    async def delete_device(self, device_id):
+        # DELETE /devices/{id}
+        _url = "%s/api/management/v1/inventory/devices/%s" % (
+            self._user_adm.server_url,
+            device_id,
+        )
+        return await common.do_delete_call(
+            _url, status_code=204, headers=await self._user_adm.get_auth_header()
+        )
+
+    async def delete_device_from_group(self, device_id, group_name):
+        # DELETE /devices/{id}/group/{name}
+        _url = "%s/api/management/v1/inventory/devices/%s/group/%s" % (
+            self._user_adm.server_url,
+            device_id,
+            group_name,
+        )
+        return await common.do_delete_call(
+            _url, status_code=204, headers=await self._user_adm.get_auth_header()
+        )
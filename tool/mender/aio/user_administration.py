@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import asyncio
+import logging
+import time
+
+from aiohttp import BasicAuth
+
+from mender import user_administration as sync_user_administration
+from mender.aio import common
+
+
+logger = logging.getLogger("aio-user-administration")
+
+
+class UserAdministration:
+    _email = None
+    _password = None
+    server_url = None
+    _auth_header = None
+    _expires_at = None
+    _login_lock = None
+
+    def __init__(self, email=None, password=None, server_url=None):
+        self._email = email
+        self._password = password
+        self.server_url = server_url
+
+    """
+        + POST /auth/login
+        + POST /settings
+        + GET /settings
+        + POST /users
+        + GET /users
+        + GET /users/{id}
+        + PUT /users/{id}
+        + DELETE /users/{id}
+    """
+
+    def _is_fresh(self):
+        if self._auth_header is None:
+            return False
+        if self._expires_at is None:
+            return True
+        return time.time() < self._expires_at - sync_user_administration.refresh_margin
+
+    def _get_lock(self):
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        return self._login_lock
+
+    async def get_auth_header(self):
+        if self._is_fresh():
+            return self._auth_header
+        async with self._get_lock():
+            # somebody else could have logged in while waiting for the lock
+            if not self._is_fresh():
+                await self._login()
+        return self._auth_header
+
+    async def renew_auth_header(self, stale_token=None):
+        async with self._get_lock():
+            if self._auth_header is None or self._auth_header.token == stale_token:
+                await self._login()
+        return self._auth_header
+
+    async def _login(self):
+        # POST /auth/login
+        _url = "%s/api/management/v1/useradm/auth/login" % self.server_url
+        _token = await common.do_post_call(
+            _url,
+            status_code=200,
+            text=True,
+            idempotent=True,
+            auth=BasicAuth(self._email, self._password),
+        )
+        if _token is None:
+            logger.warning("Failed to fetch auth token.")
+            self._auth_header = None
+            self._expires_at = None
+            return
+        self._auth_header = sync_user_administration.AuthHeader(
+            _token, self.renew_auth_header
+        )
+        self._expires_at = sync_user_administration.token_expiry(_token)
+        logger.debug(
+            "URL: '%s', user %s, authentication token: %s, expires at: %s"
+            % (self.server_url, self._email, self._auth_header, self._expires_at)
+        )
+
+    async def update_user_settings(self, settings):
+        # POST /settings
+        _url = "%s/api/management/v1/useradm/settings" % self.server_url
+        return await common.do_post_call(
+            _url, status_code=201, json=settings, headers=await self.get_auth_header()
+        )
+
+    async def get_user_settings(self):
+        # GET /settings
+        _url = "%s/api/management/v1/useradm/settings" % self.server_url
+        return await common.do_get_call(_url, headers=await self.get_auth_header())
+
+    async def create_user(self, email, password):
+        # POST /users
+        _url = "%s/api/management/v1/useradm/users" % self.server_url
+        _data = {"email": email, "password": password}
+        return await common.do_post_call(
+            _url, json=_data, headers=await self.get_auth_header()
+        )
+
+    async def get_users(self):
+        # GET /users
+        _url = "%s/api/management/v1/useradm/users" % self.server_url
+        return await common.do_get_call(_url, headers=await self.get_auth_header())
+
+    async def get_user_information(self, user_id):
+        # GET /users/{id}
+        _url = "%s/api/management/v1/useradm/users/%s" % (self.server_url, user_id)
+        return await common.do_get_call(_url, headers=await self.get_auth_header())
+
+    async def update_user_information(self, user_id, email=None, password=None):
+        # PUT /users/{id}
+        _url = "%s/api/management/v1/useradm/users/%s" % (self.server_url, user_id)
+        _data = {}
+        if email:
+            _data["email"] = email
+        if password:
+            _data["password"] = password
+        return await common.do_put_call(
+            _url, status_code=204, json=_data, headers=await self.get_auth_header()
+        )
+
+    async def delete_user(self, user_id):
+        # DELETE /users/{id}
+        _url = "%s/api/management/v1/useradm/users/%s" % (self.server_url, user_id)
+        return await common.do_delete_call(
+            _url, status_code=204, headers=await self.get_auth_header()
+        )
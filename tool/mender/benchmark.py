@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+from mender import identity
+from mender import mock_server
+
+
+logger = logging.getLogger("benchmark")
+
+# directory of the scripts, the benchmarked commands run from there
+TOOL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = (10000, 100000)
+GROUP_NAME = "benchmark"
+DEPLOYMENT_NAME = "benchmark"
+
+_LOGIN = """
+import os, mender
+mender.authenticate(os.environ["USERNAME"], os.environ["PASSWORD"], os.environ["URL"])
+"""
+_LIST_DEVICES = """
+print(sum(1 for _ in mender.dev_auth.iter_devices(
+    status="accepted", fields=("id",), prefetch=8)))
+"""
+_CREATE_FILTERS = """
+import sys, testenv_control
+sys.exit(0 if testenv_control.create_all_filters() else 1)
+"""
+
+
+def _script(name, *args):
+    return [sys.executable, os.path.join(TOOL_DIR, name)] + list(args)
+
+
+def _snippet(code):
+    return [sys.executable, "-c", _LOGIN + code]
+
+
+class Case:
+    """
+    One benchmarked operation: the command doing it, the devices loaded in
+    the mock server before and the check of the state of the server after
+    """
+
+    def __init__(self, name, command, check, status=None, sized=True):
+        """
+        :param name: 'string' name of the case in the results
+        :param command: function(size) returning the command line to run
+        :param check: function(state, size, output) returning the number of
+                      items processed by the command
+        :param status: 'string' status of the devices loaded, None for none
+        :param sized: 'boolean' False when the fleet size doesn't matter, the
+                      case then runs once with no devices
+        """
+        self.name = name
+        self.command = command
+        self.check = check
+        self.status = status
+        self.sized = sized
+
+
+def _check_listed(state, size, output):
+    return int(output.split()[-1])
+
+
+def _check_accepted(state, size, output):
+    return len(state.by_status["accepted"])
+
+
+def _check_grouped(state, size, output):
+    return len(state.groups.get(GROUP_NAME, {}))
+
+
+def _check_filters(state, size, output):
+    return len(state.filters)
+
+
+def _check_deployment(state, size, output):
+    for _deployment in state.deployments.values():
+        if _deployment.name == DEPLOYMENT_NAME:
+            return len(_deployment.device_ids)
+    return 0
+
+
+CASES = {
+    _case.name: _case
+    for _case in (
+        Case(
+            "list_devices",
+            lambda size: _snippet(_LIST_DEVICES),
+            _check_listed,
+            status="accepted",
+        ),
+        Case(
+            "accept_devices",
+            lambda size: _script("accept_all_devices.py"),
+            _check_accepted,
+            status="pending",
+        ),
+        Case(
+            "group_devices",
+            lambda size: _script(
+                "create_group_of_devices.py",
+                "--devices-qty",
+                str(size),
+                "--group-name",
+                GROUP_NAME,
+            ),
+            _check_grouped,
+            status="accepted",
+        ),
+        Case(
+            "create_filters",
+            lambda size: _snippet(_CREATE_FILTERS),
+            _check_filters,
+            sized=False,
+        ),
+        Case(
+            "deployment_payload",
+            lambda size: _script("do_deployment_to_all_devices.py"),
+            _check_deployment,
+            status="accepted",
+        ),
+    )
+}
+
+
+def _expected_items(case, size):
+    if case.sized:
+        return size
+    return sum(len(_spec.prefixes()) for _spec in identity.PREDEFINED_FILTERS)
+
+
+def _read_peak_rss(pid):
+    """
+    :return: 'float' peak resident memory of the process in MB, None if unknown
+    """
+    try:
+        with open("/proc/%d/status" % pid) as _f:
+            for _line in _f:
+                if _line.startswith("VmHWM:"):
+                    return int(_line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _run_command(command, env, timeout):
+    """
+    :return: 'tuple' exit code, stdout, wall time, resource usage and peak
+             memory in MB of the command
+    """
+    _start = time.perf_counter()
+    _process = subprocess.Popen(
+        command,
+        cwd=TOOL_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    _timer = threading.Timer(timeout, _process.kill)
+    _timer.start()
+    _done = threading.Event()
+    _peak = []
+
+    def _sample():
+        # ru_maxrss of a child also counts the memory of the parent it was
+        # forked from, the high water mark of its own address space doesn't
+        while not _done.wait(0.05):
+            _rss = _read_peak_rss(_process.pid)
+            if _rss is not None:
+                _peak.append(_rss)
+
+    _sampler = threading.Thread(target=_sample, daemon=True)
+    _sampler.start()
+    try:
+        _output = _process.stdout.read()
+        _, _status, _usage = os.wait4(_process.pid, 0)
+    finally:
+        _timer.cancel()
+        _done.set()
+        _sampler.join()
+    _wall = time.perf_counter() - _start
+    # the process was reaped by wait4, don't let Popen wait for it again
+    _process.returncode = os.waitstatus_to_exitcode(_status)
+    # ru_maxrss is in KB on Linux
+    _max_rss = max(_peak) if _peak else _usage.ru_maxrss / 1024
+    return _process.returncode, _output, _wall, _usage, _max_rss
+
+
+class Benchmark:
+    """
+    Runs the scripts doing bulk operations against a local mock server (see
+    mender.mock_server) at fixed fleet sizes. Every case starts with a fresh
+    server, so the results of two runs can be compared.
+    """
+
+    def __init__(
+        self,
+        sizes=DEFAULT_SIZES,
+        cases=None,
+        repeat=1,
+        latency=0.0,
+        error_rate=0.0,
+        timeout=1800,
+    ):
+        """
+        :param sizes: 'tuple' of fleet sizes
+        :param cases: 'list' of case names, None for all
+        :param repeat: 'int' runs of every case, the fastest one is kept
+        :param latency: 'float' seconds added by the server to every call
+        :param error_rate: 'float' 0..1 share of the calls failing
+        :param timeout: 'float' max seconds of one run
+        """
+        self.sizes = sizes
+        self.cases = [CASES[_name] for _name in (cases or CASES)]
+        self.repeat = max(repeat, 1)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.timeout = timeout
+        self.results = []
+
+    def run(self):
+        """
+        :return: 'list' of 'dict' results, one per case and size
+        """
+        self.results = []
+        for _case in self.cases:
+            for _size in self.sizes if _case.sized else (0,):
+                _runs = [self._run_once(_case, _size) for _ in range(self.repeat)]
+                _best = min(_runs, key=lambda _result: _result["wall"])
+                _best["ok"] = all(_result["ok"] for _result in _runs)
+                self.results.append(_best)
+                logger.info(
+                    "%s (%s devices): %.2f sec, %.1f items/sec, max RSS %.1f MB, "
+                    "%s calls%s"
+                    % (
+                        _case.name,
+                        _size,
+                        _best["wall"],
+                        _best["throughput"],
+                        _best["max_rss_mb"],
+                        _best["calls"],
+                        "" if _best["ok"] else ", FAILED",
+                    )
+                )
+        return self.results
+
+    def _run_once(self, case, size):
+        _state = mock_server.MockState()
+        if case.status is not None and size > 0:
+            _state.seed(size, status=case.status)
+        _server = mock_server.MockServer(
+            _state, latency=self.latency, error_rate=self.error_rate
+        )
+        _url = _server.start()
+        _env = dict(
+            os.environ,
+            USERNAME="benchmark@example.com",
+            PASSWORD="benchmark",
+            URL=_url,
+            DEPLOYMENT_NAME=DEPLOYMENT_NAME,
+            ARTIFACT_NAME="benchmark-1.0",
+            MENDER_STATS_REPORT="false",
+        )
+        try:
+            _code, _output, _wall, _usage, _max_rss = _run_command(
+                case.command(size), _env, self.timeout
+            )
+        finally:
+            _server.stop()
+        try:
+            _items = case.check(_state, size, _output)
+        except (IndexError, ValueError):
+            _items = 0
+        _expected = _expected_items(case, size)
+        _ok = _code == 0 and _items == _expected
+        if not _ok:
+            logger.warning(
+                "%s (%s devices): exit code %s, %s items instead of %s\n%s"
+                % (case.name, size, _code, _items, _expected, _output[-2000:])
+            )
+        return {
+            "case": case.name,
+            "size": size,
+            "items": _items,
+            "wall": round(_wall, 3),
+            "throughput": round(_items / _wall, 1) if _wall > 0 else 0.0,
+            "cpu_user": round(_usage.ru_utime, 3),
+            "cpu_system": round(_usage.ru_stime, 3),
+            "max_rss_mb": round(_max_rss, 1),
+            "calls": _server.calls,
+            "ok": _ok,
+        }
+
+    def save(self, file_name):
+        _doc = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "latency": self.latency,
+            "error_rate": self.error_rate,
+            "repeat": self.repeat,
+            "results": self.results,
+        }
+        with open(file_name, "w") as _f:
+            json.dump(_doc, _f, indent=2)
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compares results with the ones of an earlier run
+    :param results: 'list' of results as returned by Benchmark.run
+    :param baseline: 'list' of results of the earlier run
+    :param tolerance: 'float' accepted relative change, e.g. 0.2 for 20%
+    :return: 'list' of 'string' regressions, empty if there is none
+    """
+    _baseline = {(_r["case"], _r["size"]): _r for _r in baseline}
+    _regressions = []
+    for _result in results:
+        _name = "%s (%s devices)" % (_result["case"], _result["size"])
+        _before = _baseline.get((_result["case"], _result["size"]))
+        if _before is None:
+            continue
+        if not _result["ok"] and _before["ok"]:
+            _regressions.append("%s: failed" % _name)
+            continue
+        if _result["throughput"] < _before["throughput"] * (1 - tolerance):
+            _regressions.append(
+                "%s: throughput %.1f items/sec, was %.1f"
+                % (_name, _result["throughput"], _before["throughput"])
+            )
+        for _field, _unit in (("wall", "sec"), ("max_rss_mb", "MB")):
+            if _result[_field] > _before[_field] * (1 + tolerance):
+                _regressions.append(
+                    "%s: %s %.1f %s, was %.1f"
+                    % (_name, _field, _result[_field], _unit, _before[_field])
+                )
+    return _regressions
+
+
+def load_results(file_name):
+    with open(file_name) as _f:
+        return json.load(_f)["results"]
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import logging
+import queue
+import random
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+from mender import ratelimit
+from mender import stats
+
+
+logger = logging.getLogger("bulk")
+
+
+def batches(items, size):
+    """
+    Splits any iterable in lists of at most 'size' items, lazily
+    """
+    _iterator = iter(items)
+    while True:
+        _batch = list(islice(_iterator, size))
+        if not _batch:
+            return
+        yield _batch
+
+
+def run_concurrently(func, items, concurrency):
+    """
+    Calls 'func' for every item with at most 'concurrency' calls running, the
+    items are consumed only when there is a free slot
+    :param func: function called with one item
+    :param items: iterable of items
+    :param concurrency: 'int' number of calls running at the same time
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as _executor:
+        _running = set()
+        for _item in items:
+            if len(_running) >= concurrency:
+                _done, _running = wait(_running, return_when=FIRST_COMPLETED)
+                for _future in _done:
+                    _future.result()
+            _running.add(_executor.submit(func, _item))
+        for _future in _running:
+            _future.result()
+
+
+class BulkReport:
+    """
+    Outcome of a bulk operation
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.retried = 0
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def add(self, done=0, skipped=0, failed=0, retried=0):
+        with self._lock:
+            self.done += done
+            self.skipped += skipped
+            self.failed += failed
+            self.retried += retried
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def throughput(self):
+        """
+        :return: 'float' devices processed successfully per second
+        """
+        if self.elapsed <= 0:
+            return 0.0
+        return self.done / self.elapsed
+
+    def log(self):
+        logger.info(
+            "%s: done %s, skipped %s, failed %s, retried %s in %.1f sec (%.1f devices/sec)"
+            % (
+                self.name,
+                self.done,
+                self.skipped,
+                self.failed,
+                self.retried,
+                self.elapsed,
+                self.throughput,
+            )
+        )
+
+
+class BulkAccept:
+    """
+    Accepts pending devices with a pool of workers fed from the pending list.
+
+    The pending list is re-read while the workers are accepting, accepted
+    devices leave it so the first page keeps bringing new devices. Devices which
+    can't be accepted are remembered and skipped on the next reads.
+    """
+
+    def __init__(
+        self, dev_auth, workers=16, page_size=500, rate=None, retries=0, backoff=0.5
+    ):
+        """
+        :param dev_auth: 'DeviceAuthentication' client
+        :param workers: 'int' number of accepts done at the same time
+        :param page_size: 'int' number of pending devices read at once
+        :param rate: 'float' max accepts per second, None for no limit
+        :param retries: 'int' times a failed accept is retried on top of the
+                        retries done by mender.common for transient errors
+        :param backoff: 'float' seconds to wait before the first retry, doubled
+                        for every following one
+        """
+        self._dev_auth = dev_auth
+        self.workers = workers
+        self.page_size = page_size
+        self.retries = retries
+        self.backoff = backoff
+        self._bucket = ratelimit.TokenBucket(rate, burst=1) if rate else None
+        self._queue = queue.Queue(maxsize=workers * 2)
+        self.report = None
+
+    def run(self, limit=None):
+        """
+        Accepts pending devices until there are none left
+        :param limit: 'int' max number of devices to accept, None for all
+        :return: 'BulkReport' with the accepted/skipped/failed counts
+        """
+        self.report = BulkReport("accept")
+        _threads = [
+            threading.Thread(target=self._worker, daemon=True)
+            for _ in range(self.workers)
+        ]
+        for _thread in _threads:
+            _thread.start()
+        try:
+            self._produce(limit)
+        finally:
+            for _ in _threads:
+                self._queue.put(None)
+            for _thread in _threads:
+                _thread.join()
+        self.report.finished = time.time()
+        stats.statistics.increment("accept.accepted", self.report.done)
+        stats.statistics.increment("accept.skipped", self.report.skipped)
+        stats.statistics.increment("accept.failed", self.report.failed)
+        return self.report
+
+    def _produce(self, limit):
+        _handled = set()
+        _page = 1
+        _failed_reads = 0
+        while limit is None or len(_handled) < limit:
+            _devices = self._dev_auth.get_devices(
+                status="pending", page=_page, per_page=self.page_size
+            )
+            if _devices is None:
+                _failed_reads += 1
+                if _failed_reads > self.retries:
+                    logger.error("Giving up reading the pending devices")
+                    break
+                time.sleep(self.backoff * 2 ** (_failed_reads - 1))
+                continue
+            _failed_reads = 0
+            _new = 0
+            for _device in _devices:
+                if _device["id"] in _handled:
+                    continue
+                if limit is not None and len(_handled) >= limit:
+                    break
+                _handled.add(_device["id"])
+                self._queue.put(_device)
+                _new += 1
+            if _new > 0:
+                # accepted devices leave the list, read the same page again
+                continue
+            if len(_devices) == self.page_size:
+                # the page holds only devices already handled, look further
+                _page += 1
+                continue
+            if self._queue.unfinished_tasks > 0:
+                # end of the list, wait for the accepts and read it again
+                self._queue.join()
+                _page = 1
+                continue
+            break
+        self._queue.join()
+
+    def _worker(self):
+        while True:
+            _device = self._queue.get()
+            try:
+                if _device is None:
+                    return
+                self._accept(_device)
+            except Exception as e:
+                logger.warning("Failed to accept device %s: %s" % (_device["id"], e))
+                self.report.add(failed=1)
+            finally:
+                self._queue.task_done()
+
+    def _accept(self, device):
+        _auth_sets = device.get("auth_sets") or []
+        if len(_auth_sets) != 1:
+            logger.warning(
+                "Skipping device %s due to it has %d auth sets."
+                % (device["id"], len(_auth_sets))
+            )
+            self.report.add(skipped=1)
+            return
+        for _attempt in range(self.retries + 1):
+            if _attempt > 0:
+                self.report.add(retried=1)
+                time.sleep(self.backoff * 2 ** (_attempt - 1) * random.uniform(1, 1.5))
+            if self._bucket is not None:
+                self._bucket.acquire()
+            _result = self._dev_auth.update_device_auth_set_status(
+                device["id"], _auth_sets[0]["id"], "accepted"
+            )
+            if _result is not None:
+                self.report.add(done=1)
+                return
+        self.report.add(failed=1)
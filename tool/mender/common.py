@@ -14,70 +14,256 @@
 #    limitations under the License.
 
 import logging
+import os
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from mender import ratelimit
+from mender import retry as retry_lib
+from mender import stats
 
 
 logger = logging.getLogger()
 
+# size of the connection pool shared by all the clients, it should be at least
+# the number of threads doing calls at the same time
+pool_size = int(os.getenv("MENDER_HTTP_POOL_SIZE", "64"))
+# wait for a free connection instead of opening a throwaway one
+pool_block = os.getenv("MENDER_HTTP_POOL_BLOCK", "false").lower() == "true"
+# "false" closes the connection after every call (old behaviour)
+keep_alive = os.getenv("MENDER_HTTP_KEEP_ALIVE", "true").lower() == "true"
 
-def do_get_call(url, status_code=200, **kwargs):
-    _r = requests.get(url, verify=False, **kwargs)
-    if _r.status_code != status_code:
-        logger.warning(
-            "Call: GET %s. Status code: %s. Content of the response: %s"
-            % (url, _r.status_code, _r.text)
-        )
-        return None
-    try:
-        _content = _r.json()
-    except ValueError:
-        return {}
-    return _content
+# policy applied to all the calls not passing their own one
+retry_policy = retry_lib.default_policy()
 
+_session = None
+_session_lock = threading.Lock()
 
-def do_post_call(url, status_code=200, text=False, **kwargs):
-    _r = requests.post(url, verify=False, **kwargs)
-    if _r.status_code != status_code:
+
+def _new_session():
+    _s = requests.Session()
+    _s.verify = False
+    _adapter = HTTPAdapter(
+        pool_connections=4, pool_maxsize=pool_size, pool_block=pool_block
+    )
+    _s.mount("https://", _adapter)
+    _s.mount("http://", _adapter)
+    if keep_alive:
+        _s.headers["Connection"] = "keep-alive"
+    else:
+        _s.headers["Connection"] = "close"
+    return _s
+
+
+def get_session():
+    """
+    Returns the session shared by all the mender clients. Connections (and the
+    TLS sessions on top of them) are kept in a pool and reused between calls
+    and threads, so only the first calls to a host pay for the handshakes.
+    :return: 'requests.Session' shared session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _new_session()
+    return _session
+
+
+def configure_session(size=None, block=None, alive=None):
+    """
+    Changes the connection pool parameters, the pool is recreated on next call
+    :param size: 'int' max number of kept connections per host
+    :param block: 'boolean' wait for a free connection when the pool is full
+    :param alive: 'boolean' keep connections open between calls
+    """
+    global _session
+    global pool_size
+    global pool_block
+    global keep_alive
+    with _session_lock:
+        if size is not None:
+            pool_size = size
+        if block is not None:
+            pool_block = block
+        if alive is not None:
+            keep_alive = alive
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def configure_retry(policy):
+    """
+    Changes the retry policy applied by default to all the calls
+    :param policy: 'RetryPolicy' new policy, retry.NO_RETRY to disable retries
+    """
+    global retry_policy
+    retry_policy = policy
+
+
+def _expected(status_code):
+    """
+    :param status_code: 'int' or 'tuple' of status codes meaning success
+    :return: 'tuple' of status codes
+    """
+    if isinstance(status_code, tuple):
+        return status_code
+    return (status_code,)
+
+
+def _must_renew(status, expected_status, kwargs, renewed):
+    """
+    Tells whether a 401 was caused by a token which can be renewed, i.e. the
+    headers come from UserAdministration.get_auth_header. It is done only once
+    per call, so wrong credentials don't loop.
+    """
+    return (
+        status == 401
+        and 401 not in _expected(expected_status)
+        and not renewed
+        and hasattr(kwargs.get("headers"), "renew")
+    )
+
+
+def _do_call(
+    method,
+    url,
+    status_code=200,
+    text=False,
+    with_headers=False,
+    retry=None,
+    idempotent=None,
+    **kwargs
+):
+    _policy = retry or retry_policy
+    _service = stats.service_name(url)
+    _started = time.monotonic()
+    _attempt = 0
+    _renewed = False
+    while True:
+        _attempt += 1
+        ratelimit.limiter.acquire(_service)
+        _start = time.perf_counter()
+        try:
+            _r = get_session().request(method, url, verify=False, **kwargs)
+        except (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        ) as e:
+            stats.record(method, url, time.perf_counter() - _start, stats.STATUS_ERROR)
+            _delay = _policy.next_delay(
+                method, _attempt, _started, idempotent=idempotent
+            )
+            if _delay is None:
+                raise
+            logger.debug(
+                "Call: %s %s failed (%s), retrying in %.2f sec"
+                % (method, url, e, _delay)
+            )
+        except requests.exceptions.RequestException:
+            stats.record(method, url, time.perf_counter() - _start, stats.STATUS_ERROR)
+            raise
+        else:
+            stats.record(method, url, time.perf_counter() - _start, _r.status_code)
+            if _must_renew(_r.status_code, status_code, kwargs, _renewed):
+                # the token has expired or was revoked, log in and call again
+                logger.info("Call: %s %s. Token rejected, renewing it" % (method, url))
+                kwargs["headers"] = kwargs["headers"].renew()
+                _renewed = True
+                stats.statistics.increment("auth.renewed")
+                continue
+            if (
+                _r.status_code in _expected(status_code)
+                or _r.status_code not in _policy.status_codes
+            ):
+                break
+            _delay = _policy.next_delay(
+                method,
+                _attempt,
+                _started,
+                retry_after=_r.headers.get("Retry-After"),
+                idempotent=idempotent,
+            )
+            if _delay is None:
+                break
+            logger.debug(
+                "Call: %s %s. Status code: %s, retrying in %.2f sec"
+                % (method, url, _r.status_code, _delay)
+            )
+        stats.record_retry(method, url)
+        time.sleep(_delay)
+    if _r.status_code not in _expected(status_code):
         logger.warning(
-            "Call: POST %s. Status code: %s. Content of the response: %s"
-            % (url, _r.status_code, _r.text)
+            "Call: %s %s. Status code: %s. Content of the response: %s"
+            % (method, url, _r.status_code, _r.text)
         )
-        return None
-    if text:
-        return _r.text
+        _content = None
+    elif text:
+        _content = _r.text
     else:
         try:
             _content = _r.json()
         except ValueError:
-            return {}
-        return _content
+            _content = {}
+    if with_headers:
+        return _content, _r.headers
+    return _content
+
+
+def do_get_call(url, status_code=200, with_headers=False, **kwargs):
+    return _do_call(
+        "GET", url, status_code=status_code, with_headers=with_headers, **kwargs
+    )
+
+
+def do_post_call(url, status_code=200, text=False, **kwargs):
+    return _do_call("POST", url, status_code=status_code, text=text, **kwargs)
 
 
 def do_put_call(url, status_code=200, **kwargs):
-    _r = requests.put(url, verify=False, **kwargs)
-    if _r.status_code != status_code:
-        logger.warning(
-            "Call: PUT %s. Status code: %s. Content of the response: %s"
-            % (url, _r.status_code, _r.text)
-        )
-        return None
-    try:
-        _content = _r.json()
-    except ValueError:
-        return {}
-    return _content
+    return _do_call("PUT", url, status_code=status_code, **kwargs)
+
+
+def do_patch_call(url, status_code=200, **kwargs):
+    return _do_call("PATCH", url, status_code=status_code, **kwargs)
 
 
 def do_delete_call(url, status_code=200, **kwargs):
-    _r = requests.delete(url, verify=False, **kwargs)
-    if _r.status_code != status_code:
-        logger.warning(
-            "Call: DELETE %s. Status code: %s. Content of the response: %s"
-            % (url, _r.status_code, _r.text)
-        )
-        return None
-    try:
-        _content = _r.json()
-    except ValueError:
-        return {}
-    return _content
+    return _do_call("DELETE", url, status_code=status_code, **kwargs)
+
+
+def project(doc, fields):
+    """
+    Keeps only the given fields of a document, nested fields are given with
+    dots and applied to every item of lists, e.g. ("id", "auth_sets.id")
+    :param doc: 'dict' document as returned by the API
+    :param fields: 'iterable' of field names or None to keep the whole document
+    :return: 'dict' projected document
+    """
+    if fields is None:
+        return doc
+    _nested = {}
+    for _field in fields:
+        _name, _, _rest = _field.partition(".")
+        if not _rest:
+            _nested[_name] = None
+        elif _nested.get(_name, []) is not None:
+            _nested.setdefault(_name, []).append(_rest)
+    _result = {}
+    for _name, _rest in _nested.items():
+        if _name not in doc:
+            continue
+        _value = doc[_name]
+        if _rest is None:
+            _result[_name] = _value
+        elif isinstance(_value, list):
+            _result[_name] = [project(_item, _rest) for _item in _value]
+        elif isinstance(_value, dict):
+            _result[_name] = project(_value, _rest)
+        else:
+            _result[_name] = _value
+    return _result
@@ -22,6 +22,17 @@ from mender import common
 logger = logging.getLogger("deployments")
 
 
+def location_id(headers):
+    """
+    :param headers: response headers of a created deployment
+    :return: 'string' id at the end of the Location header, None if missing
+    """
+    _location = (headers or {}).get("Location")
+    if not _location:
+        return None
+    return _location.rstrip("/").rsplit("/", 1)[-1]
+
+
 class Deployments:
     _user_adm = None
 
@@ -45,6 +56,7 @@ class Deployments:
         + DELETE /artifacts/{id}
         + GET /artifacts/{id}/download
         + POST /deployments
+        + POST /deployments/group/{name}
         + GET /deployments
         + DELETE /deployments/devices/{id}
         + GET /deployments/releases
@@ -118,7 +130,13 @@ class Deployments:
             _url, status_code=204, json=_data, headers=self._user_adm.get_auth_header()
         )
 
-    def create_deployment(self, deployment_name, artifact_name, device_ids_list):
+    def create_deployment(
+        self, deployment_name, artifact_name, device_ids_list, with_headers=False
+    ):
+        """
+        :param with_headers: 'boolean' return the response headers too, the id
+                             of the deployment is read with location_id()
+        """
         # POST /deployments
         if not isinstance(device_ids_list, list):
             raise ValueError(
@@ -136,6 +154,28 @@ class Deployments:
             _url,
             status_code=201,
             json=_deployment,
+            with_headers=with_headers,
+            headers=self._user_adm.get_auth_header(),
+        )
+
+    def create_deployment_for_group(
+        self, deployment_name, artifact_name, group_name, with_headers=False
+    ):
+        # POST /deployments/group/{name}
+        _deployment = {
+            "artifact_name": artifact_name,
+            "name": deployment_name,
+            "group": group_name,
+        }
+        _url = "%s/api/management/v1/deployments/deployments/group/%s" % (
+            self._user_adm.server_url,
+            group_name,
+        )
+        return common.do_post_call(
+            _url,
+            status_code=201,
+            json=_deployment,
+            with_headers=with_headers,
             headers=self._user_adm.get_auth_header(),
         )
 
@@ -147,12 +187,31 @@ class Deployments:
         )
         return common.do_get_call(_url, headers=self._user_adm.get_auth_header())
 
-    def get_deployments(self):
+    def get_deployments(self, search=None, page=None, per_page=None, sort=None):
+        """
+        :param search: 'string' only the deployments with this name
+        :param page: 'int' page number, starting at 1
+        :param per_page: 'int' number of deployments per page
+        :param sort: 'string' 'desc' for the newest first, 'asc' for the oldest
+        :return: 'list' of deployments, the first page only unless paged
+        """
         # GET /deployments
         _url = (
             "%s/api/management/v1/deployments/deployments" % self._user_adm.server_url
         )
-        return common.do_get_call(_url, headers=self._user_adm.get_auth_header())
+        _params = {
+            _name: _value
+            for _name, _value in (
+                ("search", search),
+                ("page", page),
+                ("per_page", per_page),
+                ("sort", sort),
+            )
+            if _value is not None
+        }
+        return common.do_get_call(
+            _url, params=_params, headers=self._user_adm.get_auth_header()
+        )
 
     def get_artifact(self, artifact_id):
         # GET /artifacts/{id}
@@ -191,6 +250,18 @@ class Deployments:
         )
         return common.do_get_call(_url, headers=self._user_adm.get_auth_header())
 
+    def get_deployment_devices_list(
+        self, deployment_id, status=None, page=1, per_page=20
+    ):
+        # GET /deployments/{deployment_id}/devices/list
+        _url = (
+            "%s/api/management/v1/deployments/deployments/%s/devices/list?page=%s&per_page=%s"
+            % (self._user_adm.server_url, deployment_id, page, per_page)
+        )
+        if status is not None:
+            _url = "%s&status=%s" % (_url, status)
+        return common.do_get_call(_url, headers=self._user_adm.get_auth_header())
+
     def get_deployment_device_log(self, deployment_id, device_id):
         # GET /deployments/{deployment_id}/devices/{device_id}/log
         _url = "%s/api/management/v1/deployments/deployments/%s/devices/%s/log" % (
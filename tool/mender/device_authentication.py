@@ -19,6 +19,7 @@ import time
 from requests_futures.sessions import FuturesSession
 
 from mender import common
+from mender import paging
 
 
 logger = logging.getLogger("device-authentication")
@@ -52,7 +53,15 @@ class DeviceAuthentication:
         + DELETE /tokens/{id}
     """
 
-    def post_preauthorized_device(self, public_key, mac=None, sku=None, sn=None):
+    def post_preauthorized_device(
+        self, public_key, mac=None, sku=None, sn=None, ignore_existing=False
+    ):
+        """
+        :param ignore_existing: 'boolean' a device already preauthorized with the
+                                same identity is a success, which also makes the
+                                call safe to retry
+        :return: 'dict' empty on success, None on failure
+        """
         # POST /devices
         _url = "%s/api/management/v2/devauth/devices" % self._user_adm.server_url
         _identity_data = {}
@@ -63,8 +72,12 @@ class DeviceAuthentication:
         if sn:
             _identity_data["sn"] = sn
         _body = {"identity_data": _identity_data, "pubkey": public_key}
-        common.do_post_call(
-            _url, status_code=201, json=_body, headers=self._user_adm.get_auth_header()
+        return common.do_post_call(
+            _url,
+            status_code=(201, 409) if ignore_existing else 201,
+            idempotent=ignore_existing or None,
+            json=_body,
+            headers=self._user_adm.get_auth_header(),
         )
 
     def delete_device(self, device_id):
@@ -80,7 +93,7 @@ class DeviceAuthentication:
 
     def delete_all_devices(self, device_ids):
         # DELETE /devices/{id}
-        with FuturesSession(max_workers=20) as session:
+        with FuturesSession(max_workers=20, session=common.get_session()) as session:
             for device_id in device_ids:
                 session.delete(
                     url="%s/api/management/v2/devauth/devices/%s"
@@ -124,26 +137,86 @@ class DeviceAuthentication:
         # GET /devices
         return self._get_devices(status=status, page=page, per_page=per_page)
 
-    def get_all_devices(self, status):
+    def get_all_devices(self, status, prefetch=8, strict=True):
         # GET /devices
-        _devices = []
+        _devices = list(
+            self.iter_devices(status=status, prefetch=prefetch, strict=strict)
+        )
+        logger.debug("Devices count: %s" % len(_devices))
+        return _devices
+
+    def device_fetcher(self, status, per_page=500, prefetch=8, strict=True):
+        """
+        :param status: 'string' devices status
+        :param per_page: 'int' number of devices per page
+        :param prefetch: 'int' number of pages requested concurrently
+        :param strict: 'boolean' raise paging.PagingError when a page fails,
+                       otherwise check 'failed_pages' and 'consistent' after
+                       the iteration
+        :return: 'paging.PagedFetcher' of the pages of devices
+        """
+        # GET /devices
+        return paging.PagedFetcher(
+            fetch_page=lambda page, per_page: self._get_devices(
+                status=status, page=page, per_page=per_page
+            ),
+            get_count=lambda: self.get_devices_count(status=status),
+            per_page=per_page,
+            window=prefetch,
+            strict=strict,
+        )
+
+    def iter_pages(self, status, per_page=500, prefetch=0, strict=True):
+        """
+        Yields the pages of devices one by one, the next page is requested only
+        when the previous one has been consumed
+        :param status: 'string' devices status
+        :param per_page: 'int' number of devices per page
+        :param prefetch: 'int' number of pages requested concurrently, 0 to
+                         request them one by one
+        :param strict: 'boolean' raise paging.PagingError when a page fails,
+                       otherwise the listing stops there
+        :return: 'generator' of 'list' of device documents
+        """
+        # GET /devices
+        if prefetch:
+            yield from self.device_fetcher(
+                status=status, per_page=per_page, prefetch=prefetch, strict=strict
+            )
+            return
         _page = 1
         while True:
             _start = time.time()
-            _resp_json = self._get_devices(status=status, page=_page, per_page=500)
+            _resp_json = self._get_devices(status=status, page=_page, per_page=per_page)
+            if _resp_json is None and strict:
+                raise paging.PagingError("Failed to fetch page %s" % _page)
             if not _resp_json:
                 break
-            if len(_resp_json) == 0:
-                break
-            for doc in _resp_json:
-                _devices.append(doc)
             _end = time.time()
             logger.debug(
                 "Page '%s' fetched for: '%s' sec" % (_page, round(_end - _start, 2))
             )
+            yield _resp_json
+            if len(_resp_json) < per_page:
+                break
             _page += 1
-        logger.debug("Devices count: %s" % len(_devices))
-        return _devices
+
+    def iter_devices(self, status, per_page=500, fields=None, prefetch=0, strict=True):
+        """
+        Yields the devices one by one without keeping the whole list in memory
+        :param status: 'string' devices status
+        :param per_page: 'int' number of devices per page
+        :param fields: 'iterable' of fields to keep, e.g. ("id", "auth_sets.id")
+        :param prefetch: 'int' number of pages requested concurrently
+        :param strict: 'boolean' raise paging.PagingError when a page fails
+        :return: 'generator' of device documents
+        """
+        # GET /devices
+        for _devices in self.iter_pages(
+            status=status, per_page=per_page, prefetch=prefetch, strict=strict
+        ):
+            for _device in _devices:
+                yield common.project(_device, fields)
 
     def _get_devices(self, status, page, per_page):
         # GET /devices
@@ -161,6 +234,8 @@ class DeviceAuthentication:
         if status is not None:
             _url = "%s?status=%s" % (_url, status)
         data = common.do_get_call(_url, headers=self._user_adm.get_auth_header())
+        if data is None:
+            return None
         return data.get("count") or 0
 
     def get_device_auth_set_status(self, device_id, auth_set_id):
@@ -202,13 +277,13 @@ class DeviceAuthentication:
         for device in devices:
             if len(device["auth_sets"]) > 1:
                 logger.warning(
-                    "Skipping device %s due to it has %d auth sets." % device,
-                    len(device["auth_sets"]),
+                    "Skipping device %s due to it has %d auth sets."
+                    % (device["id"], len(device["auth_sets"]))
                 )
                 continue
             if len(device["auth_sets"]) == 0:
                 logger.warning(
-                    "Skipping device %s due to it has none auth sets." % device
+                    "Skipping device %s due to it has none auth sets." % device["id"]
                 )
                 continue
 
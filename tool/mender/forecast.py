@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import math
+
+from mender import stats
+
+
+# default lifetime of the device tokens issued by deviceauth (1 week)
+DEFAULT_TOKEN_LIFETIME = 604800
+# status updates sent by a device installing a deployment, see simulator
+DEPLOYMENT_STEPS = ("downloading", "installing", "rebooting", "success")
+
+# device API calls of the simulated devices and the stress test clients
+_ROUTES = {
+    "auth": ("POST", "/api/devices/v1/authentication/auth_requests"),
+    "inventory": ("PATCH", "/api/devices/v1/inventory/device/attributes"),
+    "next": ("GET", "/api/devices/v1/deployments/device/deployments/next"),
+    "status": ("PUT", "/api/devices/v1/deployments/device/deployments/0/status"),
+}
+# endpoint keys of mender.stats, so the forecast and a run can be compared
+ENDPOINTS = {
+    _name: stats.route_key(_method, "http://localhost" + _path)
+    for _name, (_method, _path) in _ROUTES.items()
+}
+
+
+class Series:
+    """
+    Calls of 'count' devices starting uniformly over [start, start + spread],
+    every device doing its calls 'shift' + k * 'period' seconds after its
+    start, for k from 'first' to 'last' (None for no end)
+    """
+
+    def __init__(
+        self, endpoint, count, start, spread, period=None, first=0, last=0, shift=0
+    ):
+        self.endpoint = endpoint
+        self.count = count
+        self.start = start
+        self.spread = spread
+        self.period = period
+        self.first = first
+        self.last = last
+        self.shift = shift
+
+    @property
+    def endless(self):
+        return self.period is not None and self.last is None
+
+    def _ks(self, low, high):
+        """
+        :return: 'range' of the k whose wave of calls [low, high] overlaps
+        """
+        _origin = self.start + self.shift
+        if self.period is None:
+            return range(
+                0, 1 if low <= _origin + self.spread and high >= _origin else 0
+            )
+        _first = max(self.first, math.ceil((low - _origin - self.spread) / self.period))
+        _last = math.floor((high - _origin) / self.period)
+        if self.last is not None:
+            _last = min(_last, self.last)
+        return range(_first, _last + 1)
+
+    def rate(self, time):
+        """
+        :return: 'float' calls per second at the given time
+        """
+        _origin = self.start + self.shift
+        if self.period is None:
+            _waves = 1 if _origin <= time < _origin + self.spread else 0
+        else:
+            # waves started in (time - spread, time]
+            _first = max(
+                self.first, math.floor((time - _origin - self.spread) / self.period) + 1
+            )
+            _last = math.floor((time - _origin) / self.period)
+            if self.last is not None:
+                _last = min(_last, self.last)
+            _waves = max(_last - _first + 1, 0)
+        return _waves * self.count / self.spread
+
+    def calls(self, duration):
+        """
+        :return: 'float' expected number of calls in [0, duration]
+        """
+        _origin = self.start + self.shift
+        _calls = 0.0
+        for _k in self._ks(0, duration):
+            _low = _origin + _k * (self.period or 0)
+            _overlap = min(_low + self.spread, duration) - max(_low, 0)
+            _calls += max(_overlap, 0) / self.spread * self.count
+        return _calls
+
+    def edges(self, low, high):
+        """
+        :return: 'list' of the times in [low, high] a wave starts or ends, the
+                 rate only changes there
+        """
+        _origin = self.start + self.shift
+        _times = []
+        for _edge in (_origin, _origin + self.spread):
+            if self.period is None:
+                _ks = range(1)
+            else:
+                _first = max(self.first, math.ceil((low - _edge) / self.period))
+                _last = math.floor((high - _edge) / self.period)
+                if self.last is not None:
+                    _last = min(_last, self.last)
+                _ks = range(_first, _last + 1)
+            for _k in _ks:
+                _time = _edge + _k * (self.period or 0)
+                if low <= _time <= high:
+                    _times.append(_time)
+        return _times
+
+    def events(self):
+        """
+        :return: 'list' of the times the series starts, ends or changes
+                 pattern, i.e. the edges of its first wave (or of all its waves
+                 when they are few)
+        """
+        _origin = self.start + self.shift
+        if self.period is None:
+            return [_origin, _origin + self.spread]
+        _last = self.first if self.last is None else self.last
+        return [
+            _origin + _k * self.period + _offset
+            for _k in range(self.first, _last + 1)
+            for _offset in (0, self.spread)
+        ]
+
+    def steady_after(self):
+        """
+        :return: 'float' time after which all the devices have done their first
+                 calls, the calls are periodic from there or are over for the
+                 series which end
+        """
+        _end = self.start + self.shift + self.spread
+        if self.period is not None and self.last is not None:
+            _end += self.last * self.period
+        return _end
+
+
+class LoadForecast:
+    """
+    Expected load of a fleet of simulated devices (or stress test clients) on
+    the device API.
+
+    Every device starts at a random time over 'startup_interval', sends an
+    auth request and its inventory, then polls for deployments every
+    'poll_interval' and sends its inventory every 'inventory_interval'. Its
+    token is renewed after the first poll following its expiry, the rejected
+    poll being sent again. A deployment is picked up at the first poll after
+    its creation, and installed with a status update per step, each one a
+    random 0..'wait' seconds after the previous one.
+    """
+
+    def __init__(
+        self,
+        devices,
+        startup_interval=1750,
+        poll_interval=1800,
+        inventory_interval=28800,
+        token_lifetime=DEFAULT_TOKEN_LIFETIME,
+        accept_delay=0,
+        auth_retry=60,
+        deployment_devices=0,
+        deployment_start=None,
+        wait=30,
+        window=1,
+    ):
+        """
+        :param devices: 'int' number of devices
+        :param startup_interval: 'float' seconds over which the devices start
+        :param poll_interval: 'float' seconds between two deployment polls
+        :param inventory_interval: 'float' seconds between two inventory updates
+        :param token_lifetime: 'float' seconds the device tokens are valid
+        :param accept_delay: 'float' seconds a device waits to be accepted, 0
+                             when preauthorized
+        :param auth_retry: 'float' seconds between auth requests while pending
+        :param deployment_devices: 'int' devices targeted by a deployment, 0 for
+                                   no deployment
+        :param deployment_start: 'float' seconds after the start of the fleet
+                                 the deployment is created, defaults to once
+                                 all the devices have started
+        :param wait: 'float' max seconds between two steps of a deployment
+        :param window: 'float' seconds over which the peaks are measured
+        """
+        self.devices = devices
+        self.startup_interval = startup_interval
+        self.poll_interval = poll_interval
+        self.inventory_interval = inventory_interval
+        self.token_lifetime = token_lifetime
+        self.accept_delay = accept_delay
+        self.auth_retry = auth_retry
+        self.deployment_devices = min(deployment_devices, devices)
+        self.deployment_start = deployment_start
+        if self.deployment_start is None:
+            self.deployment_start = startup_interval + accept_delay
+        self.wait = wait
+        self.window = window
+        self.fleet = self._fleet_series()
+        self.deployment = self._deployment_series()
+        self.series = self.fleet + self.deployment
+
+    @property
+    def renew_interval(self):
+        """
+        :return: 'float' seconds between two auth requests of a device, the
+                 token is renewed at the first poll after it has expired
+        """
+        return self.poll_interval * math.ceil(self.token_lifetime / self.poll_interval)
+
+    @property
+    def spread(self):
+        # starting all the devices at once is seen as one burst per window
+        return max(self.startup_interval, self.window)
+
+    def _fleet_series(self):
+        _n = self.devices
+        _spread = self.spread
+        _ready = self.accept_delay
+        _series = [
+            Series("auth", _n, 0, _spread),
+            Series(
+                "inventory", _n, 0, _spread, self.inventory_interval, 0, None, _ready
+            ),
+            Series("next", _n, 0, _spread, self.poll_interval, 0, None, _ready),
+            Series("auth", _n, 0, _spread, self.renew_interval, 1, None, _ready),
+            # the poll rejected because of the expired token is sent again
+            Series("next", _n, 0, _spread, self.renew_interval, 1, None, _ready),
+        ]
+        _retries = int(self.accept_delay // self.auth_retry) if self.auth_retry else 0
+        if _retries > 0:
+            _series.append(Series("auth", _n, 0, _spread, self.auth_retry, 1, _retries))
+        return _series
+
+    def _deployment_series(self):
+        """
+        The devices started before the deployment pick it up over the next
+        poll interval, the others when they start. Every step is sent on
+        average wait/2 seconds after the previous one.
+        """
+        if self.deployment_devices <= 0:
+            return []
+        _created = self.deployment_start
+        _ready = self.accept_delay
+        _started = min(max((_created - _ready) / self.spread, 0), 1)
+        _pickups = []
+        if _started > 0:
+            _pickups.append(
+                (self.deployment_devices * _started, _created, self.poll_interval)
+            )
+        if _started < 1:
+            _pickups.append(
+                (
+                    self.deployment_devices * (1 - _started),
+                    max(_created, _ready),
+                    _ready + self.spread - max(_created, _ready),
+                )
+            )
+        _series = []
+        for _count, _start, _spread in _pickups:
+            _spread = max(_spread, self.window)
+            for _step in range(1, len(DEPLOYMENT_STEPS) + 1):
+                _series.append(
+                    Series(
+                        "status", _count, _start, _spread, shift=_step * self.wait / 2
+                    )
+                )
+            # the new artifact is sent with the inventory after the success
+            _series.append(
+                Series(
+                    "inventory",
+                    _count,
+                    _start,
+                    _spread,
+                    shift=len(DEPLOYMENT_STEPS) * self.wait / 2,
+                )
+            )
+        return _series
+
+    @property
+    def steady_after(self):
+        """
+        :return: 'float' seconds after which all the devices have started and
+                 the load only repeats with the poll, inventory and token
+                 periods, the deployment left aside
+        """
+        return max(_series.steady_after() for _series in self.fleet)
+
+    @property
+    def deployment_end(self):
+        """
+        :return: 'float' seconds after which all the devices have installed
+                 the deployment, on average, None without deployment
+        """
+        if not self.deployment:
+            return None
+        return max(_series.steady_after() for _series in self.deployment)
+
+    def instants(self):
+        """
+        The rates are piecewise constant, they are evaluated at every edge of
+        the waves around the times something changes: the fleet starts, ends
+        its ramp up, renews its tokens or installs the deployment. The periodic
+        load in between repeats what is seen around these times.
+        :return: 'list' of sorted times
+        """
+        _cycle = 2 * max(self.poll_interval, self.inventory_interval) + 2 * self.wait
+        _events = {0, self.steady_after}
+        for _series in self.series:
+            _events.update(_series.events())
+        _times = set()
+        for _event in _events:
+            for _series in self.series:
+                _times.update(_series.edges(max(_event - _cycle, 0), _event + _cycle))
+        return sorted(_times)
+
+    def steady_rates(self):
+        """
+        :return: 'dict' endpoint to mean calls per second once steady
+        """
+        _rates = dict.fromkeys(_ROUTES, 0.0)
+        for _series in self.series:
+            if _series.endless:
+                _rates[_series.endpoint] += _series.count / _series.period
+        return _rates
+
+    def rates(self, time):
+        _rates = dict.fromkeys(_ROUTES, 0.0)
+        for _series in self.series:
+            _rates[_series.endpoint] += _series.rate(time)
+        return _rates
+
+    def peaks(self):
+        """
+        :return: 'tuple' of 'dict' endpoint to peak calls per second and to the
+                 time of the peak, and the peak of all the endpoints together
+                 with its time
+        """
+        _peaks = dict.fromkeys(_ROUTES, 0.0)
+        _peak_times = dict.fromkeys(_ROUTES, 0.0)
+        _total = (0.0, 0.0)
+        for _time in self.instants():
+            _rates = self.rates(_time)
+            for _endpoint, _rate in _rates.items():
+                if _rate > _peaks[_endpoint]:
+                    _peaks[_endpoint] = _rate
+                    _peak_times[_endpoint] = _time
+            if sum(_rates.values()) > _total[0]:
+                _total = (sum(_rates.values()), _time)
+        return _peaks, _peak_times, _total
+
+    def calls(self, duration):
+        """
+        :return: 'dict' endpoint to expected number of calls in [0, duration]
+        """
+        _calls = dict.fromkeys(_ROUTES, 0.0)
+        for _series in self.series:
+            _calls[_series.endpoint] += _series.calls(duration)
+        return _calls
+
+    def report(self):
+        _steady = self.steady_rates()
+        _peaks, _peak_times, _total = self.peaks()
+        _endpoints = {
+            ENDPOINTS[_endpoint]: {
+                "steady_rps": round(_steady[_endpoint], 3),
+                "peak_rps": round(_peaks[_endpoint], 3),
+                "peak_at": round(_peak_times[_endpoint], 1),
+            }
+            for _endpoint in _ROUTES
+        }
+        _services = {}
+        for _key, _values in _endpoints.items():
+            _service = _services.setdefault(
+                _key.split()[0], {"steady_rps": 0.0, "peak_rps": 0.0}
+            )
+            _service["steady_rps"] = round(
+                _service["steady_rps"] + _values["steady_rps"], 3
+            )
+            # peaks of different endpoints may not coincide, their sum is an
+            # upper bound
+            _service["peak_rps"] = round(_service["peak_rps"] + _values["peak_rps"], 3)
+        return {
+            "devices": self.devices,
+            "startup_interval": self.startup_interval,
+            "poll_interval": self.poll_interval,
+            "inventory_interval": self.inventory_interval,
+            "token_lifetime": self.token_lifetime,
+            "renew_interval": self.renew_interval,
+            "steady_after": round(self.steady_after, 1),
+            "deployment_end": self.deployment_end,
+            "steady_rps": round(sum(_steady.values()), 3),
+            "peak_rps": round(_total[0], 3),
+            "peak_at": round(_total[1], 1),
+            "endpoints": _endpoints,
+            "services": _services,
+        }
+
+
+def compare(forecast, statistics, tolerance=0.1, offset=0):
+    """
+    Compares the calls expected by the forecast with the ones of a run
+    :param forecast: 'LoadForecast' of the run
+    :param statistics: 'stats.Statistics' of the run
+    :param tolerance: 'float' accepted relative shortfall, e.g. 0.1 for 10%
+    :param offset: 'float' seconds between the start of the statistics and the
+                   start of the fleet
+    :return: 'list' of 'dict' per endpoint: expected and measured calls and
+             rates, and whether the load generator fell short
+    """
+    _duration = (statistics.finished or statistics.started) - statistics.started
+    _expected = forecast.calls(max(_duration - offset, 0))
+    _rows = []
+    for _endpoint, _key in ENDPOINTS.items():
+        _histogram = statistics.histograms.get(_key)
+        _measured = _histogram.count if _histogram is not None else 0
+        _row = {
+            "endpoint": _key,
+            "expected_calls": round(_expected[_endpoint], 1),
+            "measured_calls": _measured,
+            "expected_rps": round(_expected[_endpoint] / _duration, 3)
+            if _duration > 0
+            else 0.0,
+            "measured_rps": round(_measured / _duration, 3) if _duration > 0 else 0.0,
+            "short": _measured < _expected[_endpoint] * (1 - tolerance),
+        }
+        _rows.append(_row)
+    return _rows
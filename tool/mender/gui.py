@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import logging
+import random
+import threading
+import time
+
+from mender import device_authentication
+from mender import stats
+from mender import user_administration
+
+# the mender package shadows these modules with its default clients
+from mender.inventory import Inventory
+from mender.inventory_v2 import InventoryV2
+
+
+logger = logging.getLogger("gui")
+
+# actions of a user browsing the devices list, with their relative weights
+ACTIONS = {
+    "next_page": 4,
+    "prev_page": 2,
+    "last_page": 1,
+    "goto_page": 1,
+    "expand_device": 3,
+    "change_page_size": 1,
+}
+# page sizes offered by the devices list
+PAGE_SIZES = (10, 20, 50, 100, 250, 500)
+# accepted devices, as listed in the "Devices" tab
+ACCEPTED_FILTER = [
+    {"scope": "identity", "attribute": "status", "type": "$eq", "value": "accepted"}
+]
+# columns of the devices list
+LIST_ATTRIBUTES = [
+    {"scope": "identity", "attribute": "status"},
+    {"scope": "identity", "attribute": "mac"},
+    {"scope": "inventory", "attribute": "artifact_name"},
+    {"scope": "inventory", "attribute": "device_type"},
+    {"scope": "system", "attribute": "updated_ts"},
+]
+
+
+class GuiUser:
+    """
+    One user of the GUI browsing the accepted devices as in TEST 201: it opens
+    the devices tab, then goes to other pages, expands devices and changes the
+    page size, with a think time between two actions. Every action does the
+    calls the GUI does for it, and its latency (all its calls) is recorded in
+    the statistics as "gui <action>".
+    """
+
+    def __init__(self, user_adm, page_size=50, think_time=(2, 10), seed=None):
+        """
+        :param user_adm: 'UserAdministration' with the credentials of the user
+        :param page_size: 'int' devices per page at the beginning
+        :param think_time: 'tuple' min and max seconds between two actions
+        :param seed: 'int' seed of the random choices, to replay the same ones
+        """
+        self._dev_auth = device_authentication.DeviceAuthentication(user_adm=user_adm)
+        self._inventory = Inventory(user_adm=user_adm)
+        self._inventory_v2 = InventoryV2(user_adm=user_adm)
+        self.page_size = page_size
+        self.think_time = think_time
+        self.random = random.Random(seed)
+        self.page = 1
+        self.total = 0
+        self.devices = []
+
+    @property
+    def pages(self):
+        return max((self.total + self.page_size - 1) // self.page_size, 1)
+
+    def _list_page(self):
+        _result = self._inventory_v2.search_devices(
+            filters=ACCEPTED_FILTER,
+            page=self.page,
+            per_page=self.page_size,
+            attributes=LIST_ATTRIBUTES,
+            with_headers=True,
+        )
+        _devices, _headers = _result
+        if _devices is None:
+            return False
+        self.devices = _devices
+        self.total = int(_headers.get("X-Total-Count", self.total))
+        return True
+
+    def open_devices_tab(self):
+        # GET /devices/count, for the pending/rejected badges
+        _ok = self._dev_auth.get_devices_count(status="pending") is not None
+        # GET /filters and GET /groups, for the groups sidebar
+        _ok = self._inventory_v2.get_filters() is not None and _ok
+        _ok = self._inventory.get_groups() is not None and _ok
+        # POST /filters/search
+        return self._list_page() and _ok
+
+    def next_page(self):
+        self.page = min(self.page + 1, self.pages)
+        return self._list_page()
+
+    def prev_page(self):
+        self.page = max(self.page - 1, 1)
+        return self._list_page()
+
+    def last_page(self):
+        self.page = self.pages
+        return self._list_page()
+
+    def goto_page(self):
+        self.page = self.random.randint(1, self.pages)
+        return self._list_page()
+
+    def expand_device(self):
+        if not self.devices:
+            return True
+        _id = self.random.choice(self.devices)["id"]
+        # GET /devices/{id} from devauth and inventory
+        _ok = self._dev_auth.get_device(_id) is not None
+        return self._inventory.get_device(_id) is not None and _ok
+
+    def change_page_size(self):
+        self.page_size = self.random.choice(PAGE_SIZES)
+        self.page = 1
+        return self._list_page()
+
+    def do(self, action):
+        """
+        Does one action and records its latency
+        :param action: 'string' one of ACTIONS or "open_devices_tab"
+        """
+        _method = getattr(self, action)
+        _start = time.perf_counter()
+        try:
+            _ok = _method()
+        except Exception as e:
+            logger.debug("Action %s failed: %r" % (action, e))
+            _ok = False
+        stats.statistics.record(
+            "gui %s" % action,
+            time.perf_counter() - _start,
+            stats.STATUS_OK if _ok else stats.STATUS_ERROR,
+        )
+        return _ok
+
+    def run(self, duration):
+        """
+        Browses the devices list for 'duration' seconds
+        """
+        _deadline = time.monotonic() + duration
+        self.do("open_devices_tab")
+        _names = list(ACTIONS)
+        _weights = [ACTIONS[_name] for _name in _names]
+        while True:
+            _think = self.random.uniform(*self.think_time)
+            if time.monotonic() + _think >= _deadline:
+                break
+            time.sleep(_think)
+            self.do(self.random.choices(_names, _weights)[0])
+
+
+class GuiEmulator:
+    """
+    Runs 'users' GUI users at the same time, each one logged in with its own
+    session token and starting at a random time in the first think time
+    """
+
+    def __init__(
+        self,
+        email,
+        password,
+        server_url,
+        users=1,
+        page_size=50,
+        think_time=(2, 10),
+        seed=None,
+    ):
+        """
+        :param email: 'string' user of the GUI, shared by all the emulated users
+        :param password: 'string' password of the user
+        :param server_url: 'string' URL of the backend
+        :param users: 'int' number of users browsing at the same time
+        :param page_size: 'int' devices per page at the beginning
+        :param think_time: 'tuple' min and max seconds between two actions
+        :param seed: 'int' seed of the random choices, None for new ones
+        """
+        self.email = email
+        self.password = password
+        self.server_url = server_url
+        self.users = users
+        self.page_size = page_size
+        self.think_time = think_time
+        self.seed = seed
+
+    def _run_user(self, index, duration):
+        _seed = None if self.seed is None else self.seed + index
+        _user = GuiUser(
+            user_administration.UserAdministration(
+                email=self.email, password=self.password, server_url=self.server_url
+            ),
+            page_size=self.page_size,
+            think_time=self.think_time,
+            seed=_seed,
+        )
+        _delay = _user.random.uniform(0, self.think_time[0])
+        time.sleep(_delay)
+        _user.run(duration - _delay)
+
+    def run(self, duration=300):
+        """
+        :param duration: 'float' seconds every user browses the devices list
+        """
+        logger.info("Starting %d GUI users for %d sec" % (self.users, duration))
+        _threads = [
+            threading.Thread(target=self._run_user, args=(_index, duration))
+            for _index in range(self.users)
+        ]
+        for _thread in _threads:
+            _thread.start()
+        for _thread in _threads:
+            _thread.join()
+        logger.info("GUI users finished")
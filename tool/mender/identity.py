@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import bisect
+import re
+
+
+# identity attributes sent by the simulated devices and preauthorized for them
+DEFAULT_FIELDS = ("mac", "sku", "sn")
+DEFAULT_SKU = "mender-stress-test"
+# devices of one instance of stress clients (DEVICES_PER_INSTANCE), it divides
+# the blocks of the predefined filters and sets the indexes of every instance
+DEVICES_PER_INSTANCE = 6250
+
+
+def mac_address(index):
+    """
+    :param index: 'int' index of the device in the fleet
+    :return: 'string' locally administered MAC address unique per index
+    """
+    return "02:00:%02x:%02x:%02x:%02x" % tuple(
+        (index >> _shift) & 0xFF for _shift in (24, 16, 8, 0)
+    )
+
+
+def serial_number(index):
+    return "SN%010d" % index
+
+
+def device_identity(index, fields=DEFAULT_FIELDS, sku=DEFAULT_SKU, layout=None):
+    """
+    Identity data of a device, the same for a given index every time
+    :param index: 'int' index of the device in the fleet
+    :param fields: 'tuple' attributes to include, among "mac", "sku" and "sn"
+    :param sku: 'string' value of the "sku" attribute
+    :param layout: 'FiltersLayout' giving the MAC addresses, None for sequential
+                   addresses
+    :return: 'dict' identity data
+    """
+    _identity = {}
+    if "mac" in fields:
+        if layout is not None:
+            _identity["mac"] = layout.mac_address(index)
+        else:
+            _identity["mac"] = mac_address(index)
+    if "sku" in fields:
+        _identity["sku"] = sku
+    if "sn" in fields:
+        _identity["sn"] = serial_number(index)
+    return _identity
+
+
+def parse_fields(value):
+    """
+    :param value: 'string' attributes separated by commas, e.g. "mac,sn"
+    :return: 'tuple' attributes
+    """
+    _fields = tuple(_field.strip() for _field in value.split(",") if _field.strip())
+    for _field in _fields:
+        if _field not in ("mac", "sku", "sn"):
+            raise ValueError("unknown identity attribute '%s'" % _field)
+    return _fields
+
+
+def parse_size(name):
+    """
+    :param name: 'string' filter name starting with its size, e.g. "12.5k_..."
+    :return: 'int' number of devices the filter is meant to match
+    """
+    _match = re.match(r"(\d+(?:\.\d+)?)k_", name)
+    if _match is None:
+        raise ValueError("no size at the beginning of the filter name '%s'" % name)
+    return int(round(float(_match.group(1)) * 1000))
+
+
+class FilterSpec:
+    """
+    Family of filters on the device groups: one filter per MAC prefix, matching
+    the devices of the groups with a MAC address starting with the prefix, or a
+    single filter on the groups when there are no prefixes. The number of
+    devices every filter has to match is the one in its name.
+    """
+
+    def __init__(self, name, groups, mac_prefixes=None):
+        """
+        :param name: 'string' name of the filters, with a %s for the MAC prefix
+        :param groups: 'tuple' values of the device_group inventory attribute
+        :param mac_prefixes: 'tuple' first byte of the MAC addresses, in hex
+        """
+        self.name = name
+        self.groups = groups
+        self.mac_prefixes = mac_prefixes
+        self.size = parse_size(name)
+
+    def prefixes(self):
+        """
+        :return: 'list' MAC prefix of every filter of the family, None for all
+        """
+        return list(self.mac_prefixes or [None])
+
+    def to_filter(self, mac_prefix=None):
+        """
+        :return: 'dict' filter as expected by InventoryV2.post_filter()
+        """
+        _group_term = {
+            "attribute": "device_group",
+            "scope": "inventory",
+            "type": "$eq",
+            "value": self.groups[0],
+        }
+        if len(self.groups) > 1:
+            _group_term["type"] = "$in"
+            _group_term["value"] = list(self.groups)
+        if mac_prefix is None:
+            return {"name": self.name, "terms": [_group_term]}
+        return {
+            "name": self.name % mac_prefix,
+            "terms": [
+                _group_term,
+                {
+                    "attribute": "mac",
+                    "scope": "identity",
+                    "type": "$regex",
+                    "value": mac_prefix + ":00:00:.*",
+                },
+            ],
+        }
+
+
+# the dynamic groups used by the tests, created by testenv_control.py
+PREDEFINED_FILTERS = (
+    FilterSpec("12.5k_group1_mac_%s", ("group1",), ("ff", "ee", "dd", "cc")),
+    FilterSpec("25k_group23_mac_%s", ("group2", "group3"), ("ff", "ee", "dd", "cc")),
+    FilterSpec(
+        "37.5k_group23_mac_%s",
+        ("group1", "group2", "group3"),
+        ("bb", "aa", "99", "88"),
+    ),
+    FilterSpec(
+        "50k_group4567_mac_%s",
+        ("group4", "group5", "group6", "group7"),
+        ("ff", "ee", "dd", "cc"),
+    ),
+    FilterSpec(
+        "75k_group4567_mac_%s",
+        ("group4", "group5", "group6", "group7", "group8", "group9"),
+        ("bb", "aa", "99", "88"),
+    ),
+    FilterSpec("100k_group10", ("group10",)),
+)
+
+
+class Block:
+    """
+    Devices with consecutive indexes and MAC addresses, in the same group
+    """
+
+    def __init__(self, mac_prefix, group, start_index, count, first_offset):
+        self.mac_prefix = mac_prefix
+        self.group = group
+        self.start_index = start_index
+        self.count = count
+        self.first_offset = first_offset
+
+    def mac_address(self, index):
+        _offset = self.first_offset + index - self.start_index
+        return "%s:00:00:%02x:%02x:%02x" % (
+            self.mac_prefix,
+            (_offset >> 16) & 0xFF,
+            (_offset >> 8) & 0xFF,
+            _offset & 0xFF,
+        )
+
+
+class FiltersLayout:
+    """
+    Lays out the fleet so that every filter of the spec matches exactly the
+    number of devices in its name. The devices are split in blocks, one per MAC
+    prefix and device group, with MAC addresses "<prefix>:00:00:xx:xx:xx". The
+    block sizes are computed filter by filter: the devices a filter still
+    misses are shared evenly between the groups it selects which have no block
+    yet for its prefix. Devices of filters without a MAC prefix get the
+    'other_prefix'.
+
+    Instances of stress clients get 'devices_per_instance' devices each, all in
+    the same block, so they share the same device_group inventory value.
+    """
+
+    def __init__(
+        self,
+        filters=PREDEFINED_FILTERS,
+        devices_per_instance=DEVICES_PER_INSTANCE,
+        other_prefix="02",
+    ):
+        """
+        :param filters: 'tuple' of 'FilterSpec'
+        :param devices_per_instance: 'int' devices of one instance of stress
+                                     clients, must divide every block size
+        :param other_prefix: 'string' MAC prefix of the devices of the filters
+                             without prefix
+        """
+        self.filters = filters
+        self.devices_per_instance = devices_per_instance
+        self.other_prefix = other_prefix
+        self.blocks = []
+        self._allocate()
+        self._starts = [_block.start_index for _block in self.blocks]
+        for _block in self.blocks:
+            if _block.count % devices_per_instance != 0:
+                raise ValueError(
+                    "%d devices per instance don't divide the %d devices of "
+                    "group '%s' with MAC prefix '%s'"
+                    % (
+                        devices_per_instance,
+                        _block.count,
+                        _block.group,
+                        _block.mac_prefix,
+                    )
+                )
+
+    def _allocate(self):
+        _cells = {}
+        for _spec in self.filters:
+            for _prefix in _spec.prefixes():
+                _cell_prefix = _prefix or self.other_prefix
+                _allocated = sum(
+                    _count
+                    for (_p, _group), _count in _cells.items()
+                    if _group in _spec.groups and (_prefix is None or _p == _prefix)
+                )
+                if _prefix is None:
+                    _new = [
+                        _group
+                        for _group in _spec.groups
+                        if not any(_g == _group for _, _g in _cells)
+                    ]
+                else:
+                    _new = [
+                        _group
+                        for _group in _spec.groups
+                        if (_prefix, _group) not in _cells
+                    ]
+                _missing = _spec.size - _allocated
+                if (
+                    _missing < 0
+                    or (_missing > 0 and not _new)
+                    or (_new and _missing % len(_new) != 0)
+                ):
+                    raise ValueError(
+                        "can't lay out filter '%s' (prefix %s): %d devices "
+                        "already allocated, %d new groups"
+                        % (_spec.name, _prefix, _allocated, len(_new))
+                    )
+                for _group in _new:
+                    _cells[(_cell_prefix, _group)] = _missing // len(_new)
+        _offsets = {}
+        _index = 0
+        for (_prefix, _group), _count in _cells.items():
+            if _count == 0:
+                continue
+            _offset = _offsets.get(_prefix, 0)
+            if _offset + _count > 1 << 24:
+                raise ValueError("too many devices with MAC prefix '%s'" % _prefix)
+            self.blocks.append(Block(_prefix, _group, _index, _count, _offset))
+            _offsets[_prefix] = _offset + _count
+            _index += _count
+        # number of devices of the fleet
+        self.count = _index
+
+    @property
+    def instances(self):
+        return self.count // self.devices_per_instance
+
+    def block(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(
+                "device %d not in the layout of %d devices" % (index, self.count)
+            )
+        return self.blocks[bisect.bisect_right(self._starts, index) - 1]
+
+    def mac_address(self, index):
+        return self.block(index).mac_address(index)
+
+    def device_group(self, index):
+        return self.block(index).group
+
+    def inventory(self, index):
+        """
+        :return: 'dict' inventory attributes of the device
+        """
+        return {"device_group": self.device_group(index)}
+
+    def instance(self, start_count):
+        """
+        :param start_count: 'int' sequence number of an instance of stress clients
+        :return: 'dict' first device index, MAC range and group of the instance
+        """
+        _start = start_count * self.devices_per_instance
+        _end = _start + self.devices_per_instance - 1
+        return {
+            "start_index": _start,
+            "count": self.devices_per_instance,
+            "device_group": self.device_group(_start),
+            "first_mac": self.mac_address(_start),
+            "last_mac": self.mac_address(_end),
+        }
+
+    def count_matching(self, filter_):
+        """
+        Counts the devices of the layout a filter matches, evaluating its terms
+        :param filter_: 'dict' filter as given to InventoryV2.post_filter()
+        :return: 'int' number of devices
+        """
+        _count = 0
+        for _block in self.blocks:
+            _first = _block.start_index
+            _last = _block.start_index + _block.count - 1
+            if _matches(filter_, _block, _first) == _matches(filter_, _block, _last):
+                if _matches(filter_, _block, _first):
+                    _count += _block.count
+                continue
+            _count += sum(
+                1
+                for _index in range(_first, _last + 1)
+                if _matches(filter_, _block, _index)
+            )
+        return _count
+
+    def check(self):
+        """
+        :return: 'list' of (filter name, size in the name, devices matched)
+        """
+        _results = []
+        for _spec in self.filters:
+            for _prefix in _spec.prefixes():
+                _filter = _spec.to_filter(_prefix)
+                _results.append(
+                    (_filter["name"], _spec.size, self.count_matching(_filter))
+                )
+        return _results
+
+    def validate(self):
+        """
+        Raises ValueError if a filter doesn't match the size in its name
+        """
+        _wrong = [
+            "%s: %d devices instead of %d" % (_name, _matched, _size)
+            for _name, _size, _matched in self.check()
+            if _matched != _size
+        ]
+        if _wrong:
+            raise ValueError("filters not matching their size: %s" % ", ".join(_wrong))
+
+
+def _matches(filter_, block, index):
+    for _term in filter_["terms"]:
+        if _term["attribute"] == "device_group":
+            _value = block.group
+        elif _term["attribute"] == "mac":
+            _value = block.mac_address(index)
+        else:
+            raise ValueError("unsupported filter attribute '%s'" % _term["attribute"])
+        if _term["type"] == "$eq":
+            _match = _value == _term["value"]
+        elif _term["type"] == "$in":
+            _match = _value in _term["value"]
+        elif _term["type"] == "$regex":
+            _match = re.search(_term["value"], _value) is not None
+        else:
+            raise ValueError("unsupported filter type '%s'" % _term["type"])
+        if not _match:
+            return False
+    return True
+
+
+# how the MAC addresses are given to the devices, see get_layout()
+LAYOUTS = ("sequential", "filters")
+
+
+def get_layout(name, devices_per_instance=DEVICES_PER_INSTANCE):
+    """
+    :param name: 'string' one of LAYOUTS
+    :param devices_per_instance: 'int' devices of one instance of stress clients
+    :return: 'FiltersLayout' for the predefined filters, None for sequential MAC
+             addresses
+    """
+    if name == "sequential":
+        return None
+    if name == "filters":
+        return FiltersLayout(devices_per_instance=devices_per_instance)
+    raise ValueError("unknown identity layout '%s'" % name)
@@ -16,7 +16,9 @@
 import logging
 import time
 
+from mender import bulk
 from mender import common
+from mender import paging
 
 
 logger = logging.getLogger("inventory")
@@ -47,6 +49,7 @@ class Inventory:
         + DELETE /devices/{id}/group/{name}
         + GET /groups
         + GET /groups/{name}/devices
+        + PATCH /groups/{name}/devices
     """
 
     def get_devices(self, group=None, has_group=None, page=1, per_page=20, sort=None):
@@ -55,24 +58,126 @@ class Inventory:
             page=page, per_page=per_page, group=group, has_group=has_group, sort=sort
         )
 
-    def get_all_devices(self):
+    def get_all_devices(self, prefetch=8, strict=True):
         # GET /devices
-        _devices = []
+        _devices = list(self.iter_devices(prefetch=prefetch, strict=strict))
+        logger.debug("Devices count: %s" % len(_devices))
+        return _devices
+
+    def get_devices_count(self, group=None, has_group=None):
+        # GET /devices
+        _url = "%s/api/management/v1/inventory/devices?per_page=1" % (
+            self._user_adm.server_url
+        )
+        if group is not None:
+            _url += "&group=%s" % group
+        if has_group is not None:
+            _url += "&has_group=%s" % has_group
+        _content, _headers = common.do_get_call(
+            _url,
+            status_code=200,
+            with_headers=True,
+            headers=self._user_adm.get_auth_header(),
+        )
+        if _content is None:
+            return None
+        return int(_headers.get("X-Total-Count") or 0)
+
+    def iter_pages(
+        self,
+        group=None,
+        has_group=None,
+        per_page=500,
+        sort=None,
+        prefetch=0,
+        strict=True,
+    ):
+        """
+        Yields the pages of devices one by one, the next page is requested only
+        when the previous one has been consumed
+        :param group: 'string' only devices of this group
+        :param has_group: 'boolean' only grouped or ungrouped devices
+        :param per_page: 'int' number of devices per page
+        :param sort: 'string' sort expression, e.g. 'mac:asc'
+        :param prefetch: 'int' number of pages requested concurrently, 0 to
+                         request them one by one
+        :param strict: 'boolean' raise paging.PagingError when a page fails,
+                       otherwise the listing stops there
+        :return: 'generator' of 'list' of device documents
+        """
+        # GET /devices
+        if prefetch:
+            yield from paging.PagedFetcher(
+                fetch_page=lambda page, per_page: self._get_devices(
+                    page=page,
+                    per_page=per_page,
+                    group=group,
+                    has_group=has_group,
+                    sort=sort,
+                ),
+                get_count=lambda: self.get_devices_count(
+                    group=group, has_group=has_group
+                ),
+                per_page=per_page,
+                window=prefetch,
+                strict=strict,
+            )
+            return
         _page = 1
         while True:
             _start = time.time()
-            _resp_json = self._get_devices(page=_page, per_page=500)
-            if len(_resp_json) == 0 or not _resp_json:
+            _resp_json = self._get_devices(
+                page=_page,
+                per_page=per_page,
+                group=group,
+                has_group=has_group,
+                sort=sort,
+            )
+            if _resp_json is None and strict:
+                raise paging.PagingError("Failed to fetch page %s" % _page)
+            if not _resp_json:
                 break
-            for doc in _resp_json:
-                _devices.append(doc)
             _end = time.time()
             logger.debug(
                 "Page '%s' fetched for: '%s' sec" % (_page, round(_end - _start, 2))
             )
+            yield _resp_json
+            if len(_resp_json) < per_page:
+                break
             _page += 1
-        logger.debug("Devices count: %s" % len(_devices))
-        return _devices
+
+    def iter_devices(
+        self,
+        group=None,
+        has_group=None,
+        per_page=500,
+        sort=None,
+        fields=None,
+        prefetch=0,
+        strict=True,
+    ):
+        """
+        Yields the devices one by one without keeping the whole list in memory
+        :param group: 'string' only devices of this group
+        :param has_group: 'boolean' only grouped or ungrouped devices
+        :param per_page: 'int' number of devices per page
+        :param sort: 'string' sort expression, e.g. 'mac:asc'
+        :param fields: 'iterable' of fields to keep, e.g. ("id",)
+        :param prefetch: 'int' number of pages requested concurrently
+        :param strict: 'boolean' raise paging.PagingError when a page fails
+        :return: 'generator' of device documents
+        """
+        # GET /devices
+        for _devices in self.iter_pages(
+            group=group,
+            has_group=has_group,
+            per_page=per_page,
+            sort=sort,
+            prefetch=prefetch,
+            strict=strict,
+        ):
+            for _device in _devices:
+                yield common.project(_device, fields)
 
     def _get_devices(self, page, per_page, group=None, has_group=None, sort=None):
         # GET /devices
@@ -147,6 +252,46 @@ class Inventory:
             _url, status_code=204, json=_body, headers=self._user_adm.get_auth_header()
         )
 
+    def add_devices_to_group(
+        self, group_name, device_ids, batch_size=1000, concurrency=4
+    ):
+        """
+        Assigns many devices to a static group, sending batches of device ids
+        to the bulk endpoint with several batches in flight
+        :param group_name: 'string' name of the group
+        :param device_ids: 'iterable' of device ids, consumed lazily
+        :param batch_size: 'int' number of devices per call
+        :param concurrency: 'int' number of calls running at the same time
+        :return: 'BulkReport' devices in the group (done), not found (skipped)
+                 or in failed calls (failed)
+        """
+        # PATCH /groups/{name}/devices
+        _url = "%s/api/management/v1/inventory/groups/%s/devices" % (
+            self._user_adm.server_url,
+            group_name,
+        )
+        _report = bulk.BulkReport("group '%s'" % group_name)
+
+        def _assign(batch):
+            _result = common.do_patch_call(
+                _url,
+                status_code=200,
+                json=batch,
+                idempotent=True,
+                headers=self._user_adm.get_auth_header(),
+            )
+            if _result is None:
+                _report.add(failed=len(batch))
+                return
+            _matched = _result.get("matched_count", len(batch))
+            _report.add(done=_matched, skipped=len(batch) - _matched)
+
+        bulk.run_concurrently(
+            _assign, bulk.batches(device_ids, batch_size), concurrency
+        )
+        _report.finished = time.time()
+        return _report
+
     def delete_device(self, device_id):
         # DELETE /devices/{id}
         _url = "%s/api/management/v1/inventory/devices/%s" % (
@@ -51,10 +51,46 @@ class InventoryV2:
         )
 
     def post_filter(self, filter):
+        """
+        :return: 'dict' empty on success, None on failure. A filter with the
+                 same name is a success, which makes the call safe to retry.
+        """
         # POST /filters
         _url = "%s/api/management/v2/inventory/filters" % (self._user_adm.server_url,)
-        common.do_post_call(
-            _url, status_code=201, json=filter, headers=self._user_adm.get_auth_header()
+        return common.do_post_call(
+            _url,
+            status_code=(201, 409),
+            idempotent=True,
+            json=filter,
+            headers=self._user_adm.get_auth_header(),
+        )
+
+    def search_devices(
+        self,
+        filters=None,
+        page=1,
+        per_page=20,
+        sort=None,
+        attributes=None,
+        with_headers=False,
+    ):
+        # POST /filters/search
+        _url = "%s/api/management/v2/inventory/filters/search" % (
+            self._user_adm.server_url,
+        )
+        _query = {"page": page, "per_page": per_page, "filters": filters or []}
+        if sort is not None:
+            _query["sort"] = sort
+        if attributes is not None:
+            _query["attributes"] = attributes
+        # a search doesn't change anything, it can be retried
+        return common.do_post_call(
+            _url,
+            status_code=200,
+            json=_query,
+            idempotent=True,
+            with_headers=with_headers,
+            headers=self._user_adm.get_auth_header(),
         )
 
     def get_filter(self, filter_id):
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+import logging
+import os
+import tarfile
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from mender import bulk
+from mender import identity
+from mender import keys
+from mender import keystore
+
+
+logger = logging.getLogger("keygen")
+
+
+def _write_atomically(path, data, mode="wb"):
+    _tmp = "%s.tmp" % path
+    with open(_tmp, mode) as f:
+        f.write(data)
+    os.replace(_tmp, path)
+
+
+def _generate_chunk(directory, first, count, bits, key_file_format):
+    """
+    Generates the missing keys of a chunk, in a worker process
+    :return: 'tuple' number of keys generated and already existing
+    """
+    _generated = 0
+    for _index in range(first, first + count):
+        _path = os.path.join(directory, key_file_format % _index)
+        if os.path.isfile(_path) and os.path.getsize(_path) > 0:
+            continue
+        _write_atomically(_path, keys.private_pem(keys.generate_key(bits)))
+        _generated += 1
+    return _generated, count - _generated
+
+
+class KeySetGenerator:
+    """
+    Generates the private keys of the stress test clients, packed in one
+    archive per instance. Archives are named so that their alphabetical order,
+    as listed from S3 by stress-clients-manager.py, is the order of their
+    index: the archive picked with --start-count N has the keys of the devices
+    N * keys_per_archive and following.
+
+    Every archive 'name.tgz' holds a directory 'name' with one PEM file per
+    device, which the stress test client reads from /keys. Keys already
+    written are kept, so an interrupted run is resumed by running it again.
+    """
+
+    def __init__(
+        self,
+        output_dir,
+        archives,
+        start_count=0,
+        keys_per_archive=identity.DEVICES_PER_INSTANCE,
+        bits=2048,
+        processes=None,
+        chunk_size=100,
+        archive_name_format="keys-%05d",
+        key_file_format="%d.key",
+    ):
+        """
+        :param output_dir: 'string' directory where the archives are written
+        :param archives: 'int' number of archives to generate
+        :param start_count: 'int' index of the first archive
+        :param keys_per_archive: 'int' number of keys in every archive
+        :param bits: 'int' size of the RSA keys
+        :param processes: 'int' number of worker processes, None for one per core
+        :param chunk_size: 'int' number of keys generated by one task
+        :param archive_name_format: 'string' name of an archive from its index
+        :param key_file_format: 'string' name of a key file from its index in
+                                the archive
+        """
+        self.output_dir = output_dir
+        self.archive_indexes = range(start_count, start_count + archives)
+        self.keys_per_archive = keys_per_archive
+        self.bits = bits
+        self.processes = processes or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.archive_name_format = archive_name_format
+        self.key_file_format = key_file_format
+
+    def archive_name(self, index):
+        return self.archive_name_format % index
+
+    def archive_path(self, index):
+        return os.path.join(self.output_dir, "%s.tgz" % self.archive_name(index))
+
+    def keys_dir(self, index):
+        return os.path.join(self.output_dir, self.archive_name(index))
+
+    def _pack(self, index):
+        _path = self.archive_path(index)
+        _tmp = "%s.tmp" % _path
+        with tarfile.open(_tmp, "w:gz") as _tar:
+            _tar.add(self.keys_dir(index), arcname=self.archive_name(index))
+        os.replace(_tmp, _path)
+        logger.info("Archive '%s' written" % _path)
+
+    def run(self):
+        """
+        :return: 'BulkReport' with the keys generated (done) and kept (skipped)
+        """
+        _report = bulk.BulkReport("keygen")
+        _remaining = {}
+        with ProcessPoolExecutor(max_workers=self.processes) as _executor:
+            _futures = {}
+            for _index in self.archive_indexes:
+                if os.path.isfile(self.archive_path(_index)):
+                    logger.info("Archive '%s' exists" % self.archive_path(_index))
+                    _report.add(skipped=self.keys_per_archive)
+                    continue
+                os.makedirs(self.keys_dir(_index), exist_ok=True)
+                _remaining[_index] = 0
+                for _first in range(0, self.keys_per_archive, self.chunk_size):
+                    _future = _executor.submit(
+                        _generate_chunk,
+                        self.keys_dir(_index),
+                        _first,
+                        min(self.chunk_size, self.keys_per_archive - _first),
+                        self.bits,
+                        self.key_file_format,
+                    )
+                    _futures[_future] = _index
+                    _remaining[_index] += 1
+            for _future in as_completed(_futures):
+                _index = _futures[_future]
+                _generated, _existing = _future.result()
+                _report.add(done=_generated, skipped=_existing)
+                _remaining[_index] -= 1
+                if _remaining[_index] == 0:
+                    self._pack(_index)
+        _report.finished = time.time()
+        return _report
+
+    def write_keystore(self, path):
+        """
+        Writes all the generated keys in one key store, see mender.keystore
+        :param path: 'string' key store file
+        :return: 'int' number of keys written
+        """
+        return keystore.convert_key_sets(
+            [self.keys_dir(_index) for _index in self.archive_indexes],
+            path,
+            first_index=self.archive_indexes.start * self.keys_per_archive,
+            keys_per_set=self.keys_per_archive,
+        )
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+import base64
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+
+def generate_key(bits=2048):
+    """
+    :param bits: 'int' size of the RSA key
+    :return: 'RSAPrivateKey' new private key
+    """
+    return rsa.generate_private_key(
+        public_exponent=65537, key_size=bits, backend=default_backend()
+    )
+
+
+def load_key(pem):
+    """
+    :param pem: 'bytes' private key in PEM format
+    :return: 'RSAPrivateKey' private key
+    """
+    try:
+        # the keys are generated by us, checking them costs tens of ms per key
+        # with OpenSSL 3
+        return serialization.load_pem_private_key(
+            pem,
+            password=None,
+            backend=default_backend(),
+            unsafe_skip_rsa_key_validation=True,
+        )
+    except TypeError:
+        # older cryptography, which always checks them
+        return serialization.load_pem_private_key(
+            pem, password=None, backend=default_backend()
+        )
+
+
+def private_pem(key):
+    """
+    :param key: 'RSAPrivateKey' private key
+    :return: 'bytes' private key in PKCS#1 PEM format, as the mender client
+    """
+    return key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+def public_pem(key):
+    """
+    :param key: 'RSAPrivateKey' private key
+    :return: 'string' public key in PEM format, as expected by the backend
+    """
+    return (
+        key.public_key()
+        .public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        .decode()
+    )
+
+
+def sign(key, data):
+    """
+    Signs a request body the way the device authentication service verifies
+    the X-MEN-Signature header
+    :param key: 'RSAPrivateKey' private key of the device
+    :param data: 'bytes' request body
+    :return: 'string' base64 encoded signature
+    """
+    _signature = key.sign(data, padding.PKCS1v15(), hashes.SHA256())
+    return base64.b64encode(_signature).decode()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+import mmap
+import os
+import re
+import struct
+import tarfile
+
+from mender import keys
+
+
+# magic, version, flags, index of the first key, number of keys
+_HEADER = struct.Struct("<8sIIQQ")
+_OFFSET = struct.Struct("<Q")
+MAGIC = b"MKEYSTOR"
+VERSION = 1
+
+
+def natural_sort_key(name):
+    """
+    Sorts names with numbers by their value, e.g. "2.key" before "10.key"
+    """
+    return [
+        int(_part) if _part.isdigit() else _part for _part in re.split(r"(\d+)", name)
+    ]
+
+
+class KeyStore:
+    """
+    Read-only file with the private keys of a range of devices, memory mapped:
+    a fixed header, a table of count + 1 offsets and the PEM keys one after
+    the other. Opening it costs nothing, a key is read only when asked for, so
+    every worker can open the whole store and use only its slice.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: 'string' key store file, see write_keystore()
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            raise ValueError("'%s' is not a key store" % path)
+        _magic, _version, _, self.first_index, self.count = _HEADER.unpack_from(
+            self._map
+        )
+        if _magic != MAGIC or _version != VERSION:
+            raise ValueError("'%s' is not a key store (version %d)" % (path, VERSION))
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def contains(self, start, count):
+        """
+        :return: 'boolean' the keys of the devices [start, start + count) are all
+                 in the store
+        """
+        return (
+            self.first_index <= start and start + count <= self.first_index + self.count
+        )
+
+    def pem(self, index):
+        """
+        :param index: 'int' index of the device
+        :return: 'bytes' PEM private key, a copy of the few bytes of the key
+                 which stays valid once the store is closed
+        """
+        _position = index - self.first_index
+        if not 0 <= _position < self.count:
+            raise IndexError(
+                "device %d not in the key store (%d..%d)"
+                % (index, self.first_index, self.first_index + self.count)
+            )
+        _start, _end = struct.unpack_from(
+            "<QQ", self._map, _HEADER.size + _position * _OFFSET.size
+        )
+        return self._map[_start:_end]
+
+    def load_key(self, index):
+        """
+        :return: 'RSAPrivateKey' private key of the device
+        """
+        return keys.load_key(self.pem(index))
+
+
+class KeyDirectory:
+    """
+    Private keys in a directory, one PEM file per device, with the same
+    interface as KeyStore. The device index is the position of the file in the
+    directory, the sub-directories (e.g. one per instance, as written by the
+    key generator) being read in order too.
+    """
+
+    def __init__(self, path, first_index=0):
+        """
+        :param path: 'string' directory with the keys
+        :param first_index: 'int' index of the device of the first file
+        """
+        self.path = path
+        self.first_index = first_index
+        self._files = list(_iter_key_files(path))
+        self.count = len(self._files)
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def contains(self, start, count):
+        return (
+            self.first_index <= start and start + count <= self.first_index + self.count
+        )
+
+    def pem(self, index):
+        _position = index - self.first_index
+        if not 0 <= _position < self.count:
+            raise IndexError(
+                "device %d not in '%s' (%d..%d)"
+                % (index, self.path, self.first_index, self.first_index + self.count)
+            )
+        with open(self._files[_position], "rb") as f:
+            return f.read()
+
+    def load_key(self, index):
+        return keys.load_key(self.pem(index))
+
+
+def _iter_key_files(path):
+    for _name in sorted(os.listdir(path), key=natural_sort_key):
+        _file = os.path.join(path, _name)
+        if os.path.isdir(_file):
+            yield from _iter_key_files(_file)
+        elif not _name.endswith((".tmp", ".tgz")):
+            yield _file
+
+
+def open_key_source(path):
+    """
+    :param path: 'string' key store file or directory with key files
+    :return: 'KeyStore' or 'KeyDirectory'
+    """
+    if os.path.isdir(path):
+        return KeyDirectory(path)
+    return KeyStore(path)
+
+
+def write_keystore(path, pems, first_index=0):
+    """
+    Writes a key store, the keys are streamed to a temporary file first so
+    they are never all in memory
+    :param path: 'string' key store file to write
+    :param pems: iterable of 'bytes' PEM private keys, in device index order
+    :param first_index: 'int' index of the device of the first key
+    :return: 'int' number of keys written
+    """
+    _data_path = "%s.data.tmp" % path
+    _tmp = "%s.tmp" % path
+    _lengths = []
+    try:
+        with open(_data_path, "wb") as _data:
+            for _pem in pems:
+                _data.write(_pem)
+                _lengths.append(len(_pem))
+        with open(_tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, 0, first_index, len(_lengths)))
+            _offset = _HEADER.size + (len(_lengths) + 1) * _OFFSET.size
+            f.write(_OFFSET.pack(_offset))
+            for _length in _lengths:
+                _offset += _length
+                f.write(_OFFSET.pack(_offset))
+            with open(_data_path, "rb") as _data:
+                while True:
+                    _chunk = _data.read(1 << 20)
+                    if not _chunk:
+                        break
+                    f.write(_chunk)
+        os.replace(_tmp, path)
+    finally:
+        for _file in (_data_path, _tmp):
+            if os.path.exists(_file):
+                os.remove(_file)
+    return len(_lengths)
+
+
+def iter_key_set(path):
+    """
+    Reads the keys of a stress test client key set, as written by the key
+    generator: a .tgz archive or a directory with one PEM file per device
+    :param path: 'string' archive or directory
+    :return: 'generator' of 'bytes' PEM private keys, in device order
+    """
+    if os.path.isdir(path):
+        for _file in _iter_key_files(path):
+            with open(_file, "rb") as f:
+                yield f.read()
+        return
+    with tarfile.open(path, "r:*") as _tar:
+        _members = [_member for _member in _tar.getmembers() if _member.isfile()]
+        _members.sort(key=lambda _member: natural_sort_key(_member.name))
+        for _member in _members:
+            yield _tar.extractfile(_member).read()
+
+
+def convert_key_sets(paths, output, first_index=0, keys_per_set=None):
+    """
+    Builds one key store from several key sets (e.g. one per instance)
+    :param paths: 'list' archives or directories, in device index order
+    :param output: 'string' key store file to write
+    :param first_index: 'int' index of the device of the first key
+    :param keys_per_set: 'int' expected number of keys in every set but the
+                         last one, so the indexes match the instances
+    :return: 'int' number of keys written
+    """
+
+    def _pems():
+        for _number, _path in enumerate(paths):
+            _count = 0
+            for _pem in iter_key_set(_path):
+                _count += 1
+                yield _pem
+            if (
+                keys_per_set is not None
+                and _number < len(paths) - 1
+                and _count != keys_per_set
+            ):
+                raise ValueError(
+                    "'%s' has %d keys instead of %d" % (_path, _count, keys_per_set)
+                )
+
+    return write_keystore(output, _pems(), first_index=first_index)
@@ -0,0 +1,1299 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import asyncio
+import base64
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+
+from datetime import datetime, timezone
+from itertools import islice
+
+from aiohttp import web
+
+from mender import identity as identity_lib
+
+
+logger = logging.getLogger("mock-server")
+
+DEVICE_STATUSES = ("pending", "accepted", "rejected", "preauthorized", "noauth")
+DEPLOYMENT_STATUSES = (
+    "pending",
+    "downloading",
+    "installing",
+    "rebooting",
+    "pause_before_installing",
+    "pause_before_committing",
+    "pause_before_rebooting",
+    "success",
+    "failure",
+    "noartifact",
+    "already-installed",
+    "aborted",
+    "decommissioned",
+)
+FINISHED_STATUSES = (
+    "success",
+    "failure",
+    "noartifact",
+    "already-installed",
+    "aborted",
+    "decommissioned",
+)
+
+_MANAGEMENT = "/api/management"
+_DEVICES = "/api/devices/v1"
+
+
+def _timestamp(epoch):
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _identity_key(identity):
+    """
+    :return: 'int' hash of the identity data, the same whatever the key order
+    """
+    try:
+        return hash(frozenset(identity.items()))
+    except TypeError:
+        # values which can't be hashed, e.g. lists
+        return hash(json.dumps(identity, sort_keys=True))
+
+
+def _seeded_id(index):
+    return "00000000-0000-4000-8000-%012x" % index
+
+
+class MockDevice:
+    """
+    One device of the mock server. Devices loaded with MockState.seed keep
+    only their index, their identity is computed again when needed.
+    """
+
+    __slots__ = (
+        "id",
+        "_identity",
+        "status",
+        "pubkey",
+        "created",
+        "updated",
+        "attributes",
+        "group",
+    )
+
+    def __init__(self, device_id, identity, status, pubkey=None, created=None):
+        """
+        :param device_id: 'string' id of the device and of its only auth set
+        :param identity: 'dict' identity data or 'int' index of a seeded device
+        :param status: 'string' one of DEVICE_STATUSES
+        :param pubkey: 'string' public key in PEM format or None
+        :param created: 'float' epoch of the creation, defaults to now
+        """
+        self.id = device_id
+        self._identity = identity
+        self.status = status
+        self.pubkey = pubkey
+        self.created = created or time.time()
+        self.updated = self.created
+        self.attributes = None
+        self.group = None
+
+
+class MockDeployment:
+    """
+    Deployment of the mock server. Only the devices which have reported a
+    status are stored in 'statuses', the others are pending.
+    """
+
+    def __init__(self, deployment_id, name, artifact_name, device_ids):
+        self.id = deployment_id
+        self.name = name
+        self.artifact_name = artifact_name
+        self.device_ids = device_ids
+        self.statuses = {}
+        self.finished_at = {}
+        self.counts = dict.fromkeys(DEPLOYMENT_STATUSES, 0)
+        self.counts["pending"] = len(device_ids)
+        self.created = time.time()
+        self.finished = None
+
+    def device_status(self, device_id):
+        return self.statuses.get(device_id, "pending")
+
+    def set_device_status(self, device_id, status):
+        _old = self.device_status(device_id)
+        if _old == status:
+            return
+        self.counts[_old] -= 1
+        self.counts[status] += 1
+        self.statuses[device_id] = status
+        if status in FINISHED_STATUSES:
+            self.finished_at[device_id] = time.time()
+        if self.status == "finished" and self.finished is None:
+            self.finished = time.time()
+
+    @property
+    def status(self):
+        _finished = sum(self.counts[_status] for _status in FINISHED_STATUSES)
+        if _finished == len(self.device_ids):
+            return "finished"
+        if self.counts["pending"] < len(self.device_ids):
+            return "inprogress"
+        return "pending"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "artifact_name": self.artifact_name,
+            "created": _timestamp(self.created),
+            "finished": _timestamp(self.finished),
+            "status": self.status,
+            "device_count": len(self.device_ids),
+            "max_devices": len(self.device_ids),
+            "initial_device_count": len(self.device_ids),
+            "artifacts": [],
+            "type": "software",
+        }
+
+
+class MockState:
+    """
+    In-memory content of the mock server.
+
+    The devices are indexed by id, by status and by static group with
+    insertion ordered dicts, so listing a page or counting never scans the
+    whole fleet. Identities are indexed by a 64 bits hash to keep the memory
+    used by millions of devices low.
+    """
+
+    def __init__(
+        self, fields=identity_lib.DEFAULT_FIELDS, sku=identity_lib.DEFAULT_SKU
+    ):
+        """
+        :param fields: 'tuple' identity attributes of the seeded devices
+        :param sku: 'string' sku of the seeded devices
+        """
+        self.fields = fields
+        self.sku = sku
+        self.layout = None
+        self.devices = {}
+        self.by_status = {_status: {} for _status in DEVICE_STATUSES}
+        self.by_identity = {}
+        self.groups = {}
+        self.filters = {}
+        self.deployments = {}
+        self.device_deployments = {}
+        self.artifacts = {}
+        self.device_tokens = {}
+        self.token_ids = {}
+        self.settings = {}
+
+    def identity(self, device):
+        if isinstance(device._identity, int):
+            return identity_lib.device_identity(
+                device._identity, self.fields, self.sku, self.layout
+            )
+        return device._identity
+
+    def seed(self, count, status="accepted", start=0, layout=None):
+        """
+        Loads devices with the same identities as the simulated ones (see
+        mender.identity), without keys: the first auth request sets the key
+        :param count: 'int' number of devices
+        :param status: 'string' status given to all the devices
+        :param start: 'int' index of the first device
+        :param layout: 'FiltersLayout' of the identities, None for sequential
+        """
+        self.layout = layout
+        _created = time.time()
+        _by_status = self.by_status[status]
+        for _index in range(start, start + count):
+            _device = MockDevice(_seeded_id(_index), _index, status, created=_created)
+            self.devices[_device.id] = _device
+            _by_status[_device.id] = _device
+            self.by_identity[_identity_key(self.identity(_device))] = _device
+            if layout is not None:
+                _device.attributes = layout.inventory(_index)
+        logger.info("Seeded %s %s devices" % (count, status))
+
+    def find_by_identity(self, identity):
+        _device = self.by_identity.get(_identity_key(identity))
+        if _device is not None and self.identity(_device) == identity:
+            return _device
+        return None
+
+    def add_device(self, identity, pubkey, status):
+        """
+        :return: 'MockDevice' new device, None if the identity is taken
+        """
+        if self.find_by_identity(identity) is not None:
+            return None
+        _device = MockDevice(str(uuid.uuid4()), identity, status, pubkey=pubkey)
+        self.devices[_device.id] = _device
+        self.by_status[status][_device.id] = _device
+        self.by_identity[_identity_key(identity)] = _device
+        return _device
+
+    def set_status(self, device, status):
+        if device.status == status:
+            return
+        del self.by_status[device.status][device.id]
+        self.by_status[status][device.id] = device
+        device.status = status
+        device.updated = time.time()
+
+    def set_group(self, device, group):
+        if device.group is not None:
+            _members = self.groups[device.group]
+            del _members[device.id]
+            if not _members:
+                del self.groups[device.group]
+        device.group = group
+        if group is not None:
+            self.groups.setdefault(group, {})[device.id] = device
+
+    def remove_device(self, device):
+        self.set_group(device, None)
+        del self.devices[device.id]
+        del self.by_status[device.status][device.id]
+        _key = _identity_key(self.identity(device))
+        if self.by_identity.get(_key) is device:
+            del self.by_identity[_key]
+        for _deployment_id in self.device_deployments.pop(device.id, ()):
+            _deployment = self.deployments[_deployment_id]
+            if _deployment.device_status(device.id) not in FINISHED_STATUSES:
+                _deployment.set_device_status(device.id, "decommissioned")
+
+    def attribute(self, device, scope, name):
+        """
+        :return: value of the attribute as seen by the inventory, None if unset
+        """
+        if scope == "identity":
+            if name == "status":
+                return device.status
+            return self.identity(device).get(name)
+        if scope == "inventory":
+            return (device.attributes or {}).get(name)
+        if scope == "system":
+            if name == "group":
+                return device.group
+            if name == "updated_ts":
+                return _timestamp(device.updated)
+            if name == "created_ts":
+                return _timestamp(device.created)
+        return None
+
+    def inventory_attributes(self, device, names=None):
+        """
+        :param names: 'set' of (scope, name) to return, None for all
+        :return: 'list' of inventory v2 attributes
+        """
+        _attributes = [
+            {"name": _name, "value": _value, "scope": "identity"}
+            for _name, _value in self.identity(device).items()
+        ]
+        _attributes.append(
+            {"name": "status", "value": device.status, "scope": "identity"}
+        )
+        for _name, _value in (device.attributes or {}).items():
+            _attributes.append({"name": _name, "value": _value, "scope": "inventory"})
+        if device.group is not None:
+            _attributes.append(
+                {"name": "group", "value": device.group, "scope": "system"}
+            )
+        _attributes.append(
+            {
+                "name": "updated_ts",
+                "value": _timestamp(device.updated),
+                "scope": "system",
+            }
+        )
+        if names is not None:
+            _attributes = [
+                _attribute
+                for _attribute in _attributes
+                if (_attribute["scope"], _attribute["name"]) in names
+            ]
+        return _attributes
+
+    def matches(self, device, terms):
+        """
+        :param terms: 'list' of inventory v2 filter terms, all must match
+        """
+        _identity = None
+        for _term in terms:
+            _scope = _term.get("scope")
+            _name = _term.get("attribute")
+            if _scope == "identity" and _name != "status":
+                # computed once for all the terms, it is the costly part
+                if _identity is None:
+                    _identity = self.identity(device)
+                _value = _identity.get(_name)
+            else:
+                _value = self.attribute(device, _scope, _name)
+            if not _match_term(_value, _term.get("type"), _term.get("value")):
+                return False
+        return True
+
+    def search(self, terms):
+        """
+        :return: 'list' or dict view of the devices matching all the terms
+        """
+        _status = None
+        _rest = []
+        for _term in terms:
+            if (
+                _term.get("scope") == "identity"
+                and _term.get("attribute") == "status"
+                and _term.get("type") == "$eq"
+                and _status is None
+            ):
+                _status = _term.get("value")
+            else:
+                _rest.append(_term)
+        if _status is not None:
+            _devices = self.by_status.get(_status, {}).values()
+        else:
+            _devices = self.devices.values()
+        if not _rest:
+            return _devices
+        return [_device for _device in _devices if self.matches(_device, _rest)]
+
+
+def _match_term(value, type_, expected):
+    if type_ == "$eq":
+        return value == expected
+    if type_ == "$ne":
+        return value != expected
+    if type_ == "$in":
+        return value in expected
+    if type_ == "$nin":
+        return value not in expected
+    if type_ == "$exists":
+        return (value is not None) == bool(expected)
+    if type_ == "$regex":
+        return value is not None and re.search(expected, str(value)) is not None
+    if value is None:
+        return False
+    if type_ == "$gt":
+        return value > expected
+    if type_ == "$gte":
+        return value >= expected
+    if type_ == "$lt":
+        return value < expected
+    if type_ == "$lte":
+        return value <= expected
+    raise ValueError("unknown filter type '%s'" % type_)
+
+
+def _make_token(subject, lifetime):
+    """
+    :return: 'tuple' unsigned JWT and its id, readable by token_expiry
+    """
+    _id = str(uuid.uuid4())
+
+    def _part(_doc):
+        return base64.urlsafe_b64encode(json.dumps(_doc).encode()).rstrip(b"=")
+
+    _token = b".".join(
+        [
+            _part({"alg": "none", "typ": "JWT"}),
+            _part({"jti": _id, "sub": subject, "exp": int(time.time() + lifetime)}),
+            b"mock",
+        ]
+    ).decode()
+    return _token, _id
+
+
+class MockServer:
+    """
+    Stand-in for the Mender backend serving the API calls done by the mender
+    clients from an in-memory state, to benchmark the tool without a hosted
+    Mender.
+
+    Every call can be slowed down by a fixed latency plus a random jitter, and
+    fail with 'error_status' at the given rate. Pages are cut to
+    'max_per_page' as the real services do. Signatures of the auth requests
+    are not verified.
+    """
+
+    def __init__(
+        self,
+        state=None,
+        username=None,
+        password=None,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=503,
+        max_per_page=500,
+        default_per_page=20,
+        token_lifetime=3600,
+        fault=None,
+    ):
+        """
+        :param state: 'MockState' content of the server, empty by default
+        :param username: 'string' accepted user, None to accept any credentials
+        :param password: 'string' password of the user
+        :param latency: 'float' seconds added to every call
+        :param jitter: 'float' max random seconds added on top of the latency
+        :param error_rate: 'float' 0..1 share of the calls failing
+        :param error_status: 'int' status code of the failed calls
+        :param max_per_page: 'int' max number of items of a page
+        :param default_per_page: 'int' number of items when per_page is missing
+        :param token_lifetime: 'float' seconds the management tokens are valid
+        :param fault: function(request) returning the status code a call fails
+                      with, or a (status code, headers) 'tuple', None to serve
+                      it, e.g. to fail one page of a listing
+        """
+        self.state = state or MockState()
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_per_page = max_per_page
+        self.default_per_page = default_per_page
+        self.token_lifetime = token_lifetime
+        self.fault = fault
+        self._user_tokens = {}
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        # number of calls served
+        self.calls = 0
+
+    def app(self):
+        """
+        :return: 'aiohttp.web.Application' serving the API
+        """
+        _app = web.Application(
+            middlewares=[self._faults, self._authorize], client_max_size=1024**3
+        )
+        _useradm = _MANAGEMENT + "/v1/useradm"
+        _devauth = _MANAGEMENT + "/v2/devauth"
+        _inventory = _MANAGEMENT + "/v1/inventory"
+        _inventory_v2 = _MANAGEMENT + "/v2/inventory"
+        _deployments = _MANAGEMENT + "/v1/deployments"
+        _device_deployments = _DEVICES + "/deployments/device/deployments"
+        _app.add_routes(
+            [
+                web.post(_useradm + "/auth/login", self._login),
+                web.get(_useradm + "/settings", self._get_settings),
+                web.post(_useradm + "/settings", self._post_settings),
+                web.get(_devauth + "/devices", self._devauth_devices),
+                web.post(_devauth + "/devices", self._preauthorize),
+                web.get(_devauth + "/devices/count", self._devauth_count),
+                web.get(_devauth + "/devices/{id}", self._devauth_device),
+                web.delete(_devauth + "/devices/{id}", self._decommission),
+                web.delete(_devauth + "/devices/{id}/auth/{aid}", self._decommission),
+                web.get(
+                    _devauth + "/devices/{id}/auth/{aid}/status", self._auth_set_status
+                ),
+                web.put(
+                    _devauth + "/devices/{id}/auth/{aid}/status",
+                    self._update_auth_set_status,
+                ),
+                web.get(_devauth + "/limits/max_devices", self._max_devices),
+                web.delete(_devauth + "/tokens/{id}", self._revoke_token),
+                web.get(_inventory + "/devices", self._inventory_devices),
+                web.get(_inventory + "/devices/{id}", self._inventory_device),
+                web.delete(_inventory + "/devices/{id}", self._decommission),
+                web.get(_inventory + "/devices/{id}/group", self._device_group),
+                web.put(_inventory + "/devices/{id}/group", self._set_device_group),
+                web.delete(
+                    _inventory + "/devices/{id}/group/{name}", self._unset_device_group
+                ),
+                web.get(_inventory + "/groups", self._groups),
+                web.get(_inventory + "/groups/{name}/devices", self._group_devices),
+                web.patch(
+                    _inventory + "/groups/{name}/devices", self._add_group_devices
+                ),
+                web.get(_inventory_v2 + "/filters", self._filters),
+                web.post(_inventory_v2 + "/filters", self._post_filter),
+                web.post(_inventory_v2 + "/filters/search", self._search),
+                web.get(_inventory_v2 + "/filters/{id}", self._filter),
+                web.delete(_inventory_v2 + "/filters/{id}", self._delete_filter),
+                web.get(_deployments + "/deployments", self._deployments),
+                web.post(_deployments + "/deployments", self._post_deployment),
+                web.post(
+                    _deployments + "/deployments/group/{name}",
+                    self._post_group_deployment,
+                ),
+                web.get(_deployments + "/deployments/releases", self._releases),
+                web.delete(
+                    _deployments + "/deployments/devices/{id}",
+                    self._delete_device_deployments,
+                ),
+                web.get(_deployments + "/deployments/{id}", self._deployment),
+                web.put(
+                    _deployments + "/deployments/{id}/status", self._abort_deployment
+                ),
+                web.get(
+                    _deployments + "/deployments/{id}/statistics", self._statistics
+                ),
+                web.get(
+                    _deployments + "/deployments/{id}/devices",
+                    self._deployment_devices,
+                ),
+                web.get(
+                    _deployments + "/deployments/{id}/devices/list",
+                    self._deployment_devices_list,
+                ),
+                web.get(
+                    _deployments + "/deployments/{id}/devices/{did}/log",
+                    self._deployment_device_log,
+                ),
+                web.get(_deployments + "/artifacts", self._artifacts),
+                web.post(_deployments + "/artifacts", self._upload_artifact),
+                web.get(_deployments + "/artifacts/{id}", self._artifact),
+                web.put(_deployments + "/artifacts/{id}", self._update_artifact),
+                web.delete(_deployments + "/artifacts/{id}", self._delete_artifact),
+                web.get(_deployments + "/artifacts/{id}/download", self._download_link),
+                web.get(_deployments + "/limits/storage", self._storage_limit),
+                web.post(
+                    _MANAGEMENT + "/v2/deployments/deployments",
+                    self._post_filter_deployment,
+                ),
+                web.post(
+                    _DEVICES + "/authentication/auth_requests", self._auth_request
+                ),
+                web.patch(
+                    _DEVICES + "/inventory/device/attributes",
+                    self._update_inventory,
+                ),
+                web.get(_device_deployments + "/next", self._next_deployment),
+                web.put(
+                    _device_deployments + "/{id}/status",
+                    self._update_deployment_status,
+                ),
+            ]
+        )
+        return _app
+
+    def run(self, host="127.0.0.1", port=8080):
+        """
+        Serves the API until interrupted
+        """
+        logger.info("Mock Mender server listening on http://%s:%s" % (host, port))
+        web.run_app(self.app(), host=host, port=port, access_log=None, print=None)
+
+    def start(self, host="127.0.0.1", port=0):
+        """
+        Serves the API from a background thread, e.g. next to a benchmark
+        :param port: 'int' port to listen on, 0 for any free one
+        :return: 'string' URL of the server
+        """
+        self._loop = asyncio.new_event_loop()
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        self._loop.run_until_complete(web.TCPSite(self._runner, host, port).start())
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        return "http://%s:%s" % (host, self._runner.addresses[0][1])
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+        self._thread = None
+
+    # middlewares
+
+    @web.middleware
+    async def _faults(self, request, handler):
+        self.calls += 1
+        if self.latency > 0 or self.jitter > 0:
+            await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        if self.error_rate > 0 and random.random() < self.error_rate:
+            return web.json_response(
+                {"error": "injected failure"}, status=self.error_status
+            )
+        _fault = self.fault(request) if self.fault is not None else None
+        if _fault is not None:
+            _status, _headers = _fault if isinstance(_fault, tuple) else (_fault, None)
+            return web.json_response(
+                {"error": "injected failure"}, status=_status, headers=_headers
+            )
+        return await handler(request)
+
+    @web.middleware
+    async def _authorize(self, request, handler):
+        _path = request.path
+        if _path.endswith("/auth/login") or _path.endswith("/auth_requests"):
+            return await handler(request)
+        _token = request.headers.get("Authorization", "")[len("Bearer ") :]
+        if _path.startswith(_MANAGEMENT):
+            _expires = self._user_tokens.get(_token)
+            if _expires is None or _expires < time.time():
+                return _error(401, "unauthorized")
+        elif _path.startswith(_DEVICES):
+            _device = self.state.devices.get(self.state.device_tokens.get(_token))
+            if _device is None or _device.status != "accepted":
+                return _error(401, "unauthorized")
+            request["device"] = _device
+        return await handler(request)
+
+    # helpers
+
+    def _paging(self, request):
+        """
+        :return: 'tuple' offset and number of items of the requested page
+        """
+        try:
+            _page = max(int(request.query.get("page", 1)), 1)
+            _per_page = int(request.query.get("per_page", self.default_per_page))
+        except ValueError:
+            raise web.HTTPBadRequest(text="invalid paging")
+        _per_page = min(max(_per_page, 1), self.max_per_page)
+        return (_page - 1) * _per_page, _per_page
+
+    def _page(self, request, items):
+        _offset, _per_page = self._paging(request)
+        return list(islice(items, _offset, _offset + _per_page))
+
+    def _device(self, request, key="id"):
+        _device = self.state.devices.get(request.match_info[key])
+        if _device is None:
+            raise web.HTTPNotFound(text="device not found")
+        return _device
+
+    def _get_deployment(self, request):
+        _deployment = self.state.deployments.get(request.match_info["id"])
+        if _deployment is None:
+            raise web.HTTPNotFound(text="deployment not found")
+        return _deployment
+
+    def _devauth_doc(self, device):
+        _identity = self.state.identity(device)
+        _created = _timestamp(device.created)
+        return {
+            "id": device.id,
+            "identity_data": _identity,
+            "status": device.status,
+            "decommissioning": False,
+            "created_ts": _created,
+            "updated_ts": _timestamp(device.updated),
+            "auth_sets": [
+                {
+                    "id": device.id,
+                    "identity_data": _identity,
+                    "pubkey": device.pubkey or "",
+                    "ts": _created,
+                    "status": device.status,
+                }
+            ],
+        }
+
+    def _inventory_doc(self, device):
+        return {
+            "id": device.id,
+            "attributes": [
+                {"name": _name, "value": _value, "description": ""}
+                for _name, _value in itertools.chain(
+                    self.state.identity(device).items(),
+                    (device.attributes or {}).items(),
+                )
+            ],
+            "updated_ts": _timestamp(device.updated),
+        }
+
+    def _create_deployment(self, name, artifact_name, device_ids):
+        _deployment = MockDeployment(str(uuid.uuid4()), name, artifact_name, device_ids)
+        self.state.deployments[_deployment.id] = _deployment
+        for _device_id in device_ids:
+            self.state.device_deployments.setdefault(_device_id, []).append(
+                _deployment.id
+            )
+        return web.Response(
+            status=201,
+            headers={
+                "Location": "%s/v1/deployments/deployments/%s"
+                % (_MANAGEMENT, _deployment.id)
+            },
+        )
+
+    # useradm
+
+    async def _login(self, request):
+        # POST /auth/login
+        _auth = request.headers.get("Authorization", "")
+        try:
+            _user, _, _password = (
+                base64.b64decode(_auth[len("Basic ") :]).decode().partition(":")
+            )
+        except ValueError:
+            return _error(401, "invalid credentials")
+        if not _auth.startswith("Basic ") or (
+            self.username is not None
+            and (_user, _password) != (self.username, self.password)
+        ):
+            return _error(401, "invalid credentials")
+        _token, _ = _make_token(_user, self.token_lifetime)
+        self._user_tokens[_token] = time.time() + self.token_lifetime
+        return web.Response(text=_token, content_type="application/jwt")
+
+    async def _get_settings(self, request):
+        # GET /settings
+        return web.json_response(self.state.settings)
+
+    async def _post_settings(self, request):
+        # POST /settings
+        self.state.settings = await request.json()
+        return web.Response(status=201)
+
+    # devauth
+
+    async def _devauth_devices(self, request):
+        # GET /devices
+        _status = request.query.get("status")
+        if _status is None:
+            _devices = self.state.devices.values()
+        elif _status in self.state.by_status:
+            _devices = self.state.by_status[_status].values()
+        else:
+            return _error(400, "invalid status '%s'" % _status)
+        return web.json_response(
+            [self._devauth_doc(_device) for _device in self._page(request, _devices)]
+        )
+
+    async def _devauth_count(self, request):
+        # GET /devices/count
+        _status = request.query.get("status")
+        if _status is None:
+            return web.json_response({"count": len(self.state.devices)})
+        if _status not in self.state.by_status:
+            return _error(400, "invalid status '%s'" % _status)
+        return web.json_response({"count": len(self.state.by_status[_status])})
+
+    async def _preauthorize(self, request):
+        # POST /devices
+        _body = await request.json()
+        _device = self.state.add_device(
+            _body.get("identity_data") or {}, _body.get("pubkey"), "preauthorized"
+        )
+        if _device is None:
+            return _error(409, "device already exists")
+        return web.Response(status=201)
+
+    async def _devauth_device(self, request):
+        # GET /devices/{id}
+        return web.json_response(self._devauth_doc(self._device(request)))
+
+    async def _decommission(self, request):
+        # DELETE /devices/{id}
+        # DELETE /devices/{id}/auth/{aid}
+        self.state.remove_device(self._device(request))
+        return web.Response(status=204)
+
+    async def _auth_set_status(self, request):
+        # GET /devices/{id}/auth/{aid}/status
+        _device = self._device(request)
+        if request.match_info["aid"] != _device.id:
+            return _error(404, "auth set not found")
+        return web.json_response({"status": _device.status})
+
+    async def _update_auth_set_status(self, request):
+        # PUT /devices/{id}/auth/{aid}/status
+        _device = self._device(request)
+        if request.match_info["aid"] != _device.id:
+            return _error(404, "auth set not found")
+        _status = (await request.json()).get("status")
+        if _status not in ("accepted", "rejected", "pending"):
+            return _error(400, "invalid status '%s'" % _status)
+        self.state.set_status(_device, _status)
+        return web.Response(status=204)
+
+    async def _max_devices(self, request):
+        # GET /limits/max_devices
+        return web.json_response({"limit": 0})
+
+    async def _revoke_token(self, request):
+        # DELETE /tokens/{id}
+        _token = self.state.token_ids.pop(request.match_info["id"], None)
+        if _token is None:
+            return _error(404, "token not found")
+        self.state.device_tokens.pop(_token, None)
+        return web.Response(status=204)
+
+    # inventory v1
+
+    async def _inventory_devices(self, request):
+        # GET /devices
+        _group = request.query.get("group")
+        _has_group = request.query.get("has_group")
+        if _group is not None:
+            _devices = self.state.groups.get(_group, {}).values()
+        else:
+            _devices = self.state.by_status["accepted"].values()
+        _total = len(_devices)
+        if _has_group is not None:
+            _wanted = _has_group.lower() == "true"
+            _grouped = sum(
+                1
+                for _members in self.state.groups.values()
+                for _device in _members.values()
+                if _device.status == "accepted"
+            )
+            _total = _grouped if _wanted else _total - _grouped
+            _devices = (
+                _device
+                for _device in _devices
+                if (_device.group is not None) == _wanted
+            )
+        return web.json_response(
+            [self._inventory_doc(_device) for _device in self._page(request, _devices)],
+            headers={"X-Total-Count": str(_total)},
+        )
+
+    async def _inventory_device(self, request):
+        # GET /devices/{id}
+        return web.json_response(self._inventory_doc(self._device(request)))
+
+    async def _device_group(self, request):
+        # GET /devices/{id}/group
+        return web.json_response({"group": self._device(request).group})
+
+    async def _set_device_group(self, request):
+        # PUT /devices/{id}/group
+        _device = self._device(request)
+        _group = (await request.json()).get("group")
+        if not _group:
+            return _error(400, "missing group")
+        self.state.set_group(_device, _group)
+        return web.Response(status=204)
+
+    async def _unset_device_group(self, request):
+        # DELETE /devices/{id}/group/{name}
+        _device = self._device(request)
+        if _device.group != request.match_info["name"]:
+            return _error(404, "device not in group")
+        self.state.set_group(_device, None)
+        return web.Response(status=204)
+
+    async def _groups(self, request):
+        # GET /groups
+        return web.json_response(sorted(self.state.groups))
+
+    async def _group_devices(self, request):
+        # GET /groups/{name}/devices
+        _members = self.state.groups.get(request.match_info["name"])
+        if _members is None:
+            return _error(404, "group not found")
+        return web.json_response(self._page(request, _members.keys()))
+
+    async def _add_group_devices(self, request):
+        # PATCH /groups/{name}/devices
+        _group = request.match_info["name"]
+        _matched = 0
+        _updated = 0
+        for _device_id in await request.json():
+            _device = self.state.devices.get(_device_id)
+            if _device is None:
+                continue
+            _matched += 1
+            if _device.group != _group:
+                self.state.set_group(_device, _group)
+                _updated += 1
+        return web.json_response({"matched_count": _matched, "updated_count": _updated})
+
+    # inventory v2
+
+    async def _filters(self, request):
+        # GET /filters
+        return web.json_response(self._page(request, self.state.filters.values()))
+
+    async def _post_filter(self, request):
+        # POST /filters
+        _filter = await request.json()
+        if not _filter.get("name") or not isinstance(_filter.get("terms"), list):
+            return _error(400, "invalid filter")
+        if any(_f["name"] == _filter["name"] for _f in self.state.filters.values()):
+            return _error(409, "filter '%s' already exists" % _filter["name"])
+        _filter = {
+            "id": str(uuid.uuid4()),
+            "name": _filter["name"],
+            "terms": _filter["terms"],
+        }
+        self.state.filters[_filter["id"]] = _filter
+        return web.Response(
+            status=201,
+            headers={
+                "Location": "%s/v2/inventory/filters/%s" % (_MANAGEMENT, _filter["id"])
+            },
+        )
+
+    async def _filter(self, request):
+        # GET /filters/{id}
+        _filter = self.state.filters.get(request.match_info["id"])
+        if _filter is None:
+            return _error(404, "filter not found")
+        return web.json_response(_filter)
+
+    async def _delete_filter(self, request):
+        # DELETE /filters/{id}
+        if self.state.filters.pop(request.match_info["id"], None) is None:
+            return _error(404, "filter not found")
+        return web.Response(status=204)
+
+    async def _search(self, request):
+        # POST /filters/search
+        _body = await request.json()
+        _page = max(int(_body.get("page") or 1), 1)
+        _per_page = min(
+            max(int(_body.get("per_page") or self.default_per_page), 1),
+            self.max_per_page,
+        )
+        _names = None
+        if _body.get("attributes"):
+            _names = {
+                (_attribute.get("scope"), _attribute.get("attribute"))
+                for _attribute in _body["attributes"]
+            }
+        try:
+            _devices = self.state.search(_body.get("filters") or [])
+        except (ValueError, re.error, TypeError) as e:
+            return _error(400, str(e))
+        return web.json_response(
+            [
+                {
+                    "id": _device.id,
+                    "attributes": self.state.inventory_attributes(_device, _names),
+                    "updated_ts": _timestamp(_device.updated),
+                }
+                for _device in islice(
+                    _devices, (_page - 1) * _per_page, _page * _per_page
+                )
+            ],
+            headers={"X-Total-Count": str(len(_devices))},
+        )
+
+    # deployments
+
+    async def _post_deployment(self, request):
+        # POST /deployments
+        _body = await request.json()
+        _devices = [
+            _device_id
+            for _device_id in _body.get("devices") or []
+            if _device_id in self.state.by_status["accepted"]
+        ]
+        if not _body.get("name") or not _body.get("artifact_name") or not _devices:
+            return _error(400, "invalid deployment")
+        return self._create_deployment(_body["name"], _body["artifact_name"], _devices)
+
+    async def _post_group_deployment(self, request):
+        # POST /deployments/group/{name}
+        _body = await request.json()
+        _members = self.state.groups.get(request.match_info["name"], {})
+        _devices = [
+            _device.id for _device in _members.values() if _device.status == "accepted"
+        ]
+        if not _body.get("name") or not _body.get("artifact_name") or not _devices:
+            return _error(400, "invalid deployment")
+        return self._create_deployment(_body["name"], _body["artifact_name"], _devices)
+
+    async def _post_filter_deployment(self, request):
+        # POST /deployments (v2)
+        _body = await request.json()
+        _filter = self.state.filters.get(_body.get("filter_id"))
+        if _filter is None:
+            return _error(400, "filter not found")
+        _terms = list(_filter["terms"]) + [
+            {
+                "scope": "identity",
+                "attribute": "status",
+                "type": "$eq",
+                "value": "accepted",
+            }
+        ]
+        _devices = [_device.id for _device in self.state.search(_terms)]
+        if not _body.get("name") or not _body.get("artifact_name") or not _devices:
+            return _error(400, "invalid deployment")
+        return self._create_deployment(_body["name"], _body["artifact_name"], _devices)
+
+    async def _deployments(self, request):
+        # GET /deployments
+        _status = request.query.get("status")
+        _search = request.query.get("search")
+        # newest first unless sort=asc
+        _deployments = list(self.state.deployments.values())
+        if request.query.get("sort", "desc").lower() != "asc":
+            _deployments.reverse()
+        if _status is not None:
+            _deployments = [_d for _d in _deployments if _d.status == _status]
+        if _search is not None:
+            _deployments = [_d for _d in _deployments if _d.name == _search]
+        return web.json_response(
+            [_d.to_dict() for _d in self._page(request, _deployments)]
+        )
+
+    async def _deployment(self, request):
+        # GET /deployments/{id}
+        return web.json_response(self._get_deployment(request).to_dict())
+
+    async def _abort_deployment(self, request):
+        # PUT /deployments/{id}/status
+        _deployment = self._get_deployment(request)
+        if (await request.json()).get("status") != "aborted":
+            return _error(400, "only 'aborted' is supported")
+        if _deployment.status == "finished":
+            return _error(422, "deployment already finished")
+        for _device_id in _deployment.device_ids:
+            if _deployment.device_status(_device_id) not in FINISHED_STATUSES:
+                _deployment.set_device_status(_device_id, "aborted")
+        return web.Response(status=204)
+
+    async def _statistics(self, request):
+        # GET /deployments/{id}/statistics
+        return web.json_response(self._get_deployment(request).counts)
+
+    def _device_doc(self, deployment, device_id):
+        _status = deployment.device_status(device_id)
+        return {
+            "id": device_id,
+            "status": _status,
+            "created": _timestamp(deployment.created),
+            "finished": _timestamp(deployment.finished_at.get(device_id)),
+            "device_type": "",
+            "log": _status == "failure",
+        }
+
+    async def _deployment_devices(self, request):
+        # GET /deployments/{id}/devices
+        _deployment = self._get_deployment(request)
+        return web.json_response(
+            [
+                self._device_doc(_deployment, _device_id)
+                for _device_id in _deployment.device_ids
+            ]
+        )
+
+    async def _deployment_devices_list(self, request):
+        # GET /deployments/{id}/devices/list
+        _deployment = self._get_deployment(request)
+        _status = request.query.get("status")
+        _device_ids = _deployment.device_ids
+        if _status is not None:
+            if _status == "pending":
+                _device_ids = [
+                    _device_id
+                    for _device_id in _device_ids
+                    if _device_id not in _deployment.statuses
+                ]
+            else:
+                _device_ids = [
+                    _device_id
+                    for _device_id, _device_status in _deployment.statuses.items()
+                    if _device_status == _status
+                ]
+        return web.json_response(
+            [
+                self._device_doc(_deployment, _device_id)
+                for _device_id in self._page(request, _device_ids)
+            ],
+            headers={"X-Total-Count": str(len(_device_ids))},
+        )
+
+    async def _deployment_device_log(self, request):
+        # GET /deployments/{id}/devices/{did}/log
+        _deployment = self._get_deployment(request)
+        if _deployment.device_status(request.match_info["did"]) != "failure":
+            return _error(404, "log not found")
+        return web.Response(text="mock installation failure\n")
+
+    async def _delete_device_deployments(self, request):
+        # DELETE /deployments/devices/{id}
+        _device_id = request.match_info["id"]
+        for _deployment_id in self.state.device_deployments.pop(_device_id, ()):
+            _deployment = self.state.deployments[_deployment_id]
+            if _deployment.device_status(_device_id) not in FINISHED_STATUSES:
+                _deployment.set_device_status(_device_id, "decommissioned")
+        return web.Response(status=204)
+
+    async def _releases(self, request):
+        # GET /deployments/releases
+        _releases = {}
+        for _artifact in self.state.artifacts.values():
+            _releases.setdefault(_artifact["name"], []).append(_artifact)
+        return web.json_response(
+            [
+                {"Name": _name, "Artifacts": _artifacts}
+                for _name, _artifacts in sorted(_releases.items())
+            ]
+        )
+
+    async def _storage_limit(self, request):
+        # GET /limits/storage
+        _usage = sum(_a["size"] for _a in self.state.artifacts.values())
+        return web.json_response({"limit": 0, "usage": _usage})
+
+    # artifacts
+
+    async def _artifacts(self, request):
+        # GET /artifacts
+        return web.json_response(list(self.state.artifacts.values()))
+
+    async def _upload_artifact(self, request):
+        # POST /artifacts
+        _form = await request.post()
+        _file = _form.get("artifact")
+        if _file is None or not hasattr(_file, "file"):
+            return _error(400, "missing artifact")
+        _size = len(_file.file.read())
+        _artifact = {
+            "id": str(uuid.uuid4()),
+            "name": re.sub(r"\.mender$", "", _file.filename or "artifact"),
+            "description": _form.get("description", ""),
+            "device_types_compatible": [],
+            "size": _size,
+            "modified": _timestamp(time.time()),
+        }
+        self.state.artifacts[_artifact["id"]] = _artifact
+        return web.Response(
+            status=201,
+            headers={
+                "Location": "%s/v1/deployments/artifacts/%s"
+                % (_MANAGEMENT, _artifact["id"])
+            },
+        )
+
+    def _get_artifact(self, request):
+        _artifact = self.state.artifacts.get(request.match_info["id"])
+        if _artifact is None:
+            raise web.HTTPNotFound(text="artifact not found")
+        return _artifact
+
+    async def _artifact(self, request):
+        # GET /artifacts/{id}
+        return web.json_response(self._get_artifact(request))
+
+    async def _update_artifact(self, request):
+        # PUT /artifacts/{id}
+        self._get_artifact(request)["description"] = (await request.json()).get(
+            "description", ""
+        )
+        return web.Response(status=204)
+
+    async def _delete_artifact(self, request):
+        # DELETE /artifacts/{id}
+        del self.state.artifacts[self._get_artifact(request)["id"]]
+        return web.Response(status=204)
+
+    async def _download_link(self, request):
+        # GET /artifacts/{id}/download
+        _artifact = self._get_artifact(request)
+        return web.json_response(
+            {
+                "uri": "%s://%s/download/%s"
+                % (request.scheme, request.host, _artifact["id"]),
+                "expire": _timestamp(time.time() + 900),
+            }
+        )
+
+    # device API
+
+    async def _auth_request(self, request):
+        # POST /authentication/auth_requests
+        try:
+            _body = await request.json()
+            _identity = json.loads(_body["id_data"])
+        except (KeyError, TypeError, ValueError):
+            return _error(400, "invalid auth request")
+        _device = self.state.find_by_identity(_identity)
+        if _device is None:
+            self.state.add_device(_identity, _body.get("pubkey"), "pending")
+            return _error(401, "device not accepted")
+        if _device.pubkey is None:
+            _device.pubkey = _body.get("pubkey")
+        if _device.status == "preauthorized":
+            self.state.set_status(_device, "accepted")
+        if _device.status != "accepted":
+            return _error(401, "device not accepted")
+        _token, _token_id = _make_token(_device.id, self.token_lifetime)
+        self.state.device_tokens[_token] = _device.id
+        self.state.token_ids[_token_id] = _token
+        return web.Response(text=_token, content_type="application/jwt")
+
+    async def _update_inventory(self, request):
+        # PATCH /inventory/device/attributes
+        _device = request["device"]
+        _attributes = _device.attributes or {}
+        for _attribute in await request.json():
+            _attributes[_attribute["name"]] = _attribute.get("value")
+        _device.attributes = _attributes
+        _device.updated = time.time()
+        return web.Response(status=200)
+
+    async def _next_deployment(self, request):
+        # GET /deployments/device/deployments/next
+        _device = request["device"]
+        for _deployment_id in self.state.device_deployments.get(_device.id, ()):
+            _deployment = self.state.deployments[_deployment_id]
+            if _deployment.device_status(_device.id) in FINISHED_STATUSES:
+                continue
+            if _deployment.artifact_name == request.query.get("artifact_name"):
+                _deployment.set_device_status(_device.id, "already-installed")
+                continue
+            return web.json_response(
+                {
+                    "id": _deployment.id,
+                    "artifact": {
+                        "id": str(uuid.uuid5(uuid.NAMESPACE_URL, _deployment.id)),
+                        "artifact_name": _deployment.artifact_name,
+                        "source": {
+                            "uri": "%s://%s/download/%s"
+                            % (request.scheme, request.host, _deployment.id),
+                            "expire": _timestamp(time.time() + 900),
+                        },
+                        "device_types_compatible": [
+                            request.query.get("device_type", "")
+                        ],
+                    },
+                }
+            )
+        return web.Response(status=204)
+
+    async def _update_deployment_status(self, request):
+        # PUT /deployments/device/deployments/{id}/status
+        _device = request["device"]
+        _deployment = self.state.deployments.get(request.match_info["id"])
+        if (
+            _deployment is None
+            or _deployment.id not in self.state.device_deployments.get(_device.id, ())
+        ):
+            return _error(404, "deployment not found")
+        _status = (await request.json()).get("status")
+        if _status not in DEPLOYMENT_STATUSES or _status == "pending":
+            return _error(400, "invalid status '%s'" % _status)
+        if _deployment.device_status(_device.id) == "aborted":
+            return _error(409, "deployment aborted")
+        _deployment.set_device_status(_device.id, _status)
+        return web.Response(status=204)
+
+
+def _error(status, message):
+    return web.json_response({"error": message}, status=status)
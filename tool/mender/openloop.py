@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from mender import stats
+
+
+logger = logging.getLogger("openloop")
+
+DISTRIBUTIONS = ("constant", "poisson")
+# threads sending the blocking calls
+DEFAULT_WORKERS = 32
+
+
+def arrival_times(rate, duration=None, distribution="constant", seed=None):
+    """
+    Timeline of the calls, fixed before starting whatever the response times
+    :param rate: 'float' mean number of calls per second
+    :param duration: 'float' seconds covered by the timeline, None for endless
+    :param distribution: 'string' "constant" for calls evenly spaced,
+                         "poisson" for random independent arrivals
+    :param seed: 'int' seed of the Poisson arrivals, to replay the same ones
+    :return: 'generator' of 'float' seconds from the start
+    """
+    if rate <= 0:
+        raise ValueError("the rate must be positive, not %s" % rate)
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(
+            "unknown distribution '%s', one of: %s"
+            % (distribution, ", ".join(DISTRIBUTIONS))
+        )
+    _random = random.Random(seed)
+    _index = 0
+    _offset = 0.0
+    while True:
+        if distribution == "constant":
+            _offset = _index / rate
+        elif _index > 0:
+            _offset += _random.expovariate(rate)
+        if duration is not None and _offset >= duration:
+            return
+        yield _offset
+        _index += 1
+
+
+def status_of(result):
+    """
+    :param result: value returned by a mender client call
+    :return: status recorded for the call: the status code of the device API
+             calls, stats.STATUS_OK for the management calls returning a
+             result and stats.STATUS_FAILED for the ones returning None
+    """
+    if isinstance(result, tuple):
+        return result[0]
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    if result is None:
+        return stats.STATUS_FAILED
+    return stats.STATUS_OK
+
+
+class OpenLoop:
+    """
+    Sends calls on a timeline of arrivals fixed in advance, independent of
+    the response times (open loop).
+
+    The latency of a call is measured from the time it should have been sent,
+    not from the time it was sent: when the backend (or the sender itself)
+    stalls, all the calls which should have been sent during the stall show
+    it, instead of being silently delayed as in a loop waiting for every
+    response before sending the next call (coordinated omission). How late
+    the calls were actually sent is kept in 'lag'.
+    """
+
+    def __init__(
+        self,
+        rate,
+        distribution="constant",
+        seed=None,
+        record=None,
+        workers=DEFAULT_WORKERS,
+    ):
+        """
+        :param rate: 'float' mean number of calls per second
+        :param distribution: 'string' one of DISTRIBUTIONS
+        :param seed: 'int' seed of the Poisson arrivals
+        :param record: function(key, seconds, status) recording the latency of
+                       a call, stats.statistics.record by default
+        :param workers: 'int' threads sending the calls of run(), calls due
+                        while all of them are busy wait for a free one
+        """
+        self.rate = rate
+        self.distribution = distribution
+        self.seed = seed
+        self.workers = workers
+        self._record = record or stats.statistics.record
+        self.sent = 0
+        self.failed = 0
+        self.lag = stats.Histogram()
+        self._lock = threading.Lock()
+
+    def _timeline(self, duration):
+        return arrival_times(self.rate, duration, self.distribution, self.seed)
+
+    def _done(self, key, intended, sent, status):
+        with self._lock:
+            self.lag.record((sent - intended) * 1000000)
+            if status in (stats.STATUS_ERROR, stats.STATUS_FAILED):
+                self.failed += 1
+        self._record(key, time.perf_counter() - intended, status)
+
+    def run(self, select, duration=None, stop=None):
+        """
+        Sends blocking calls (e.g. the mender clients) from a pool of threads
+        :param select: function(index) returning the key the call is recorded
+                       under and the function doing the call
+        :param duration: 'float' seconds to send calls for, None for endless
+        :param stop: 'threading.Event' stopping the calls when set
+        """
+        _stop = stop or threading.Event()
+
+        def _call(_key, _func, _intended):
+            _sent = time.perf_counter()
+            try:
+                _status = status_of(_func())
+            except Exception as e:
+                logger.debug("Call %s failed: %r" % (_key, e))
+                _status = stats.STATUS_ERROR
+            self._done(_key, _intended, _sent, _status)
+
+        _start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as _executor:
+            for _offset in self._timeline(duration):
+                _intended = _start + _offset
+                if _stop.wait(max(_intended - time.perf_counter(), 0)):
+                    break
+                _key, _func = select(self.sent)
+                _executor.submit(_call, _key, _func, _intended)
+                self.sent += 1
+        self.log()
+
+    async def run_async(self, select, duration=None):
+        """
+        Sends coroutine calls (e.g. the mender.aio clients) from the running
+        event loop
+        :param select: function(index) returning the key the call is recorded
+                       under and the coroutine function doing the call
+        :param duration: 'float' seconds to send calls for, None for endless
+        """
+        _tasks = set()
+
+        async def _call(_key, _func, _intended):
+            _sent = time.perf_counter()
+            try:
+                _status = status_of(await _func())
+            except Exception as e:
+                logger.debug("Call %s failed: %r" % (_key, e))
+                _status = stats.STATUS_ERROR
+            self._done(_key, _intended, _sent, _status)
+
+        _start = time.perf_counter()
+        try:
+            for _offset in self._timeline(duration):
+                _intended = _start + _offset
+                await asyncio.sleep(max(_intended - time.perf_counter(), 0))
+                _key, _func = select(self.sent)
+                _task = asyncio.ensure_future(_call(_key, _func, _intended))
+                _tasks.add(_task)
+                _task.add_done_callback(_tasks.discard)
+                self.sent += 1
+            if _tasks:
+                await asyncio.wait(_tasks)
+        finally:
+            for _task in _tasks:
+                _task.cancel()
+            self.log()
+
+    def log(self):
+        logger.info(
+            "%d calls sent at %s calls/sec (%s), %d failed, send lag p99 %.1f ms, "
+            "max %.1f ms"
+            % (
+                self.sent,
+                self.rate,
+                self.distribution,
+                self.failed,
+                self.lag.percentile(99) / 1000.0,
+                self.lag.max / 1000.0,
+            )
+        )
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+
+logger = logging.getLogger("orchestration")
+
+
+def wait_until(condition, timeout, interval=60, description="condition"):
+    """
+    Calls 'condition' every 'interval' seconds until it returns True or the
+    timeout expires, the first call is done straight away
+    :param condition: function() returning a 'boolean'
+    :param timeout: 'float' max seconds to wait
+    :param interval: 'float' seconds between two calls
+    :param description: 'string' what is waited for, for the logs
+    :return: 'boolean' True if the condition was met
+    """
+    _deadline = time.monotonic() + timeout
+    while True:
+        if condition():
+            return True
+        _left = _deadline - time.monotonic()
+        if _left <= 0:
+            logger.warning(
+                "Timed out after %d sec waiting for %s" % (timeout, description)
+            )
+            return False
+        logger.info("Waiting for %s, %d sec left" % (description, _left))
+        time.sleep(min(interval, _left))
+
+
+class Phase:
+    """
+    Step of a test: an action followed by a wait until its condition is met.
+    The wait ends at the timeout even if the condition is never met, as the
+    fixed sleeps of run_complete_testing.sh did.
+
+    A phase starts when the phases it comes after are finished: by default the
+    previous one, so phases run one after the other unless told otherwise.
+    """
+
+    def __init__(
+        self, name, action=None, condition=None, timeout=0, interval=60, after=None
+    ):
+        """
+        :param name: 'string' name of the phase, unique in a step
+        :param action: function() run once at the beginning of the phase
+        :param condition: function() returning True when the phase is done,
+                          None to move on after the action
+        :param timeout: 'float' max seconds to wait for the condition
+        :param interval: 'float' seconds between two checks of the condition
+        :param after: 'tuple' names of the phases to wait for, None for the
+                      previous phase, () to start with the step
+        """
+        self.name = name
+        self.action = action
+        self.condition = condition
+        self.timeout = timeout
+        self.interval = interval
+        self.after = after
+
+    def run(self):
+        """
+        :return: 'boolean' False if the condition was not met in time
+        """
+        if self.action is not None:
+            self.action()
+        if self.condition is None:
+            return True
+        return wait_until(self.condition, self.timeout, self.interval, self.name)
+
+
+class RunState:
+    """
+    Progress of a run, kept in a JSON file rewritten after every phase so that
+    an interrupted run can be resumed where it stopped
+    """
+
+    def __init__(self, file_name=None):
+        """
+        :param file_name: 'string' state file, None to keep the state in memory
+        """
+        self.file_name = file_name
+        self.steps = {}
+        if file_name is not None and os.path.isfile(file_name):
+            with open(file_name, "r") as f:
+                self.steps = json.load(f)["steps"]
+
+    def step(self, index):
+        """
+        :return: 'dict' state of the step, created if missing
+        """
+        return self.steps.setdefault(str(index), {"phases": {}, "finished": False})
+
+    def last_step(self):
+        """
+        :return: 'tuple' index and state of the last step started, None if none
+        """
+        if not self.steps:
+            return None
+        _index = max(int(_index) for _index in self.steps)
+        return _index, self.steps[str(_index)]
+
+    def save(self):
+        if self.file_name is None:
+            return
+        _tmp_name = self.file_name + ".tmp"
+        with open(_tmp_name, "w") as f:
+            json.dump({"steps": self.steps}, f, indent=2, sort_keys=True)
+        os.replace(_tmp_name, self.file_name)
+
+
+class Orchestrator:
+    """
+    Runs the phases of the steps of a test, each one in its own thread as soon
+    as the phases it comes after are finished, recording when every phase
+    started, how long it took and whether its condition was met. Phases already
+    done in the state file are skipped, so a step can be resumed in the middle.
+    """
+
+    def __init__(self, state_file=None):
+        """
+        :param state_file: 'string' file keeping the progress, see 'RunState'
+        """
+        self.state = RunState(state_file)
+        self._lock = threading.Lock()
+
+    def run_step(self, index, phases, **attributes):
+        """
+        :param index: 'int' index of the step
+        :param phases: 'list' of 'Phase'
+        :param attributes: saved with the step, e.g. the number of devices
+        """
+        _after = {}
+        for _i, _phase in enumerate(phases):
+            if _phase.after is not None:
+                _after[_phase.name] = tuple(_phase.after)
+            elif _i > 0:
+                _after[_phase.name] = (phases[_i - 1].name,)
+            else:
+                _after[_phase.name] = ()
+        for _name, _names in _after.items():
+            for _other in _names:
+                if _other not in _after:
+                    raise ValueError(
+                        "phase '%s' comes after unknown phase '%s'" % (_name, _other)
+                    )
+        _step = self.state.step(index)
+        _step.update(attributes)
+        _finished = set()
+        _waiting = list(phases)
+        _running = 0
+        _results = queue.Queue()
+        while _waiting or _running:
+            _started = True
+            while _started:
+                _started = False
+                for _phase in list(_waiting):
+                    if not all(_name in _finished for _name in _after[_phase.name]):
+                        continue
+                    _waiting.remove(_phase)
+                    _started = True
+                    if _phase.name in _step["phases"]:
+                        logger.info(
+                            "Step %d: phase '%s' already done" % (index, _phase.name)
+                        )
+                        _finished.add(_phase.name)
+                        continue
+                    _running += 1
+                    threading.Thread(
+                        target=self._run_phase,
+                        args=(index, _phase, _step, _results),
+                        daemon=True,
+                    ).start()
+            if not _running:
+                if _waiting:
+                    raise ValueError(
+                        "phases waiting for each other: %s"
+                        % ", ".join(_phase.name for _phase in _waiting)
+                    )
+                break
+            _name, _error = _results.get()
+            _running -= 1
+            if _error is not None:
+                raise _error
+            _finished.add(_name)
+        _step["finished"] = True
+        self.state.save()
+
+    def _run_phase(self, index, phase, step, results):
+        try:
+            logger.info("Step %d: phase '%s' started" % (index, phase.name))
+            _start = time.time()
+            _met = phase.run()
+            _duration = time.time() - _start
+            with self._lock:
+                step["phases"][phase.name] = {
+                    "started": round(_start, 1),
+                    "duration": round(_duration, 1),
+                    "condition_met": _met,
+                }
+                self.state.save()
+            logger.info(
+                "Step %d: phase '%s' finished in %.1f sec"
+                % (index, phase.name, _duration)
+            )
+            results.put((phase.name, None))
+        except Exception as e:
+            logger.error("Step %d: phase '%s' failed: %r" % (index, phase.name, e))
+            results.put((phase.name, e))
+
+    def log_durations(self):
+        for _index, _step in sorted(self.state.steps.items(), key=lambda s: int(s[0])):
+            for _name, _phase in _step["phases"].items():
+                logger.info(
+                    "Step %s: %-15s %8.1f sec%s"
+                    % (
+                        _index,
+                        _name,
+                        _phase["duration"],
+                        "" if _phase["condition_met"] else " (timed out)",
+                    )
+                )
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil
+
+
+logger = logging.getLogger("paging")
+
+
+class PagingError(Exception):
+    """
+    A listing can't be read completely, e.g. a page or the count has failed
+    """
+
+
+class PagedFetcher:
+    """
+    Fetches a paged listing with several pages in flight at the same time.
+
+    The number of pages is taken from the count of items before starting, then
+    up to 'window' pages are requested concurrently and yielded in order. Items
+    seen twice (the fleet has changed while paging) are dropped, and the counts
+    before and after the scan are compared to detect missing items.
+
+    In strict mode (the default) a failed page or count raises PagingError, so
+    an incomplete listing can't be taken for the whole fleet. Otherwise the
+    failed pages are skipped and left in 'failed_pages' for the caller.
+    """
+
+    def __init__(
+        self, fetch_page, get_count, per_page=500, window=8, key="id", strict=True
+    ):
+        """
+        :param fetch_page: function(page, per_page) returning a 'list' or None
+        :param get_count: function() returning the total number of items
+        :param per_page: 'int' number of items per page
+        :param window: 'int' max number of pages requested at the same time
+        :param key: 'string' field identifying an item
+        :param strict: 'boolean' raise PagingError when a page or the count
+                       fails
+        """
+        self._fetch_page = fetch_page
+        self._get_count = get_count
+        self.per_page = per_page
+        self.window = max(window, 1)
+        self.key = key
+        self.strict = strict
+        self.expected = None
+        self.final_count = None
+        self.fetched = 0
+        self.duplicates = 0
+        self.pages = 0
+        self.failed_pages = []
+
+    def __iter__(self):
+        return self.iter_pages()
+
+    def iter_pages(self):
+        """
+        :return: 'generator' of 'list' of items, without duplicates, in order
+        """
+        _start = time.time()
+        self.expected = self._count()
+        _last_page = max(ceil((self.expected or 0) / self.per_page), 1)
+        _seen = set()
+        _futures = {}
+        _next_page = 1
+        _page = 1
+        with ThreadPoolExecutor(max_workers=self.window) as _executor:
+            try:
+                while True:
+                    while _next_page <= _last_page and len(_futures) < self.window:
+                        _futures[_next_page] = _executor.submit(
+                            self._fetch_page, _next_page, self.per_page
+                        )
+                        _next_page += 1
+                    if _page not in _futures:
+                        break
+                    _items = _futures.pop(_page).result()
+                    if _items is None:
+                        self.failed_pages.append(_page)
+                        if self.strict:
+                            raise PagingError("Failed to fetch page %s" % _page)
+                        if _page == _last_page:
+                            break
+                        _page += 1
+                        continue
+                    if len(_items) == 0:
+                        break
+                    self.pages += 1
+                    _unique = []
+                    for _item in _items:
+                        _key = _item.get(self.key)
+                        if _key in _seen:
+                            self.duplicates += 1
+                            continue
+                        _seen.add(_key)
+                        _unique.append(_item)
+                    self.fetched += len(_unique)
+                    if _unique:
+                        yield _unique
+                    if len(_items) < self.per_page:
+                        break
+                    if _page == _last_page:
+                        # the fleet has grown since it was counted
+                        _last_page += 1
+                    _page += 1
+            finally:
+                for _future in _futures.values():
+                    _future.cancel()
+        self.final_count = self._count()
+        logger.debug(
+            "Fetched '%s' items in '%s' pages for '%s' sec"
+            % (self.fetched, self.pages, round(time.time() - _start, 2))
+        )
+        if not self.consistent:
+            logger.warning(
+                "Listing changed while paging: expected %s, fetched %s, count at "
+                "the end %s, duplicates %s, failed pages %s"
+                % (
+                    self.expected,
+                    self.fetched,
+                    self.final_count,
+                    self.duplicates,
+                    self.failed_pages,
+                )
+            )
+
+    def _count(self):
+        _count = self._get_count()
+        if _count is None:
+            if self.strict:
+                raise PagingError("Failed to count the items")
+            logger.warning("Failed to count the items")
+        return _count
+
+    @property
+    def missing(self):
+        """
+        :return: 'int' items counted at the end of the scan but not fetched
+        """
+        if self.final_count is None:
+            return 0
+        return max(self.final_count - self.fetched, 0)
+
+    @property
+    def consistent(self):
+        return (
+            self.duplicates == 0
+            and not self.failed_pages
+            and self.expected == self.fetched == self.final_count
+        )
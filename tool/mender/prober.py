@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import asyncio
+import json
+import logging
+import time
+
+from mender import identity
+from mender import keys
+from mender import keystore
+from mender import openloop
+from mender import stats
+from mender.aio.device_api import DeviceAPI
+
+
+logger = logging.getLogger("prober")
+
+# device API calls done by the prober, in the order every device does them
+ENDPOINTS = ("next", "inventory", "auth")
+# first identity index of the probe devices, far from the ones of the fleet
+DEFAULT_START_INDEX = 1 << 24
+
+
+def summarize(statistics):
+    """
+    :param statistics: 'Statistics' latencies recorded per endpoint
+    :return: 'dict' count, mean, percentiles and max in ms per endpoint
+    """
+    _summary = {}
+    for _key, _histogram in sorted(statistics.histograms.items()):
+        _summary[_key] = {
+            "count": _histogram.count,
+            "mean": round(_histogram.mean() / 1000.0, 2),
+            "p50": round(_histogram.percentile(50) / 1000.0, 2),
+            "p90": round(_histogram.percentile(90) / 1000.0, 2),
+            "p99": round(_histogram.percentile(99) / 1000.0, 2),
+            "max": round(_histogram.max / 1000.0, 2),
+            "status_codes": dict(statistics.status_codes[_key]),
+        }
+    return _summary
+
+
+class DeviceProber:
+    """
+    Measures the latency of the device API as seen by a few real devices.
+
+    The probe devices authenticate with signed auth requests, then the calls
+    are sent by mender.openloop at a fixed rate (or with Poisson arrivals)
+    whatever the latency of the previous ones, and their latency is measured
+    from the time they should have been sent, so a slow backend doesn't slow
+    down the probing and hide its own latency. Every device polls for a
+    deployment, sends its inventory and renews its token in turn. Latencies
+    are kept per endpoint for every time window of 'window' seconds and for
+    the whole run.
+    """
+
+    def __init__(
+        self,
+        server_url,
+        count=10,
+        rate=1.0,
+        distribution="constant",
+        seed=None,
+        endpoints=ENDPOINTS,
+        tenant_token=None,
+        start_index=DEFAULT_START_INDEX,
+        keys_path=None,
+        key_bits=2048,
+        identity_fields=identity.DEFAULT_FIELDS,
+        identity_sku=identity.DEFAULT_SKU,
+        artifact_name="base-image-1019",
+        device_type="cl-som-imx8",
+        window=60,
+    ):
+        """
+        :param server_url: 'string' URL of the backend
+        :param count: 'int' number of probe devices
+        :param rate: 'float' calls per second, for all the devices
+        :param distribution: 'string' arrivals of the calls, see openloop
+        :param seed: 'int' seed of the Poisson arrivals
+        :param endpoints: 'tuple' of calls among ENDPOINTS
+        :param tenant_token: 'string' tenant token or None
+        :param start_index: 'int' index of the first probe device, for the
+                            identities and the keys
+        :param keys_path: 'string' key store file or directory with the private
+                          keys, None to generate them
+        :param key_bits: 'int' size of the generated keys
+        :param identity_fields: 'tuple' identity attributes sent by the devices
+        :param identity_sku: 'string' value of the "sku" identity attribute
+        :param artifact_name: 'string' artifact installed on the devices
+        :param device_type: 'string' device type
+        :param window: 'float' seconds of every window of the time series
+        """
+        for _endpoint in endpoints:
+            if _endpoint not in ENDPOINTS:
+                raise ValueError("unknown endpoint '%s'" % _endpoint)
+        self.server_url = server_url
+        self.count = count
+        self.rate = rate
+        self.distribution = distribution
+        self.seed = seed
+        self.endpoints = endpoints
+        self.tenant_token = tenant_token
+        self.start_index = start_index
+        self.identity_fields = identity_fields
+        self.identity_sku = identity_sku
+        self.artifact_name = artifact_name
+        self.device_type = device_type
+        self.window = window
+        self.devices = []
+        self.statistics = stats.Statistics()
+        self.windows = []
+        self._keys_path = keys_path
+        self._key_bits = key_bits
+        self._logged_windows = 0
+
+    def load_devices(self):
+        """
+        Loads or generates the keys of the probe devices
+        """
+        _source = None
+        if self._keys_path is not None:
+            _source = keystore.open_key_source(self._keys_path)
+            if not _source.contains(self.start_index, self.count):
+                raise ValueError(
+                    "'%s' has no keys for devices %d..%d"
+                    % (self._keys_path, self.start_index, self.start_index + self.count)
+                )
+        self.devices = []
+        for _index in range(self.start_index, self.start_index + self.count):
+            if _source is not None:
+                _key = _source.load_key(_index)
+            else:
+                _key = keys.generate_key(self._key_bits)
+            self.devices.append(
+                DeviceAPI(
+                    self.server_url,
+                    _key,
+                    identity.device_identity(
+                        _index, self.identity_fields, self.identity_sku
+                    ),
+                    tenant_token=self.tenant_token,
+                )
+            )
+        return self.devices
+
+    def preauthorize(self, dev_auth):
+        """
+        Preauthorizes the probe devices, so they are accepted on their first
+        auth request
+        :param dev_auth: 'DeviceAuthentication' client of a user
+        """
+        for _device in self.devices:
+            dev_auth.post_preauthorized_device(
+                keys.public_pem(_device._key), ignore_existing=True, **_device.identity
+            )
+
+    async def authenticate(self, timeout=600, interval=10):
+        """
+        Sends auth requests until all the probe devices are accepted
+        :return: 'int' number of authenticated devices
+        """
+        _deadline = time.monotonic() + timeout
+        _pending = list(self.devices)
+        while _pending:
+            _statuses = await asyncio.gather(
+                *[_device.auth_request() for _device in _pending],
+                return_exceptions=True,
+            )
+            _pending = [
+                _device
+                for _device, _status in zip(_pending, _statuses)
+                if _status != 200
+            ]
+            if not _pending or time.monotonic() + interval > _deadline:
+                break
+            logger.info(
+                "%d probe devices not accepted yet, e.g. %s"
+                % (len(_pending), _pending[0].identity)
+            )
+            await asyncio.sleep(interval)
+        return len(self.devices) - len(_pending)
+
+    def _call(self, device, endpoint):
+        if endpoint == "next":
+            return device.get_next_deployment(self.artifact_name, self.device_type)
+        if endpoint == "inventory":
+            return device.update_inventory(
+                {"artifact_name": self.artifact_name, "device_type": self.device_type}
+            )
+        return device.auth_request()
+
+    def _select(self, index):
+        # every device in turn, all of them doing the same call per round
+        _device = self.devices[index % len(self.devices)]
+        _endpoint = self.endpoints[(index // len(self.devices)) % len(self.endpoints)]
+        self._log_windows()
+        return _endpoint, lambda: self._call(_device, _endpoint)
+
+    def _record(self, endpoint, seconds, status):
+        _index = int((time.time() - self.statistics.started) // self.window)
+        while len(self.windows) <= _index:
+            _window = stats.Statistics()
+            _window.started = self.statistics.started + len(self.windows) * self.window
+            self.windows.append(_window)
+        self.windows[_index].record(endpoint, seconds, status)
+        self.statistics.record(endpoint, seconds, status)
+
+    def _log_windows(self, last=False):
+        _closed = len(self.windows) if last else len(self.windows) - 1
+        while self._logged_windows < _closed:
+            _window = self.windows[self._logged_windows]
+            for _endpoint, _summary in summarize(_window).items():
+                logger.info(
+                    "window %d %-9s count %5d  mean %8.1f  p50 %8.1f  p90 %8.1f  "
+                    "p99 %8.1f  max %8.1f ms  %s"
+                    % (
+                        self._logged_windows,
+                        _endpoint,
+                        _summary["count"],
+                        _summary["mean"],
+                        _summary["p50"],
+                        _summary["p90"],
+                        _summary["p99"],
+                        _summary["max"],
+                        _summary["status_codes"],
+                    )
+                )
+            self._logged_windows += 1
+
+    async def run(self, duration=None):
+        """
+        Probes the device API at the fixed rate for 'duration' seconds, or
+        forever if None
+        """
+        if not self.devices:
+            raise ValueError("no probe devices, call load_devices() first")
+        self.statistics.reset()
+        self.windows = []
+        self._logged_windows = 0
+        _engine = openloop.OpenLoop(
+            self.rate, self.distribution, seed=self.seed, record=self._record
+        )
+        try:
+            await _engine.run_async(self._select, duration=duration)
+        finally:
+            self.statistics.finished = time.time()
+            self._log_windows(last=True)
+
+    def report(self):
+        return {
+            "rate": self.rate,
+            "distribution": self.distribution,
+            "devices": self.count,
+            "window": self.window,
+            "started": self.statistics.started,
+            "finished": self.statistics.finished,
+            "total": summarize(self.statistics),
+            "windows": [
+                {"started": _window.started, "endpoints": summarize(_window)}
+                for _window in self.windows
+            ],
+        }
+
+    def save(self, file_name):
+        with open(file_name, "w") as _f:
+            json.dump(self.report(), _f, indent=2)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import os
+import threading
+import time
+
+from mender import stats
+
+
+SERVICES = ("useradm", "devauth", "inventory", "deployments")
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket: 'rate' tokens per second, at most 'burst' saved.
+
+    Tokens are reserved in advance, a caller which can't get one right away is
+    told how long to wait for its turn, so callers are served in order.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: 'float' tokens added per second
+        :param burst: 'float' max tokens in the bucket, defaults to one second
+                      worth of tokens (and at least 1)
+        """
+        self.rate = float(rate)
+        self.burst = float(burst) if burst else max(self.rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        :return: 'float' seconds to wait before using the reserved tokens
+        """
+        with self._lock:
+            _now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (_now - self._updated) * self.rate
+            )
+            self._updated = _now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens=1):
+        """
+        Blocks until the tokens are available
+        :return: 'float' seconds waited
+        """
+        _delay = self.reserve(tokens)
+        if _delay > 0:
+            time.sleep(_delay)
+        return _delay
+
+
+class RateLimiter:
+    """
+    Global bucket for all the calls plus one optional bucket per micro-service
+    """
+
+    def __init__(self, rate=None, service_rates=None, burst=None):
+        """
+        :param rate: 'float' max calls per second in total, None for no limit
+        :param service_rates: 'dict' service name to max calls per second
+        :param burst: 'float' max calls allowed at once in every bucket
+        """
+        self._global = TokenBucket(rate, burst) if rate else None
+        self._services = {
+            _service: TokenBucket(_rate, burst)
+            for _service, _rate in (service_rates or {}).items()
+            if _rate
+        }
+
+    @property
+    def enabled(self):
+        return self._global is not None or len(self._services) > 0
+
+    def reserve(self, service):
+        """
+        :param service: 'string' name of the micro-service called
+        :return: 'float' seconds to wait before doing the call
+        """
+        _delay = 0.0
+        if self._global is not None:
+            _delay = self._global.reserve()
+        _bucket = self._services.get(service)
+        if _bucket is not None:
+            _delay = max(_delay, _bucket.reserve())
+        return _delay
+
+    def acquire(self, service):
+        """
+        Blocks until a call to the service is allowed
+        :return: 'float' seconds waited
+        """
+        if not self.enabled:
+            return 0.0
+        _delay = self.reserve(service)
+        record_wait(service, _delay)
+        if _delay > 0:
+            time.sleep(_delay)
+        return _delay
+
+
+def record_wait(service, delay):
+    """
+    Counts the calls delayed by the limiter and the time they waited, apart
+    from the latencies of the endpoints
+    :param service: 'string' name of the micro-service called
+    :param delay: 'float' seconds the call waited
+    """
+    if delay > 0:
+        stats.statistics.increment("ratelimit throttled: %s" % service)
+        stats.statistics.increment(
+            "ratelimit wait ms: %s" % service, int(round(delay * 1000))
+        )
+
+
+def _env_rate(name):
+    _value = os.getenv(name)
+    return float(_value) if _value else None
+
+
+def from_env():
+    """
+    Builds a limiter from MENDER_RATE_LIMIT (all calls), MENDER_RATE_LIMIT_<SERVICE>
+    (e.g. MENDER_RATE_LIMIT_DEVAUTH) and MENDER_RATE_LIMIT_BURST
+    """
+    return RateLimiter(
+        rate=_env_rate("MENDER_RATE_LIMIT"),
+        service_rates={
+            _service: _env_rate("MENDER_RATE_LIMIT_%s" % _service.upper())
+            for _service in SERVICES
+        },
+        burst=_env_rate("MENDER_RATE_LIMIT_BURST"),
+    )
+
+
+# limiter shared by all the calls of this process
+limiter = from_env()
+
+
+def configure(rate=None, service_rates=None, burst=None):
+    """
+    Replaces the limiter shared by all the calls of this process
+    """
+    global limiter
+    limiter = RateLimiter(rate=rate, service_rates=service_rates, burst=burst)
+
+
+def add_arguments(parser):
+    """
+    Adds the rate limit options to a configargparse parser
+    """
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        required=False,
+        default=None,
+        env_var="MENDER_RATE_LIMIT",
+        help="Max management API calls per second, all services together",
+    )
+    for _service in SERVICES:
+        parser.add_argument(
+            "--rate-limit-%s" % _service,
+            type=float,
+            required=False,
+            default=None,
+            env_var="MENDER_RATE_LIMIT_%s" % _service.upper(),
+            help="Max %s API calls per second" % _service,
+        )
+    parser.add_argument(
+        "--rate-limit-burst",
+        type=float,
+        required=False,
+        default=None,
+        env_var="MENDER_RATE_LIMIT_BURST",
+        help="Max API calls allowed at once above the rate",
+    )
+
+
+def configure_from_args(conf):
+    """
+    Applies the options added by add_arguments()
+    """
+    configure(
+        rate=conf.rate_limit,
+        service_rates={
+            _service: getattr(conf, "rate_limit_%s" % _service) for _service in SERVICES
+        },
+        burst=conf.rate_limit_burst,
+    )
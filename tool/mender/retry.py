@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import os
+import random
+import time
+
+from email.utils import parsedate_to_datetime
+
+
+# status codes returned by the backend when it is shedding load
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+# methods which can be repeated without changing the result
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+def parse_retry_after(value):
+    """
+    :param value: 'string' Retry-After header, in seconds or as an HTTP date
+    :return: 'float' seconds to wait or None if missing or not valid
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed call is repeated and how long to wait before.
+
+    Waits grow exponentially with full jitter, unless the backend tells how
+    long to wait with Retry-After. A call is never retried once its budget of
+    time (counted from the first attempt) would be exceeded.
+    """
+
+    def __init__(
+        self,
+        attempts=5,
+        backoff=0.5,
+        max_backoff=30.0,
+        budget=120.0,
+        status_codes=RETRY_STATUS_CODES,
+        retry_non_idempotent=False,
+    ):
+        """
+        :param attempts: 'int' max number of attempts, 1 disables the retries
+        :param backoff: 'float' base wait in seconds, doubled on every attempt
+        :param max_backoff: 'float' max wait between two attempts
+        :param budget: 'float' max seconds spent on one call, retries included
+        :param status_codes: 'tuple' status codes worth retrying
+        :param retry_non_idempotent: 'boolean' retry also POST and PATCH calls
+        """
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.status_codes = status_codes
+        self.retry_non_idempotent = retry_non_idempotent
+
+    def is_retryable(self, method, idempotent=None):
+        """
+        :param method: 'string' HTTP method
+        :param idempotent: 'boolean' overrides the rule based on the method
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        return idempotent or self.retry_non_idempotent
+
+    def next_delay(self, method, attempt, started, retry_after=None, idempotent=None):
+        """
+        :param method: 'string' HTTP method of the failed call
+        :param attempt: 'int' number of attempts done so far
+        :param started: 'float' time.monotonic() of the first attempt
+        :param retry_after: 'string' Retry-After header of the response
+        :param idempotent: 'boolean' overrides the rule based on the method
+        :return: 'float' seconds to wait before retrying or None to give up
+        """
+        if attempt >= self.attempts or not self.is_retryable(method, idempotent):
+            return None
+        _delay = parse_retry_after(retry_after)
+        if _delay is None:
+            _delay = random.uniform(
+                0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+            )
+        if time.monotonic() + _delay - started > self.budget:
+            return None
+        return _delay
+
+
+# no retries at all, e.g. for calls whose failure is the expected result
+NO_RETRY = RetryPolicy(attempts=1)
+
+
+def default_policy():
+    return RetryPolicy(
+        attempts=int(os.getenv("MENDER_RETRY_ATTEMPTS", "5")),
+        backoff=float(os.getenv("MENDER_RETRY_BACKOFF", "0.5")),
+        budget=float(os.getenv("MENDER_RETRY_BUDGET", "120")),
+    )
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import logging
+import re
+import time
+
+from datetime import datetime, timezone
+
+
+logger = logging.getLogger("rollout")
+
+# statuses of the devices of a deployment, in the order of the report
+STATUSES = (
+    "pending",
+    "downloading",
+    "installing",
+    "rebooting",
+    "success",
+    "failure",
+    "noartifact",
+    "already-installed",
+    "aborted",
+    "decommissioned",
+)
+# devices which got the update
+UPDATED_STATUSES = ("success", "already-installed")
+# devices which are done with the deployment, updated or not
+FINISHED_STATUSES = UPDATED_STATUSES + (
+    "failure",
+    "noartifact",
+    "aborted",
+    "decommissioned",
+)
+# milestones of the report, in percents of the devices updated
+MILESTONES = (50, 90, 100)
+
+_TIMESTAMP = re.compile(r"(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(\.\d+)?(Z|[+-]\d\d:\d\d)")
+
+
+def parse_timestamp(value):
+    """
+    :param value: 'string' RFC 3339 timestamp as returned by the API, with up
+                  to nanoseconds
+    :return: 'float' seconds since the epoch or None if not valid
+    """
+    _match = _TIMESTAMP.match(value or "")
+    if _match is None:
+        return None
+    _zone = _match.group(3).replace("Z", "+00:00")
+    _fraction = (_match.group(2) or ".0")[:7]
+    _time = datetime.strptime(_match.group(1), "%Y-%m-%dT%H:%M:%S").replace(
+        tzinfo=timezone.utc
+    )
+    _sign = -1 if _zone[0] == "+" else 1
+    _offset = _sign * (int(_zone[1:3]) * 3600 + int(_zone[4:6]) * 60)
+    return _time.timestamp() + float(_fraction) + _offset
+
+
+class RolloutMonitor:
+    """
+    Follows a deployment from its creation, polling its statistics to build a
+    time series of the number of devices per status.
+
+    The statistics are polled every 'min_interval' seconds while the counts
+    change, and the interval doubles up to 'max_interval' while they don't.
+    Once the deployment is finished, the finish times of its devices are read
+    from the paged device list, to get the milestones to the second instead of
+    to the polling interval.
+    """
+
+    def __init__(
+        self,
+        deployments,
+        deployment_id,
+        target=1800,
+        min_interval=5,
+        max_interval=60,
+        per_page=500,
+    ):
+        """
+        :param deployments: 'Deployments' client
+        :param deployment_id: 'string' id of the deployment
+        :param target: 'float' seconds in which all the devices have to be
+                       updated, one poll interval of the devices for TEST 301
+        :param min_interval: 'float' min seconds between two polls
+        :param max_interval: 'float' max seconds between two polls
+        :param per_page: 'int' devices per page of the device list
+        """
+        self._deployments = deployments
+        self.deployment_id = deployment_id
+        self.target = target
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.per_page = per_page
+        self.created = None
+        self.samples = []
+        self.finish_times = None
+
+    def sample(self):
+        """
+        Polls the statistics once
+        :return: 'dict' number of devices per status, None if the call failed
+        """
+        _statistics = self._deployments.get_deployment_statistics(self.deployment_id)
+        if _statistics is None:
+            return None
+        _counts = {_status: _statistics.get(_status, 0) for _status in STATUSES}
+        self.samples.append((time.time(), _counts))
+        return _counts
+
+    def run(self, timeout=7200):
+        """
+        Polls until all the devices are done with the deployment or the timeout
+        expires, then reads the finish times of the devices
+        :param timeout: 'float' max seconds to follow the deployment
+        :return: 'dict' report, see report()
+        """
+        _deployment = self._deployments.get_deployment(self.deployment_id)
+        if _deployment is None:
+            raise ValueError("deployment '%s' not found" % self.deployment_id)
+        self.created = parse_timestamp(_deployment.get("created")) or time.time()
+        _deadline = time.monotonic() + timeout
+        _interval = self.min_interval
+        _previous = None
+        while True:
+            _counts = self.sample()
+            if _counts is not None:
+                _total = sum(_counts.values())
+                _finished = sum(_counts[_status] for _status in FINISHED_STATUSES)
+                logger.info(
+                    "Deployment %s: %s"
+                    % (
+                        self.deployment_id,
+                        ", ".join(
+                            "%s %d" % (_status, _counts[_status])
+                            for _status in STATUSES
+                            if _counts[_status]
+                        ),
+                    )
+                )
+                if _total > 0 and _finished == _total:
+                    break
+                if _counts == _previous:
+                    _interval = min(_interval * 2, self.max_interval)
+                else:
+                    _interval = self.min_interval
+                _previous = _counts
+            if time.monotonic() + _interval > _deadline:
+                logger.warning(
+                    "Deployment %s not finished after %d sec"
+                    % (self.deployment_id, timeout)
+                )
+                break
+            time.sleep(_interval)
+        self.finish_times = self.read_finish_times()
+        return self.report()
+
+    def read_finish_times(self):
+        """
+        :return: 'list' sorted finish times (seconds since the epoch) of the
+                 updated devices, None if the device list can't be read
+        """
+        _times = []
+        for _status in UPDATED_STATUSES:
+            _page = 1
+            while True:
+                _devices = self._deployments.get_deployment_devices_list(
+                    self.deployment_id,
+                    status=_status,
+                    page=_page,
+                    per_page=self.per_page,
+                )
+                if _devices is None:
+                    return None
+                for _device in _devices:
+                    _finished = parse_timestamp(_device.get("finished"))
+                    if _finished is not None:
+                        _times.append(_finished)
+                if len(_devices) < self.per_page:
+                    break
+                _page += 1
+        return sorted(_times)
+
+    def total(self):
+        """
+        :return: 'int' number of devices of the deployment
+        """
+        if not self.samples:
+            return 0
+        return sum(self.samples[-1][1].values())
+
+    def milestone(self, percent):
+        """
+        :param percent: 'float' share of the devices updated, 0..100
+        :return: 'float' seconds from the creation of the deployment until that
+                 share of devices was updated, None if not reached
+        """
+        _needed = max(int(-(-percent * self.total() // 100)), 1)
+        if self.finish_times is not None and len(self.finish_times) >= _needed:
+            return max(self.finish_times[_needed - 1] - self.created, 0.0)
+        # interpolated between the two samples around the milestone
+        _previous_time, _previous_updated = self.created, 0
+        for _time, _counts in self.samples:
+            _updated = sum(_counts[_status] for _status in UPDATED_STATUSES)
+            if _updated >= _needed:
+                _share = (_needed - _previous_updated) / (_updated - _previous_updated)
+                return _previous_time + _share * (_time - _previous_time) - self.created
+            _previous_time, _previous_updated = _time, _updated
+        return None
+
+    def throughput(self):
+        """
+        :return: 'tuple' average and peak devices updated per minute
+        """
+        _average = 0.0
+        _peak = 0.0
+        _previous_time, _previous_updated = self.created, 0
+        for _time, _counts in self.samples:
+            _updated = sum(_counts[_status] for _status in UPDATED_STATUSES)
+            if _time > _previous_time:
+                _rate = (_updated - _previous_updated) * 60.0 / (_time - _previous_time)
+                _peak = max(_peak, _rate)
+            if _time > self.created:
+                _average = _updated * 60.0 / (_time - self.created)
+            _previous_time, _previous_updated = _time, _updated
+        return _average, _peak
+
+    def report(self):
+        """
+        :return: 'dict' time series, throughput, milestones and verdict
+        """
+        _average, _peak = self.throughput()
+        _milestones = {
+            "%d%%" % _percent: self.milestone(_percent) for _percent in MILESTONES
+        }
+        _done = _milestones["100%"]
+        return {
+            "deployment_id": self.deployment_id,
+            "created": self.created,
+            "devices": self.total(),
+            "target": self.target,
+            "samples": [
+                dict(_counts, elapsed=round(_time - self.created, 1))
+                for _time, _counts in self.samples
+            ],
+            "throughput_per_minute": round(_average, 1),
+            "peak_throughput_per_minute": round(_peak, 1),
+            "milestones": {
+                _name: None if _value is None else round(_value, 1)
+                for _name, _value in _milestones.items()
+            },
+            "passed": _done is not None and _done <= self.target,
+        }
+
+    def log_report(self):
+        _report = self.report()
+        logger.info(
+            "Deployment %s: %d devices, %.1f devices/min (peak %.1f)"
+            % (
+                self.deployment_id,
+                _report["devices"],
+                _report["throughput_per_minute"],
+                _report["peak_throughput_per_minute"],
+            )
+        )
+        for _name, _value in _report["milestones"].items():
+            logger.info(
+                "Deployment %s: %s updated %s"
+                % (
+                    self.deployment_id,
+                    _name,
+                    "never" if _value is None else "after %.1f sec" % _value,
+                )
+            )
+        logger.info(
+            "Deployment %s: %s, all the devices updated within %d sec"
+            % (
+                self.deployment_id,
+                "PASS" if _report["passed"] else "FAIL",
+                self.target,
+            )
+        )
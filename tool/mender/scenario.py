@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import logging
+import threading
+import time
+
+import toml
+
+from mender import bulk
+from mender import openloop
+from mender import orchestration
+from mender import stats
+
+
+logger = logging.getLogger("scenario")
+
+# metrics of the latency thresholds, in milliseconds
+LATENCY_METRICS = ("mean", "p50", "p90", "p99", "max")
+
+
+def run_workload(
+    call,
+    rate=None,
+    duration=60,
+    concurrency=None,
+    name="workload",
+    distribution="constant",
+):
+    """
+    Calls a management API endpoint over and over for 'duration' seconds. The
+    calls are recorded by mender.stats as any other call.
+
+    With a 'rate', the calls are sent on an open-loop timeline (see
+    mender.openloop) and their latency from the time they should have been
+    sent is also recorded as 'workload <name>'. Without, 'concurrency' threads
+    call the endpoint as fast as it answers.
+    :param call: function() doing one call
+    :param rate: 'float' calls per second, None for no limit
+    :param duration: 'float' seconds to run for
+    :param concurrency: 'int' calls in flight at the same time, defaults to 32
+                        with a rate and 1 without
+    :param name: 'string' name the open-loop latencies are recorded under
+    :param distribution: 'string' arrivals of the open-loop calls
+    :return: 'int' number of calls which failed
+    """
+    if rate:
+        _key = "workload %s" % name
+        _engine = openloop.OpenLoop(
+            rate, distribution, workers=concurrency or openloop.DEFAULT_WORKERS
+        )
+        _engine.run(lambda _index: (_key, call), duration=duration)
+        return _engine.failed
+    concurrency = concurrency or 1
+    _deadline = time.monotonic() + duration
+    _failed = [0]
+    _lock = threading.Lock()
+
+    def _ticks():
+        while time.monotonic() < _deadline:
+            yield None
+
+    def _call(_):
+        try:
+            call()
+        except Exception as e:
+            logger.debug("Workload call failed: %r" % e)
+            with _lock:
+                _failed[0] += 1
+
+    bulk.run_concurrently(_call, _ticks(), concurrency)
+    return _failed[0]
+
+
+def check_thresholds(thresholds, statistics):
+    """
+    Compares the statistics of the calls with the pass/fail thresholds
+    :param thresholds: 'dict' endpoint key (see stats.route_key) to 'dict' of
+                       limits: latency metrics in ms, "error_rate" (share of
+                       calls not answered with a 2xx) and "min_count"
+    :param statistics: 'stats.Statistics' of the run
+    :return: 'list' of 'string' describing the thresholds exceeded
+    """
+    _failures = []
+    for _key, _limits in thresholds.items():
+        _histogram = statistics.histograms.get(_key)
+        if _histogram is None or _histogram.count == 0:
+            _failures.append("%s: no calls" % _key)
+            continue
+        _values = {
+            "mean": _histogram.mean() / 1000.0,
+            "p50": _histogram.percentile(50) / 1000.0,
+            "p90": _histogram.percentile(90) / 1000.0,
+            "p99": _histogram.percentile(99) / 1000.0,
+            "max": _histogram.max / 1000.0,
+        }
+        _errors = sum(
+            _count
+            for _status, _count in statistics.status_codes[_key].items()
+            if not stats.succeeded(_status)
+        )
+        _values["error_rate"] = _errors / _histogram.count
+        for _metric, _limit in _limits.items():
+            if _metric == "min_count":
+                if _histogram.count < _limit:
+                    _failures.append(
+                        "%s: %d calls, less than %d" % (_key, _histogram.count, _limit)
+                    )
+                continue
+            if _metric not in _values:
+                raise ValueError("unknown threshold '%s' for '%s'" % (_metric, _key))
+            if _values[_metric] > _limit:
+                _failures.append(
+                    "%s: %s %.3f above %s" % (_key, _metric, _values[_metric], _limit)
+                )
+    return _failures
+
+
+class Scenario:
+    """
+    Load test plan read from a TOML file:
+
+    * [fleet]: 'devices' started at every step, the last value repeated until
+      'steps' steps are done
+    * [clients]: parameters of the stress test clients
+    * [[phases]]: what every step does, each phase with a 'name', an 'action'
+      or a 'workload', a 'condition' with its 'timeout', and 'after' to
+      overlap it with others (see orchestration.Phase)
+    * [ui]: how the UI phases are done, with a browser or emulated users
+    * [thresholds]: latency and error limits per endpoint, see
+      check_thresholds()
+    """
+
+    def __init__(self, data, name=None):
+        """
+        :param data: 'dict' content of the scenario file
+        :param name: 'string' name of the scenario, defaults to the 'name' key
+        """
+        self.name = name or data.get("name", "scenario")
+        _fleet = data.get("fleet", {})
+        self.devices = list(_fleet.get("devices", []))
+        self.steps = _fleet.get("steps", len(self.devices))
+        self.clients = dict(data.get("clients", {}))
+        self.phase_specs = list(data.get("phases", []))
+        self.ui = dict(data.get("ui", {}))
+        self.thresholds = dict(data.get("thresholds", {}))
+        if not self.devices:
+            raise ValueError("scenario '%s' starts no devices" % self.name)
+        _names = [_spec["name"] for _spec in self.phase_specs]
+        if len(set(_names)) != len(_names):
+            raise ValueError("scenario '%s' has phases with the same name" % self.name)
+        for _spec in self.phase_specs:
+            for _other in _spec.get("after", []):
+                if _other not in _names:
+                    raise ValueError(
+                        "phase '%s' comes after unknown phase '%s'"
+                        % (_spec["name"], _other)
+                    )
+
+    @classmethod
+    def load(cls, file_name):
+        with open(file_name, "r") as f:
+            return cls(toml.load(f))
+
+    def devices_qty(self, index):
+        """
+        :return: 'int' number of devices started by the step
+        """
+        return self.devices[min(index, len(self.devices) - 1)]
+
+    def expected_devices(self, index):
+        """
+        :return: 'int' number of devices started by the steps up to 'index'
+        """
+        return sum(self.devices_qty(_index) for _index in range(index + 1))
+
+    def phases(self, actions, conditions, workloads, interval=60):
+        """
+        Builds the phases of one step
+        :param actions: 'dict' action name to function()
+        :param conditions: 'dict' condition name to function() returning True
+                           when the phase is done
+        :param workloads: 'dict' workload name to function() doing one call
+        :param interval: 'float' seconds between two checks of the conditions
+        :return: 'list' of 'orchestration.Phase'
+        """
+        _phases = []
+        for _spec in self.phase_specs:
+            _action = None
+            if "action" in _spec:
+                _action = _lookup(actions, "action", _spec["action"])
+            elif "workload" in _spec:
+                _action = _workload_action(
+                    _lookup(workloads, "workload", _spec["workload"]), _spec
+                )
+            _condition = None
+            if "condition" in _spec:
+                _condition = _lookup(conditions, "condition", _spec["condition"])
+            _phases.append(
+                orchestration.Phase(
+                    _spec["name"],
+                    action=_action,
+                    condition=_condition,
+                    timeout=_spec.get("timeout", 0),
+                    interval=_spec.get("interval", interval),
+                    after=_spec.get("after"),
+                )
+            )
+        return _phases
+
+
+def _lookup(functions, kind, name):
+    if name not in functions:
+        raise ValueError(
+            "unknown %s '%s', one of: %s" % (kind, name, ", ".join(sorted(functions)))
+        )
+    return functions[name]
+
+
+def _workload_action(call, spec):
+    def _action():
+        _failed = run_workload(
+            call,
+            rate=spec.get("rate"),
+            duration=spec.get("duration", 60),
+            concurrency=spec.get("concurrency"),
+            name=spec["name"],
+            distribution=spec.get("arrivals", "constant"),
+        )
+        if _failed:
+            logger.warning("Workload '%s': %d calls failed" % (spec["name"], _failed))
+
+    return _action
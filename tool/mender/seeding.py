@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+import logging
+import os
+import time
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from mender import bulk
+from mender import identity
+from mender import keys
+from mender import keystore
+from mender import stats
+
+
+logger = logging.getLogger("seeding")
+
+# key sources opened by a worker process, kept between chunks
+_sources = {}
+
+
+def _public_keys(path, start, count):
+    """
+    Reads the public keys of the devices [start, start + count), in a worker
+    process
+    :return: 'list' of PEM public keys
+    """
+    _source = _sources.get(path)
+    if _source is None:
+        _source = _sources[path] = keystore.open_key_source(path)
+    return [
+        keys.public_pem(_source.load_key(_index))
+        for _index in range(start, start + count)
+    ]
+
+
+class Checkpoint:
+    """
+    Chunks of devices already done, kept in a file with one "start count" line
+    per chunk, written as soon as a chunk is done
+    """
+
+    def __init__(self, file_name=None):
+        """
+        :param file_name: 'string' checkpoint file, None to keep nothing
+        """
+        self.file_name = file_name
+        self._done = set()
+        if file_name is not None and os.path.isfile(file_name):
+            with open(file_name, "r") as f:
+                for _line in f:
+                    _start, _count = _line.split()
+                    self._done.add((int(_start), int(_count)))
+
+    def is_done(self, start, count):
+        return (start, count) in self._done
+
+    def add(self, start, count):
+        self._done.add((start, count))
+        if self.file_name is not None:
+            with open(self.file_name, "a") as f:
+                f.write("%d %d\n" % (start, count))
+
+
+class PreauthSeeder:
+    """
+    Preauthorizes a range of devices, so they are accepted as soon as they ask
+    to be. The public keys are read from a key store or key directory by a pool
+    of processes, chunk by chunk, while a pool of threads posts the devices of
+    the previous chunks. A chunk is recorded in the checkpoint once all of its
+    devices are preauthorized; running again with the same checkpoint skips it.
+    Devices already preauthorized count as done, so a chunk interrupted half
+    way is simply done again.
+    """
+
+    def __init__(
+        self,
+        dev_auth,
+        keys_path,
+        start_index,
+        count,
+        identity_fields=identity.DEFAULT_FIELDS,
+        identity_sku=identity.DEFAULT_SKU,
+        layout=None,
+        workers=32,
+        processes=None,
+        chunk_size=1000,
+        checkpoint=None,
+    ):
+        """
+        :param dev_auth: 'DeviceAuthentication' client
+        :param keys_path: 'string' key store file or directory with the keys
+        :param start_index: 'int' index of the first device
+        :param count: 'int' number of devices
+        :param identity_fields: 'tuple' identity attributes of the devices
+        :param identity_sku: 'string' value of the "sku" identity attribute
+        :param layout: 'identity.FiltersLayout' giving the MAC addresses, None
+                       for sequential MAC addresses
+        :param workers: 'int' number of devices posted at the same time
+        :param processes: 'int' processes reading the keys, None for one per core
+        :param chunk_size: 'int' number of devices per chunk
+        :param checkpoint: 'string' checkpoint file or None
+        """
+        self._dev_auth = dev_auth
+        self.keys_path = keys_path
+        self.start_index = start_index
+        self.count = count
+        self.identity_fields = identity_fields
+        self.identity_sku = identity_sku
+        self.layout = layout
+        self.workers = workers
+        self.processes = processes or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.checkpoint = Checkpoint(checkpoint)
+        if layout is not None and start_index + count > layout.count:
+            raise ValueError(
+                "the layout has %d devices, not %d..%d"
+                % (layout.count, start_index, start_index + count)
+            )
+        with keystore.open_key_source(keys_path) as _source:
+            if not _source.contains(start_index, count):
+                raise ValueError(
+                    "'%s' has the keys of devices %d..%d, not %d..%d"
+                    % (
+                        keys_path,
+                        _source.first_index,
+                        _source.first_index + _source.count,
+                        start_index,
+                        start_index + count,
+                    )
+                )
+
+    def chunks(self):
+        """
+        :return: 'list' of (start, count) of the chunks not done yet
+        """
+        _chunks = []
+        _end = self.start_index + self.count
+        _start = self.start_index
+        while _start < _end:
+            # aligned on multiples of the chunk size, so the checkpoint is still
+            # useful when the range is extended
+            _next = min((_start // self.chunk_size + 1) * self.chunk_size, _end)
+            if not self.checkpoint.is_done(_start, _next - _start):
+                _chunks.append((_start, _next - _start))
+            _start = _next
+        return _chunks
+
+    def run(self):
+        """
+        :return: 'BulkReport' with the devices preauthorized (done), already
+                 done in a previous run (skipped) and failed
+        """
+        _report = bulk.BulkReport("preauthorize")
+        _chunks = self.chunks()
+        _report.add(skipped=self.count - sum(_count for _, _count in _chunks))
+        _pending = iter(_chunks)
+        _window = deque()
+        with ProcessPoolExecutor(max_workers=self.processes) as _executor:
+
+            def _submit_next():
+                for _start, _count in _pending:
+                    _future = _executor.submit(
+                        _public_keys, self.keys_path, _start, _count
+                    )
+                    _window.append((_start, _count, _future))
+                    return
+
+            for _ in range(self.processes * 2):
+                _submit_next()
+            while _window:
+                _start, _count, _future = _window.popleft()
+                _public_pems = _future.result()
+                _submit_next()
+                if self._post_chunk(_start, _public_pems, _report) == 0:
+                    self.checkpoint.add(_start, _count)
+                logger.info(
+                    "Devices %d..%d done, %d devices/sec"
+                    % (_start, _start + _count, _report.throughput)
+                )
+        _report.finished = time.time()
+        stats.statistics.increment("preauthorize.done", _report.done)
+        stats.statistics.increment("preauthorize.failed", _report.failed)
+        return _report
+
+    def _post_chunk(self, start, public_pems, report):
+        """
+        :return: 'int' number of devices which failed
+        """
+        _failed = []
+
+        def _post(item):
+            _index, _public_pem = item
+            _identity = identity.device_identity(
+                _index, self.identity_fields, self.identity_sku, self.layout
+            )
+            try:
+                _result = self._dev_auth.post_preauthorized_device(
+                    _public_pem, ignore_existing=True, **_identity
+                )
+            except Exception as e:
+                logger.warning("Failed to preauthorize device %d: %s" % (_index, e))
+                _result = None
+            if _result is None:
+                _failed.append(_index)
+                report.add(failed=1)
+            else:
+                report.add(done=1)
+
+        bulk.run_concurrently(_post, enumerate(public_pems, start=start), self.workers)
+        return len(_failed)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import time
+
+from mender import simulator
+from mender import stats
+
+
+logger = logging.getLogger("sharding")
+
+
+def split_range(start, count, shards):
+    """
+    Splits a range of device indexes in contiguous slices of similar size
+    :param start: 'int' index of the first device
+    :param count: 'int' number of devices
+    :param shards: 'int' number of slices, fewer if there are fewer devices
+    :return: 'list' of (start, count) tuples
+    """
+    _shards = max(min(shards, count), 1)
+    _base, _extra = divmod(count, _shards)
+    _ranges = []
+    for _shard in range(_shards):
+        _count = _base + (1 if _shard < _extra else 0)
+        _ranges.append((start, _count))
+        start += _count
+    return _ranges
+
+
+def _pin_to_cpu(shard):
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    _cpus = sorted(os.sched_getaffinity(0))
+    os.sched_setaffinity(0, {_cpus[shard % len(_cpus)]})
+
+
+def _run_shard(
+    shard, start_index, count, fleet_options, duration, progress_interval, results
+):
+    _pin_to_cpu(shard)
+    # forked from the coordinator, don't report its calls twice
+    stats.statistics.reset()
+    _fleet = simulator.Fleet(start_index=start_index, count=count, **fleet_options)
+
+    def _send_snapshot(final=False):
+        results.put((shard, final, _fleet.states(), stats.statistics.to_dict()))
+
+    try:
+        asyncio.run(
+            _fleet.run(
+                duration=duration,
+                progress_interval=progress_interval,
+                on_progress=_send_snapshot,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _send_snapshot(final=True)
+
+
+class ShardedFleet:
+    """
+    Runs a fleet of virtual devices in several processes, one per CPU core by
+    default. Every process simulates a contiguous slice of the device indexes,
+    so identities and keys don't depend on the number of processes, and sends
+    its statistics to the coordinator which merges them.
+    """
+
+    def __init__(self, start_index, count, processes=None, **fleet_options):
+        """
+        :param start_index: 'int' index of the first device
+        :param count: 'int' number of devices
+        :param processes: 'int' number of worker processes, None for one per core
+        :param fleet_options: passed to every 'simulator.Fleet'
+        """
+        self.ranges = split_range(start_index, count, processes or os.cpu_count())
+        self.fleet_options = fleet_options
+        self.count = count
+        self._states = {}
+        self._statistics = {}
+
+    def states(self):
+        """
+        :return: 'dict' number of started devices per state, all shards together
+        """
+        _states = {}
+        for _shard_states in self._states.values():
+            for _state, _count in _shard_states.items():
+                _states[_state] = _states.get(_state, 0) + _count
+        return _states
+
+    def statistics(self):
+        """
+        :return: 'Statistics' merged statistics of the last snapshots
+        """
+        _merged = stats.Statistics()
+        for _data in self._statistics.values():
+            _merged.merge(stats.Statistics.from_dict(_data))
+        return _merged
+
+    def log_progress(self):
+        _states = self.states()
+        logger.info(
+            "Shards: %d, devices started: %d of %d, states: %s"
+            % (len(self.ranges), sum(_states.values()), self.count, _states)
+        )
+
+    def run(self, duration=None, progress_interval=60):
+        """
+        Runs the shards until 'duration' seconds have passed, forever if None.
+        On Ctrl-C the workers stop too and send their last statistics.
+        :return: 'Statistics' merged statistics of all the shards
+        """
+        _results = multiprocessing.Queue()
+        _processes = []
+        for _shard, (_start, _count) in enumerate(self.ranges):
+            logger.info("Shard %d: devices %d..%d" % (_shard, _start, _start + _count))
+            _process = multiprocessing.Process(
+                target=_run_shard,
+                args=(
+                    _shard,
+                    _start,
+                    _count,
+                    self.fleet_options,
+                    duration,
+                    progress_interval,
+                    _results,
+                ),
+            )
+            _process.start()
+            _processes.append(_process)
+        _pending = set(range(len(_processes)))
+        _exited = set()
+        _next_progress = time.monotonic() + progress_interval
+        while _pending:
+            try:
+                _shard, _final, _states, _data = _results.get(timeout=1)
+            except queue.Empty:
+                for _shard in list(_pending):
+                    if _shard in _exited:
+                        # nothing came since it has exited, it has crashed
+                        logger.warning("Shard %d exited without results" % _shard)
+                        _pending.discard(_shard)
+                    elif _processes[_shard].exitcode is not None:
+                        _exited.add(_shard)
+                continue
+            except KeyboardInterrupt:
+                # the workers get the signal too, wait for their statistics
+                logger.info("Interrupted, waiting for the shards to stop")
+                continue
+            self._states[_shard] = _states
+            self._statistics[_shard] = _data
+            if _final:
+                _pending.discard(_shard)
+            if time.monotonic() >= _next_progress:
+                self.log_progress()
+                _next_progress = time.monotonic() + progress_interval
+        for _process in _processes:
+            _process.join()
+        self.log_progress()
+        return self.statistics()
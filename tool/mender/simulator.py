@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+import asyncio
+import logging
+import random
+import time
+
+import aiohttp
+
+from mender import identity
+from mender import keys
+from mender import keystore
+from mender import stats
+from mender.aio import common
+from mender.aio.device_api import DeviceAPI
+
+
+logger = logging.getLogger("simulator")
+
+# exceptions a device survives, it tries again on its next interval
+_CALL_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+def parse_inventory(value):
+    """
+    :param value: 'string' attributes as given to the stress test client,
+                  e.g. "device_type:cl-som-imx8,image_id:base-image-1019"
+    :return: 'dict' attributes
+    """
+    _attributes = {}
+    for _item in (value or "").split(","):
+        _name, _, _value = _item.partition(":")
+        if _name.strip():
+            _attributes[_name.strip()] = _value.strip()
+    return _attributes
+
+
+class VirtualDevice:
+    """
+    Behaves as a device running the mender client: it asks to be authorized
+    until it is accepted, then sends its inventory every 'inventory_interval'
+    and polls for deployments every 'poll_interval', installing them with
+    random waits between the steps reported to the backend.
+    """
+
+    state = "starting"
+
+    def __init__(
+        self,
+        api,
+        artifact_name,
+        device_type,
+        inventory=None,
+        poll_interval=1800,
+        inventory_interval=28800,
+        wait=30,
+        auth_retry=60,
+        failure_rate=0.0,
+    ):
+        """
+        :param api: 'DeviceAPI' client authenticated as this device
+        :param artifact_name: 'string' name of the installed artifact
+        :param device_type: 'string' device type
+        :param inventory: 'dict' extra inventory attributes
+        :param poll_interval: 'float' seconds between two deployment polls
+        :param inventory_interval: 'float' seconds between inventory updates
+        :param wait: 'float' max seconds between two steps of a deployment
+        :param auth_retry: 'float' seconds between auth requests while pending
+        :param failure_rate: 'float' 0..1 share of deployments failing
+        """
+        self.api = api
+        self.artifact_name = artifact_name
+        self.device_type = device_type
+        self.inventory = inventory or {}
+        self.poll_interval = poll_interval
+        self.inventory_interval = inventory_interval
+        self.wait = wait
+        self.auth_retry = auth_retry
+        self.failure_rate = failure_rate
+
+    async def run(self):
+        await self._authenticate()
+        await self._send_inventory()
+        _next_poll = time.monotonic()
+        _next_inventory = time.monotonic() + self.inventory_interval
+        while True:
+            await asyncio.sleep(
+                max(min(_next_poll, _next_inventory) - time.monotonic(), 0)
+            )
+            if time.monotonic() >= _next_inventory:
+                await self._send_inventory()
+                _next_inventory += self.inventory_interval
+            if time.monotonic() >= _next_poll:
+                await self._poll()
+                _next_poll = time.monotonic() + self.poll_interval
+
+    async def _authenticate(self):
+        self.state = "pending"
+        while True:
+            try:
+                _status = await self.api.auth_request()
+            except _CALL_ERRORS as e:
+                logger.debug("Auth request failed: %s" % e)
+                _status = None
+            if _status == 200:
+                self.state = "authenticated"
+                stats.statistics.increment("simulator.authenticated")
+                return
+            await asyncio.sleep(self.auth_retry * random.uniform(0.9, 1.1))
+
+    async def _call(self, func, *args):
+        """
+        Calls the device API logging in again once if the token was rejected
+        :return: the result of the call, None if it has failed
+        """
+        for _ in range(2):
+            try:
+                _result = await func(*args)
+            except _CALL_ERRORS as e:
+                logger.debug("Call failed: %s" % e)
+                stats.statistics.increment("simulator.errors")
+                return None
+            _status = _result[0] if isinstance(_result, tuple) else _result
+            if _status != 401:
+                return _result
+            await self._authenticate()
+        return None
+
+    async def _send_inventory(self):
+        _attributes = dict(self.inventory)
+        _attributes["device_type"] = self.device_type
+        _attributes["artifact_name"] = self.artifact_name
+        await self._call(self.api.update_inventory, _attributes)
+
+    async def _poll(self):
+        _result = await self._call(
+            self.api.get_next_deployment, self.artifact_name, self.device_type
+        )
+        if _result is None or _result[1] is None:
+            return
+        await self._install(_result[1])
+
+    async def _install(self, deployment):
+        self.state = "updating"
+        _failed = random.random() < self.failure_rate
+        _steps = ["downloading", "installing", "rebooting"]
+        _steps.append("failure" if _failed else "success")
+        for _step in _steps:
+            await asyncio.sleep(random.uniform(0, self.wait))
+            _status = await self._call(
+                self.api.update_deployment_status, deployment["id"], _step
+            )
+            if _status == 409:
+                # the deployment was aborted
+                break
+        else:
+            if not _failed:
+                self.artifact_name = deployment["artifact"]["artifact_name"]
+                await self._send_inventory()
+            stats.statistics.increment("simulator.deployments.%s" % _steps[-1])
+        self.state = "authenticated"
+
+
+class Fleet:
+    """
+    Runs many virtual devices on the running event loop. The devices start at
+    random times spread over 'startup_interval', and use the keys of a key
+    store or key directory (see mender.keystore) or freshly generated ones.
+    """
+
+    def __init__(
+        self,
+        server_url,
+        count,
+        tenant_token=None,
+        start_index=0,
+        startup_interval=0,
+        keys_path=None,
+        key_bits=2048,
+        identity_fields=identity.DEFAULT_FIELDS,
+        identity_sku=identity.DEFAULT_SKU,
+        layout=None,
+        **device_options
+    ):
+        """
+        :param server_url: 'string' URL of the backend
+        :param count: 'int' number of devices
+        :param tenant_token: 'string' tenant token or None
+        :param start_index: 'int' index of the first device, for the identities
+                            and the keys
+        :param startup_interval: 'float' seconds over which devices start
+        :param keys_path: 'string' key store file or directory with the private
+                          keys, None to generate them
+        :param key_bits: 'int' size of the generated keys
+        :param identity_fields: 'tuple' identity attributes sent by the devices
+        :param identity_sku: 'string' value of the "sku" identity attribute
+        :param layout: 'identity.FiltersLayout' giving the MAC addresses and
+                       the device groups, None for sequential MAC addresses
+        :param device_options: passed to every 'VirtualDevice'
+        """
+        self.server_url = server_url
+        self.count = count
+        self.tenant_token = tenant_token
+        self.start_index = start_index
+        self.startup_interval = startup_interval
+        self.key_bits = key_bits
+        self.identity_fields = identity_fields
+        self.identity_sku = identity_sku
+        self.layout = layout
+        self.device_options = device_options
+        self.devices = []
+        if layout is not None and start_index + count > layout.count:
+            raise ValueError(
+                "the layout has %d devices, not %d..%d"
+                % (layout.count, start_index, start_index + count)
+            )
+        self._keys = None
+        if keys_path is not None:
+            self._keys = keystore.open_key_source(keys_path)
+            if not self._keys.contains(start_index, count):
+                raise ValueError(
+                    "'%s' has the keys of devices %d..%d, not %d..%d"
+                    % (
+                        keys_path,
+                        self._keys.first_index,
+                        self._keys.first_index + self._keys.count,
+                        start_index,
+                        start_index + count,
+                    )
+                )
+
+    async def _get_key(self, offset):
+        if self._keys is not None:
+            return self._keys.load_key(self.start_index + offset)
+        _loop = asyncio.get_running_loop()
+        return await _loop.run_in_executor(None, keys.generate_key, self.key_bits)
+
+    async def _start_device(self, offset, delay):
+        await asyncio.sleep(delay)
+        _key = await self._get_key(offset)
+        _index = self.start_index + offset
+        _api = DeviceAPI(
+            self.server_url,
+            _key,
+            identity.device_identity(
+                _index, self.identity_fields, self.identity_sku, self.layout
+            ),
+            tenant_token=self.tenant_token,
+        )
+        _options = self.device_options
+        if self.layout is not None:
+            _options = dict(_options)
+            _options["inventory"] = dict(
+                _options.get("inventory") or {}, **self.layout.inventory(_index)
+            )
+        _device = VirtualDevice(_api, **_options)
+        self.devices.append(_device)
+        try:
+            await _device.run()
+        except Exception as e:
+            logger.error("Device %s stopped: %r" % (_api.identity, e))
+
+    def states(self):
+        """
+        :return: 'dict' number of started devices per state
+        """
+        _states = {}
+        for _device in self.devices:
+            _states[_device.state] = _states.get(_device.state, 0) + 1
+        return _states
+
+    def log_progress(self):
+        logger.info(
+            "Devices started: %d of %d, states: %s"
+            % (len(self.devices), self.count, self.states())
+        )
+
+    async def _report_progress(self, interval, on_progress):
+        while True:
+            await asyncio.sleep(interval)
+            on_progress()
+
+    async def run(self, duration=None, progress_interval=60, on_progress=None):
+        """
+        Runs the fleet until 'duration' seconds have passed, forever if None
+        :param duration: 'float' seconds to run the devices for
+        :param progress_interval: 'float' seconds between progress reports
+        :param on_progress: function() reporting the progress, logs by default
+        """
+        _tasks = [
+            asyncio.ensure_future(
+                self._start_device(_offset, random.uniform(0, self.startup_interval))
+            )
+            for _offset in range(self.count)
+        ]
+        _progress = asyncio.ensure_future(
+            self._report_progress(progress_interval, on_progress or self.log_progress)
+        )
+        try:
+            await asyncio.wait(_tasks, timeout=duration)
+        finally:
+            _progress.cancel()
+            for _task in _tasks:
+                _task.cancel()
+            await asyncio.gather(*_tasks, _progress, return_exceptions=True)
+            await common.close_session()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import json
+import logging
+import math
+import threading
+import time
+
+from urllib.parse import urlparse
+
+
+logger = logging.getLogger("stats")
+
+# values are bucketed with 2^SUB_BUCKET_BITS linear sub-buckets per power of
+# two, which keeps the relative error of any percentile below 1%
+SUB_BUCKET_BITS = 8
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_HALF_SUB_BUCKETS = _SUB_BUCKETS >> 1
+
+# statuses recorded for the calls without a status code of their own: a call
+# which succeeded, one which raised and one whose client returned no result
+STATUS_OK = 200
+STATUS_ERROR = "error"
+STATUS_FAILED = "failed"
+
+# path segments following these ones are identifiers
+_COLLECTIONS = {
+    "artifacts": "{id}",
+    "auth": "{id}",
+    "deployments": "{id}",
+    "devices": "{id}",
+    "filters": "{id}",
+    "group": "{name}",
+    "groups": "{name}",
+    "tokens": "{id}",
+    "users": "{id}",
+}
+# path segments which are never identifiers
+_LITERALS = {
+    "attributes",
+    "auth",
+    "auth_requests",
+    "count",
+    "device",
+    "devices",
+    "download",
+    "group",
+    "limits",
+    "list",
+    "log",
+    "login",
+    "next",
+    "releases",
+    "search",
+    "statistics",
+    "status",
+}
+
+
+def _bucket_index(value):
+    if value < _SUB_BUCKETS:
+        return value
+    _shift = value.bit_length() - SUB_BUCKET_BITS
+    return _shift * _HALF_SUB_BUCKETS + (value >> _shift)
+
+
+def _bucket_highest_value(index):
+    if index < _SUB_BUCKETS:
+        return index
+    _shift = index // _HALF_SUB_BUCKETS - 1
+    _mantissa = index - _shift * _HALF_SUB_BUCKETS
+    return ((_mantissa + 1) << _shift) - 1
+
+
+class Histogram:
+    """
+    Log-linear histogram of integer values (microseconds), in the spirit of
+    HdrHistogram: constant relative precision, sparse buckets, mergeable
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value, count=1):
+        _value = max(int(value), 0)
+        _index = _bucket_index(_value)
+        self.counts[_index] = self.counts.get(_index, 0) + count
+        self.count += count
+        self.total += _value * count
+        if self.min is None or _value < self.min:
+            self.min = _value
+        if _value > self.max:
+            self.max = _value
+
+    def merge(self, other):
+        for _index, _count in other.counts.items():
+            self.counts[_index] = self.counts.get(_index, 0) + _count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, percentile):
+        """
+        :param percentile: 'float' 0..100
+        :return: 'int' highest value equivalent to the given percentile
+        """
+        if self.count == 0:
+            return 0
+        _target = max(math.ceil(percentile / 100.0 * self.count), 1)
+        _seen = 0
+        for _index in sorted(self.counts):
+            _seen += self.counts[_index]
+            if _seen >= _target:
+                return min(_bucket_highest_value(_index), self.max)
+        return self.max
+
+    def mean(self):
+        if self.count == 0:
+            return 0
+        return self.total / self.count
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "sub_bucket_bits": SUB_BUCKET_BITS,
+            "counts": {str(_index): _count for _index, _count in self.counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("sub_bucket_bits", SUB_BUCKET_BITS) != SUB_BUCKET_BITS:
+            raise ValueError(
+                "histogram precision mismatch: %s" % data.get("sub_bucket_bits")
+            )
+        _histogram = cls()
+        _histogram.counts = {
+            int(_index): _count for _index, _count in data["counts"].items()
+        }
+        _histogram.count = data["count"]
+        _histogram.total = data["total"]
+        _histogram.min = data["min"]
+        _histogram.max = data["max"]
+        return _histogram
+
+
+def _split_url(url):
+    _parts = [_part for _part in urlparse(url).path.split("/") if _part]
+    # /api/management/v1/<service>/... and /api/devices/v1/<service>/...
+    if len(_parts) >= 4 and _parts[0] == "api":
+        return _parts[3], _parts[4:]
+    return "-", _parts
+
+
+def service_name(url):
+    """
+    :param url: 'string' full URL of a call
+    :return: 'string' name of the micro-service, e.g. 'devauth'
+    """
+    return _split_url(url)[0]
+
+
+def route_key(method, url):
+    """
+    Builds the key an API call is accounted under, e.g.
+    'devauth PUT /devices/{id}/auth/{id}/status'
+    :param method: 'string' HTTP method
+    :param url: 'string' full URL of the call
+    :return: 'string' service, method and templated route
+    """
+    _service, _route = _split_url(url)
+    _templated = []
+    for _i, _part in enumerate(_route):
+        _previous = _route[_i - 1] if _i > 0 else None
+        if _previous in _COLLECTIONS and _part not in _LITERALS:
+            # 'deployments/deployments' is the service name, not an id
+            if not (_previous == "deployments" and _part == "deployments"):
+                _part = _COLLECTIONS[_previous]
+        _templated.append(_part)
+    return "%s %s /%s" % (_service, method, "/".join(_templated))
+
+
+def succeeded(status_code):
+    """
+    :param status_code: 'int' or 'string' status recorded for a call
+    :return: 'boolean' True for a 2xx status code
+    """
+    return str(status_code).startswith("2")
+
+
+class Statistics:
+    """
+    Latency histograms and status code counters per endpoint, thread safe
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.status_codes = {}
+        self.counters = {}
+        self.started = time.time()
+        self.finished = None
+
+    def record(self, key, seconds, status_code):
+        """
+        :param key: 'string' endpoint key, see route_key()
+        :param seconds: 'float' latency of the call
+        :param status_code: 'int' status code of the call, or STATUS_ERROR or
+                            STATUS_FAILED
+        """
+        _status = str(status_code)
+        with self._lock:
+            _histogram = self.histograms.get(key)
+            if _histogram is None:
+                _histogram = self.histograms[key] = Histogram()
+                self.status_codes[key] = {}
+            _histogram.record(seconds * 1000000)
+            _codes = self.status_codes[key]
+            _codes[_status] = _codes.get(_status, 0) + 1
+
+    def increment(self, name, value=1):
+        """
+        Adds to a named counter, for values which are not call latencies
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, other):
+        with self._lock:
+            for _key, _histogram in other.histograms.items():
+                if _key not in self.histograms:
+                    self.histograms[_key] = Histogram()
+                    self.status_codes[_key] = {}
+                self.histograms[_key].merge(_histogram)
+                _codes = self.status_codes[_key]
+                for _status, _count in other.status_codes[_key].items():
+                    _codes[_status] = _codes.get(_status, 0) + _count
+            for _name, _value in other.counters.items():
+                self.counters[_name] = self.counters.get(_name, 0) + _value
+            self.started = min(self.started, other.started)
+            if other.finished is not None:
+                self.finished = max(self.finished or 0, other.finished)
+        return self
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.status_codes = {}
+            self.counters = {}
+            self.started = time.time()
+            self.finished = None
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "started": self.started,
+                "finished": self.finished or time.time(),
+                "endpoints": {
+                    _key: {
+                        "histogram": _histogram.to_dict(),
+                        "status_codes": dict(self.status_codes[_key]),
+                    }
+                    for _key, _histogram in self.histograms.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        _stats = cls()
+        _stats.started = data["started"]
+        _stats.finished = data.get("finished")
+        for _key, _endpoint in data["endpoints"].items():
+            _stats.histograms[_key] = Histogram.from_dict(_endpoint["histogram"])
+            _stats.status_codes[_key] = dict(_endpoint["status_codes"])
+        _stats.counters = dict(data.get("counters", {}))
+        return _stats
+
+    def save(self, file_name):
+        with open(file_name, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+
+    @classmethod
+    def load(cls, file_name):
+        with open(file_name, "r") as f:
+            return cls.from_dict(json.load(f))
+
+    def report(self):
+        """
+        :return: 'list' of lines with p50/p90/p99/max per endpoint in ms
+        """
+        _lines = [
+            "%-56s %8s %8s %8s %8s %8s %8s  %s"
+            % ("endpoint", "count", "mean", "p50", "p90", "p99", "max", "status")
+        ]
+        with self._lock:
+            for _key in sorted(self.histograms):
+                _h = self.histograms[_key]
+                _codes = " ".join(
+                    "%s:%s" % (_status, _count)
+                    for _status, _count in sorted(self.status_codes[_key].items())
+                )
+                _lines.append(
+                    "%-56s %8d %8.1f %8.1f %8.1f %8.1f %8.1f  %s"
+                    % (
+                        _key,
+                        _h.count,
+                        _h.mean() / 1000.0,
+                        _h.percentile(50) / 1000.0,
+                        _h.percentile(90) / 1000.0,
+                        _h.percentile(99) / 1000.0,
+                        _h.max / 1000.0,
+                        _codes,
+                    )
+                )
+            for _name in sorted(self.counters):
+                _lines.append("%-56s %8s" % (_name, self.counters[_name]))
+        return _lines
+
+
+# statistics of all the calls done by this process
+statistics = Statistics()
+
+
+def record(method, url, seconds, status_code):
+    statistics.record(route_key(method, url), seconds, status_code)
+
+
+def record_retry(method, url):
+    statistics.increment("retries: %s" % route_key(method, url))
+
+
+def log_report(file_name=None):
+    """
+    Logs the table of latencies of this process and optionally saves them
+    :param file_name: 'string' JSON file to export the statistics to
+    """
+    statistics.finished = time.time()
+    if file_name:
+        statistics.save(file_name)
+        logger.info("Statistics saved into '%s'" % file_name)
+    if not statistics.histograms and not statistics.counters:
+        return
+    logger.info("API calls latency (ms):")
+    for _line in statistics.report():
+        logger.info(_line)
@@ -13,7 +13,12 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import base64
+import json
 import logging
+import os
+import threading
+import time
 
 from requests.auth import HTTPBasicAuth
 
@@ -22,17 +27,57 @@ from mender import common
 
 logger = logging.getLogger("user-administration")
 
+# seconds before the expiration of the token when a new one is fetched
+refresh_margin = float(os.getenv("MENDER_TOKEN_REFRESH_MARGIN", "300"))
+
+
+def token_expiry(token):
+    """
+    Reads the expiration time of a JWT, the signature is not verified
+    :param token: 'string' JWT as returned by the login
+    :return: 'float' epoch of the "exp" claim or None if it can't be read
+    """
+    try:
+        _payload = token.split(".")[1]
+        _payload += "=" * (-len(_payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(_payload))["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class AuthHeader(dict):
+    """
+    Authorization header which can replace itself with a fresh one when the
+    server rejects the token, see common._do_call
+    """
+
+    def __init__(self, token, renew):
+        """
+        :param token: 'string' JWT or None if the login has failed
+        :param renew: function(token) returning a new 'AuthHeader'
+        """
+        super().__init__()
+        if token is not None:
+            self["Authorization"] = "Bearer " + token
+        self.token = token
+        self._renew = renew
+
+    def renew(self):
+        return self._renew(self.token)
+
 
 class UserAdministration:
     _email = None
     _password = None
     server_url = None
     _auth_header = None
+    _expires_at = None
 
     def __init__(self, email=None, password=None, server_url=None):
         self._email = email
         self._password = password
         self.server_url = server_url
+        self._login_lock = threading.Lock()
 
     """
         + POST /auth/login
@@ -45,25 +90,60 @@ class UserAdministration:
         + DELETE /users/{id}
     """
 
+    def _is_fresh(self):
+        if self._auth_header is None:
+            return False
+        if self._expires_at is None:
+            return True
+        return time.time() < self._expires_at - refresh_margin
+
     def get_auth_header(self):
-        # POST /auth/login
-        if self._auth_header is not None:
+        """
+        Returns the cached token, logging in when there is none or it is about
+        to expire. Only one thread logs in, the others wait for its token.
+        :return: 'AuthHeader' headers to pass to the calls
+        """
+        if self._is_fresh():
+            return self._auth_header
+        with self._login_lock:
+            # somebody else could have logged in while waiting for the lock
+            if not self._is_fresh():
+                self._login()
             return self._auth_header
+
+    def renew_auth_header(self, stale_token=None):
+        """
+        Logs in again after the server has rejected a token, unless another
+        thread has already replaced it
+        :param stale_token: 'string' token rejected by the server
+        :return: 'AuthHeader' headers with the new token
+        """
+        with self._login_lock:
+            if self._auth_header is None or self._auth_header.token == stale_token:
+                self._login()
+            return self._auth_header
+
+    def _login(self):
+        # POST /auth/login
         _url = "%s/api/management/v1/useradm/auth/login" % self.server_url
         _token = common.do_post_call(
             _url,
             status_code=200,
             text=True,
+            idempotent=True,
             auth=HTTPBasicAuth(self._email, self._password),
         )
         if _token is None:
             logger.warning("Failed to fetch auth token.")
-        self._auth_header = {"Authorization": "Bearer " + _token}
+            self._auth_header = None
+            self._expires_at = None
+            return
+        self._auth_header = AuthHeader(_token, self.renew_auth_header)
+        self._expires_at = token_expiry(_token)
         logger.debug(
-            "URL: '%s', user %s, authentication token: %s"
-            % (self.server_url, self._email, self._auth_header)
+            "URL: '%s', user %s, authentication token: %s, expires at: %s"
+            % (self.server_url, self._email, self._auth_header, self._expires_at)
         )
-        return self._auth_header
 
     def update_user_settings(self, settings):
         # POST /settings
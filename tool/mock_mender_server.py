@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import configargparse
+import logging
+
+from mender import identity
+from mender import mock_server
+
+
+def parse_config():
+    parser = configargparse.ArgumentParser()
+    parser.add_argument(
+        "--host",
+        type=str,
+        required=False,
+        default="127.0.0.1",
+        env_var="MOCK_HOST",
+        help="Address to listen on",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        required=False,
+        default=8080,
+        env_var="MOCK_PORT",
+        help="Port to listen on",
+    )
+    parser.add_argument(
+        "--username",
+        type=str,
+        required=False,
+        default=None,
+        env_var="MOCK_USERNAME",
+        help="Only user allowed to log in, any credentials are accepted if unset",
+    )
+    parser.add_argument(
+        "--password",
+        type=str,
+        required=False,
+        default=None,
+        env_var="MOCK_PASSWORD",
+        help="Password of the user",
+    )
+    parser.add_argument(
+        "--devices",
+        type=int,
+        required=False,
+        default=0,
+        env_var="MOCK_DEVICES",
+        help="Number of devices loaded at start",
+    )
+    parser.add_argument(
+        "--devices-status",
+        type=str,
+        required=False,
+        default="accepted",
+        choices=mock_server.DEVICE_STATUSES,
+        env_var="MOCK_DEVICES_STATUS",
+        help="Status of the devices loaded at start",
+    )
+    parser.add_argument(
+        "--identity-fields",
+        type=str,
+        required=False,
+        default=",".join(identity.DEFAULT_FIELDS),
+        env_var="IDENTITY_FIELDS",
+        help="Identity attributes of the devices, among mac, sku and sn",
+    )
+    parser.add_argument(
+        "--identity-sku",
+        type=str,
+        required=False,
+        default=identity.DEFAULT_SKU,
+        env_var="IDENTITY_SKU",
+        help="Value of the sku identity attribute",
+    )
+    parser.add_argument(
+        "--identity-layout",
+        type=str,
+        required=False,
+        default="sequential",
+        choices=identity.LAYOUTS,
+        env_var="IDENTITY_LAYOUT",
+        help="MAC addresses of the devices, see the predefined filters",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        required=False,
+        default=0,
+        env_var="MOCK_LATENCY",
+        help="Milliseconds added to every call",
+    )
+    parser.add_argument(
+        "--latency-jitter",
+        type=float,
+        required=False,
+        default=0,
+        env_var="MOCK_LATENCY_JITTER",
+        help="Max random milliseconds added on top of the latency",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        required=False,
+        default=0,
+        env_var="MOCK_ERROR_RATE",
+        help="Share of the calls failing, from 0 to 1",
+    )
+    parser.add_argument(
+        "--error-status",
+        type=int,
+        required=False,
+        default=503,
+        env_var="MOCK_ERROR_STATUS",
+        help="Status code of the failing calls",
+    )
+    parser.add_argument(
+        "--max-per-page",
+        type=int,
+        required=False,
+        default=500,
+        env_var="MOCK_MAX_PER_PAGE",
+        help="Max number of items of a page, bigger pages are cut",
+    )
+    parser.add_argument(
+        "--default-per-page",
+        type=int,
+        required=False,
+        default=20,
+        env_var="MOCK_DEFAULT_PER_PAGE",
+        help="Number of items of a page when per_page is not given",
+    )
+    parser.add_argument(
+        "--token-lifetime",
+        type=int,
+        required=False,
+        default=3600,
+        env_var="MOCK_TOKEN_LIFETIME",
+        help="Seconds the tokens of the users and devices are valid",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    conf = parse_config()
+
+    logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+    logging.basicConfig(format=logs_format, level=logging.INFO)
+
+    state = mock_server.MockState(
+        fields=tuple(conf.identity_fields.split(",")), sku=conf.identity_sku
+    )
+    if conf.devices > 0:
+        state.seed(
+            conf.devices,
+            status=conf.devices_status,
+            layout=identity.get_layout(conf.identity_layout),
+        )
+    mock_server.MockServer(
+        state,
+        username=conf.username,
+        password=conf.password,
+        latency=conf.latency / 1000,
+        jitter=conf.latency_jitter / 1000,
+        error_rate=conf.error_rate,
+        error_status=conf.error_status,
+        max_per_page=conf.max_per_page,
+        default_per_page=conf.default_per_page,
+        token_lifetime=conf.token_lifetime,
+    ).run(host=conf.host, port=conf.port)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import configargparse
+import json
+import logging
+import time
+
+import mender
+
+from mender import rollout
+from mender import ratelimit
+
+
+def parse_config():
+    parser = configargparse.ArgumentParser()
+    parser.add_argument(
+        "--username", type=str, required=True, env_var="USERNAME", help="Username"
+    )
+    parser.add_argument(
+        "--password", type=str, required=True, env_var="PASSWORD", help="Password"
+    )
+    parser.add_argument(
+        "--url",
+        type=str,
+        required=True,
+        env_var="URL",
+        help="URL of the Mender server",
+    )
+    parser.add_argument(
+        "--deployment-id",
+        type=str,
+        required=False,
+        default=None,
+        env_var="DEPLOYMENT_ID",
+        help="Deployment to follow",
+    )
+    parser.add_argument(
+        "--deployment-name",
+        type=str,
+        required=False,
+        default=None,
+        env_var="DEPLOYMENT_NAME",
+        help="Name of the deployment to follow, waited for if not created yet",
+    )
+    parser.add_argument(
+        "--target",
+        type=int,
+        required=False,
+        default=1800,
+        env_var="ROLLOUT_TARGET",
+        help="Seconds in which all the devices have to be updated",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        required=False,
+        default=7200,
+        env_var="ROLLOUT_TIMEOUT",
+        help="Max seconds to follow the deployment",
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        required=False,
+        default=5,
+        env_var="ROLLOUT_MIN_INTERVAL",
+        help="Min seconds between two polls of the statistics",
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=float,
+        required=False,
+        default=60,
+        env_var="ROLLOUT_MAX_INTERVAL",
+        help="Max seconds between two polls of the statistics",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=False,
+        default=None,
+        env_var="ROLLOUT_REPORT_FILE",
+        help="JSON file to save the report and the time series to",
+    )
+    ratelimit.add_arguments(parser)
+    return parser.parse_args()
+
+
+def find_deployment(name, timeout):
+    """
+    :return: 'string' id of the newest deployment with the name, None if none
+             is created within 'timeout' seconds
+    """
+    _deadline = time.monotonic() + timeout
+    while time.monotonic() < _deadline:
+        _deployments = [
+            _deployment
+            for _deployment in mender.deployments.get_deployments(
+                search=name, sort="desc"
+            )
+            or []
+            if _deployment["name"] == name
+        ]
+        if _deployments:
+            return max(_deployments, key=lambda _d: _d.get("created", ""))["id"]
+        time.sleep(5)
+    return None
+
+
+if __name__ == "__main__":
+    conf = parse_config()
+    ratelimit.configure_from_args(conf)
+
+    logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+    logging.basicConfig(format=logs_format, level=logging.INFO)
+    log = logging.getLogger()
+
+    if conf.deployment_id is None and conf.deployment_name is None:
+        log.error("pass --deployment-id or --deployment-name")
+        exit(1)
+    mender.authenticate(
+        email=conf.username, password=conf.password, server_url=conf.url
+    )
+
+    deployment_id = conf.deployment_id
+    if deployment_id is None:
+        deployment_id = find_deployment(conf.deployment_name, conf.timeout)
+        if deployment_id is None:
+            log.error("Deployment '%s' not found" % conf.deployment_name)
+            exit(1)
+    log.info("Following deployment %s" % deployment_id)
+
+    monitor = rollout.RolloutMonitor(
+        mender.deployments,
+        deployment_id,
+        target=conf.target,
+        min_interval=conf.min_interval,
+        max_interval=conf.max_interval,
+    )
+    report = monitor.run(timeout=conf.timeout)
+    monitor.log_report()
+    if conf.output is not None:
+        with open(conf.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if not report["passed"]:
+        exit(1)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import asyncio
+import configargparse
+import logging
+
+import mender
+
+from mender import identity
+from mender import openloop
+from mender import prober
+from mender import ratelimit
+from mender.aio import common
+
+
+def parse_config():
+    parser = configargparse.ArgumentParser()
+    parser.add_argument(
+        "--server-url",
+        type=str,
+        required=True,
+        env_var="MENDER_SERVER_URL",
+        help="Mender backend URL",
+    )
+    parser.add_argument(
+        "--tenant-key",
+        type=str,
+        required=False,
+        default=None,
+        env_var="TENANT_KEY",
+        help="Mender tenant key",
+    )
+    parser.add_argument(
+        "--username",
+        type=str,
+        required=False,
+        default=None,
+        env_var="USERNAME",
+        help="User preauthorizing the probe devices, they must be accepted by "
+        "hand if unset",
+    )
+    parser.add_argument(
+        "--password",
+        type=str,
+        required=False,
+        default=None,
+        env_var="PASSWORD",
+        help="Password of the user",
+    )
+    parser.add_argument(
+        "--devices",
+        type=int,
+        required=False,
+        default=10,
+        env_var="PROBE_DEVICES",
+        help="Number of probe devices",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        required=False,
+        default=1,
+        env_var="PROBE_RATE",
+        help="Calls per second, for all the probe devices",
+    )
+    parser.add_argument(
+        "--arrivals",
+        type=str,
+        required=False,
+        default="constant",
+        choices=openloop.DISTRIBUTIONS,
+        env_var="PROBE_ARRIVALS",
+        help="Calls evenly spaced or with random Poisson arrivals",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        required=False,
+        default=None,
+        env_var="PROBE_SEED",
+        help="Seed of the Poisson arrivals, to replay the same ones",
+    )
+    parser.add_argument(
+        "--endpoints",
+        type=str,
+        required=False,
+        default=",".join(prober.ENDPOINTS),
+        env_var="PROBE_ENDPOINTS",
+        help="Comma separated calls among %s" % ", ".join(prober.ENDPOINTS),
+    )
+    parser.add_argument(
+        "--duration",
+        type=int,
+        required=False,
+        default=0,
+        env_var="PROBE_DURATION",
+        help="Seconds to probe for, 0 probes until interrupted",
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        required=False,
+        default=60,
+        env_var="PROBE_WINDOW",
+        help="Seconds of every window of the latency time series",
+    )
+    parser.add_argument(
+        "--start-index",
+        type=int,
+        required=False,
+        default=prober.DEFAULT_START_INDEX,
+        env_var="PROBE_START_INDEX",
+        help="Index of the first probe device, for its identity and its key",
+    )
+    parser.add_argument(
+        "--identity-fields",
+        type=str,
+        required=False,
+        default=",".join(identity.DEFAULT_FIELDS),
+        env_var="IDENTITY_FIELDS",
+        help="Identity attributes of the devices, among mac, sku and sn",
+    )
+    parser.add_argument(
+        "--identity-sku",
+        type=str,
+        required=False,
+        default=identity.DEFAULT_SKU,
+        env_var="IDENTITY_SKU",
+        help="Value of the sku identity attribute",
+    )
+    parser.add_argument(
+        "--keystore",
+        type=str,
+        required=False,
+        default=None,
+        env_var="PROBE_KEYSTORE",
+        help="Key store file or directory with the keys of the probe devices, "
+        "generated if unset",
+    )
+    parser.add_argument(
+        "--key-bits",
+        type=int,
+        required=False,
+        default=2048,
+        env_var="KEY_BITS",
+        help="Size of the generated RSA keys",
+    )
+    parser.add_argument(
+        "--current-artifact",
+        type=str,
+        required=False,
+        default="base-image-1019",
+        env_var="STRESS_TEST_CLIENT_CURRENT_ARTIFACT",
+        help="Artifact installed on the probe devices",
+    )
+    parser.add_argument(
+        "--current-device",
+        type=str,
+        required=False,
+        default="cl-som-imx8",
+        env_var="STRESS_TEST_CLIENT_CURRENT_DEVICE",
+        help="Device type of the probe devices",
+    )
+    parser.add_argument(
+        "--auth-timeout",
+        type=int,
+        required=False,
+        default=600,
+        env_var="PROBE_AUTH_TIMEOUT",
+        help="Seconds to wait for the probe devices to be accepted",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=False,
+        default=None,
+        env_var="PROBE_OUTPUT",
+        help="JSON file the latency time series is saved to",
+    )
+    ratelimit.add_arguments(parser)
+    return parser.parse_args()
+
+
+async def run_prober(conf, device_prober):
+    try:
+        _authenticated = await device_prober.authenticate(timeout=conf.auth_timeout)
+        if _authenticated < len(device_prober.devices):
+            log.error(
+                "Only %d of %d probe devices are accepted"
+                % (_authenticated, len(device_prober.devices))
+            )
+            return False
+        log.info(
+            "Probing %s at %s calls/sec with %d devices"
+            % (conf.server_url, conf.rate, _authenticated)
+        )
+        await device_prober.run(duration=conf.duration or None)
+        return True
+    finally:
+        await common.close_session()
+
+
+if __name__ == "__main__":
+    conf = parse_config()
+    ratelimit.configure_from_args(conf)
+
+    logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+    logging.basicConfig(format=logs_format, level=logging.INFO)
+    log = logging.getLogger()
+
+    device_prober = prober.DeviceProber(
+        conf.server_url,
+        count=conf.devices,
+        rate=conf.rate,
+        distribution=conf.arrivals,
+        seed=conf.seed,
+        endpoints=tuple(conf.endpoints.split(",")),
+        tenant_token=conf.tenant_key,
+        start_index=conf.start_index,
+        keys_path=conf.keystore,
+        key_bits=conf.key_bits,
+        identity_fields=tuple(conf.identity_fields.split(",")),
+        identity_sku=conf.identity_sku,
+        artifact_name=conf.current_artifact,
+        device_type=conf.current_device,
+        window=conf.window,
+    )
+    device_prober.load_devices()
+    if conf.username and conf.password:
+        mender.authenticate(
+            email=conf.username, password=conf.password, server_url=conf.server_url
+        )
+        device_prober.preauthorize(mender.dev_auth)
+
+    try:
+        ok = asyncio.run(run_prober(conf, device_prober))
+    except KeyboardInterrupt:
+        log.info("Interrupted")
+        ok = True
+    if conf.output:
+        device_prober.save(conf.output)
+        log.info("Latency time series saved to %s" % conf.output)
+    if not ok:
+        exit(1)
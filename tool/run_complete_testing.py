@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import logging
+import os
+import subprocess
+import sys
+
+from random import randint
+
+import configargparse
+import requests
+
+import mender
+
+from mender import bulk
+from mender import gui
+from mender import orchestration
+from mender import ratelimit
+from mender import scenario as scenario_lib
+from mender import stats
+from mender.deployments import location_id
+from mender.rollout import FINISHED_STATUSES
+
+
+logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+logging.basicConfig(format=logs_format, level=logging.INFO)
+log = logging.getLogger()
+
+
+def get_config():
+    parser = configargparse.ArgumentParser()
+    parser.add_argument(
+        "--token",
+        type=str,
+        required=True,
+        help="Mender tenant token of the stress clients.",
+        env_var="TOKEN",
+    )
+    parser.add_argument(
+        "--ssh-key-name",
+        type=str,
+        required=True,
+        help="Public key name of the EC2 instances (how its saved in AWS).",
+        env_var="SSH_KEY_NAME",
+    )
+    parser.add_argument(
+        "--url",
+        type=str,
+        required=True,
+        help="Host name of the Mender backend, without https://.",
+        env_var="URL",
+    )
+    parser.add_argument(
+        "--username",
+        type=str,
+        required=True,
+        help="Mender user.",
+        env_var="USERNAME",
+    )
+    parser.add_argument(
+        "--password",
+        type=str,
+        required=True,
+        help="Password of the Mender user.",
+        env_var="PASSWORD",
+    )
+    parser.add_argument(
+        "--artifact-name",
+        type=str,
+        required=False,
+        default="release-1",
+        help="Artifact deployed to the devices.",
+        env_var="ARTIFACT_NAME",
+    )
+    parser.add_argument(
+        "--start-count",
+        type=int,
+        required=False,
+        default=None,
+        help="Sequence number of the first instance of stress clients to start.",
+        env_var="START_COUNT",
+    )
+    parser.add_argument(
+        "--devices-index",
+        type=int,
+        required=False,
+        default=None,
+        help="Step to start from, i.e. index in the list of devices to start.",
+        env_var="DEVICES_INDEX",
+    )
+    parser.add_argument(
+        "--s3-region",
+        type=str,
+        required=False,
+        default="us-east-1",
+        help="AWS S3 region.",
+        env_var="S3_REGION",
+    )
+    parser.add_argument(
+        "--ec2-region",
+        type=str,
+        required=False,
+        default="eu-central-1",
+        help="AWS EC2 region.",
+        env_var="EC2_REGION",
+    )
+    parser.add_argument(
+        "--state-file",
+        type=str,
+        required=False,
+        default="run_complete_testing.state",
+        help="File keeping the progress, to resume an interrupted run.",
+        env_var="STATE_FILE",
+    )
+    parser.add_argument(
+        "--scenario",
+        type=str,
+        required=False,
+        default=os.path.join(
+            os.path.dirname(__file__), "scenarios/complete_testing.toml"
+        ),
+        help="Scenario file with the steps, the phases and the thresholds.",
+        env_var="SCENARIO",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=int,
+        required=False,
+        default=60,
+        help="Seconds between two checks of the conditions.",
+        env_var="POLL_INTERVAL",
+    )
+    ratelimit.add_arguments(parser)
+    return parser.parse_args()
+
+
+def start_fake_clients(start_count, qty):
+    _clients = scenario.clients
+    subprocess.run(
+        [
+            sys.executable,
+            "stress-clients-manager.py",
+            "--aws-ec2-region",
+            conf.ec2_region,
+            "--aws-s3-region",
+            conf.s3_region,
+            "--server-url",
+            server_url,
+            "--aws-ssh-key-name",
+            conf.ssh_key_name,
+            "--tenant-key",
+            conf.token,
+            "--stress-test-client-startup-interval",
+            str(_clients.get("startup_interval", 1799000)),
+            "--non-interactive-mode",
+            "True",
+            "--start-count",
+            str(start_count),
+            "--devices-qty",
+            str(qty),
+        ]
+        + [
+            "--%s=%s" % (_option, _clients[_name])
+            for _name, _option in client_options.items()
+            if _name in _clients
+        ],
+        check=True,
+    )
+
+
+# options of stress-clients-manager.py set by the [clients] of the scenario
+client_options = {
+    "inventory_freq": "stress-test-client-inventory-freq",
+    "poll_interval_freq": "stress-test-client-poll-interval-freq",
+    "wait": "wait",
+    "current_artifact": "current-artifact",
+    "current_device": "current-device",
+    "inventory": "inventory",
+}
+
+
+def latest_deployment_statistics():
+    _deployments = mender.deployments.get_deployments(page=1, per_page=1, sort="desc")
+    if not _deployments:
+        return None
+    return mender.deployments.get_deployment_statistics(_deployments[0]["id"])
+
+
+# management API calls which can be run as workloads by the scenario phases
+workloads = {
+    "count_devices": lambda: mender.dev_auth.get_devices_count(status="accepted"),
+    "list_devices": lambda: mender.dev_auth.get_devices("accepted", per_page=500),
+    "list_inventory": lambda: mender.inventory.get_devices(per_page=500),
+    "list_deployments": lambda: mender.deployments.get_deployments(),
+    "list_filters": lambda: mender.inventory_v2.get_filters(),
+    "deployment_statistics": latest_deployment_statistics,
+}
+
+
+def devices_count(*statuses):
+    _count = 0
+    for _status in statuses:
+        _status_count = mender.dev_auth.get_devices_count(status=_status)
+        if _status_count is None:
+            return None
+        _count += _status_count
+    return _count
+
+
+def devices_reached(expected, *statuses):
+    """
+    :return: function() telling whether there are 'expected' devices with the
+             given statuses
+    """
+
+    def _condition():
+        _count = devices_count(*statuses)
+        log.info("%s devices: %s of %d" % ("+".join(statuses), _count, expected))
+        return _count is not None and _count >= expected
+
+    return _condition
+
+
+def accept_until(expected):
+    """
+    :return: function() accepting the pending devices and telling whether
+             'expected' devices are accepted, late devices get accepted too
+    """
+    _accepted = devices_reached(expected, "accepted")
+
+    def _condition():
+        bulk.BulkAccept(mender.dev_auth).run().log()
+        return _accepted()
+
+    return _condition
+
+
+# ids of the deployments created by this run, by name
+created_deployments = {}
+
+
+def create_deployment(name):
+    _devices = [
+        _device["id"]
+        for _device in mender.dev_auth.iter_devices(
+            status="accepted", fields=("id",), prefetch=8
+        )
+    ]
+    _result, _headers = mender.deployments.create_deployment(
+        name, conf.artifact_name, _devices, with_headers=True
+    )
+    if _result is None:
+        raise RuntimeError("Failed to create deployment '%s'" % name)
+    created_deployments[name] = location_id(_headers)
+    log.info("Deployment created: devices qty - %s, name - %s" % (len(_devices), name))
+
+
+def deployment_finished(name):
+    """
+    :return: function() telling whether the statistics of the deployment show
+             that all its devices are done with it
+    """
+
+    def _condition():
+        _deployment_id = created_deployments.get(name)
+        if _deployment_id is None:
+            # not created by this run, take the newest one with that name
+            _deployments = mender.deployments.get_deployments(
+                search=name, page=1, per_page=1, sort="desc"
+            )
+            if not _deployments:
+                return False
+            _deployment_id = _deployments[0]["id"]
+        _statistics = mender.deployments.get_deployment_statistics(_deployment_id)
+        if _statistics is None:
+            return False
+        _finished = sum(_statistics.get(_status, 0) for _status in FINISHED_STATUSES)
+        _total = sum(_statistics.values())
+        log.info(
+            "Deployment '%s': %d of %d devices finished" % (name, _finished, _total)
+        )
+        return _total > 0 and _finished == _total
+
+    return _condition
+
+
+def selenium_ready():
+    try:
+        _r = requests.get("http://localhost:4444/wd/hub/status", timeout=5)
+        return _r.ok and _r.json()["value"]["ready"]
+    except (requests.exceptions.RequestException, ValueError, KeyError):
+        return False
+
+
+def open_browser():
+    # make sure that chrome container is not running
+    subprocess.run(["docker", "rm", "-f", "chrome_container"], capture_output=True)
+    # start container with chrome browser
+    subprocess.run(
+        [
+            "docker",
+            "run",
+            "--rm",
+            "--name",
+            "chrome_container",
+            "-p",
+            "4444:4444",
+            "-d",
+            "selenium/standalone-chrome",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    try:
+        orchestration.wait_until(selenium_ready, 60, 1, "selenium")
+        # using selenium webdriver login and keep browser open for 10 mins
+        subprocess.run([sys.executable, "selenium_login_to_ui_and_sleep.py"])
+    finally:
+        subprocess.run(["docker", "rm", "-f", "chrome_container"], capture_output=True)
+
+
+def ui_session():
+    """
+    A user in the UI: a browser left idle after logging in, or users browsing
+    the devices list emulated with API calls, as set by the [ui] of the scenario
+    """
+    _ui = scenario.ui
+    if _ui.get("mode", "browser") == "browser":
+        open_browser()
+        return
+    gui.GuiEmulator(
+        conf.username,
+        conf.password,
+        server_url,
+        users=_ui.get("users", 1),
+        page_size=_ui.get("page_size", 50),
+        think_time=(_ui.get("think_min", 2), _ui.get("think_max", 10)),
+        seed=_ui.get("seed"),
+    ).run(duration=_ui.get("duration", 600))
+
+
+def ui_phase(name):
+    def _action():
+        ui_session()
+        create_deployment(name)
+        ui_session()
+        ui_session()
+        ui_session()
+
+    return _action
+
+
+def step_phases(index, start_count, deployment_name):
+    _expected = scenario.expected_devices(index)
+    return scenario.phases(
+        actions={
+            "start_clients": lambda: start_fake_clients(
+                start_count, scenario.devices_qty(index)
+            ),
+            "deploy": lambda: create_deployment(deployment_name),
+            "ui": ui_phase(deployment_name + "_ui"),
+        },
+        conditions={
+            "devices_started": devices_reached(_expected, "pending", "accepted"),
+            "devices_accepted": accept_until(_expected),
+            "deployment_finished": deployment_finished(deployment_name),
+            "ui_deployment_finished": deployment_finished(deployment_name + "_ui"),
+        },
+        workloads=workloads,
+        interval=conf.poll_interval,
+    )
+
+
+def first_step(orchestrator):
+    """
+    :return: 'tuple' index of the step and sequence number of the instance to
+             start with, from the options or else from the state file
+    """
+    if conf.devices_index is not None or conf.start_count is not None:
+        return (
+            conf.devices_index or 0,
+            1 if conf.start_count is None else conf.start_count,
+        )
+    _last = orchestrator.state.last_step()
+    if _last is None:
+        return 0, 1
+    _index, _step = _last
+    if _step["finished"]:
+        return _index + 1, _step["start_count"] + 1
+    return _index, _step["start_count"]
+
+
+if __name__ == "__main__":
+    conf = get_config()
+    ratelimit.configure_from_args(conf)
+    scenario = scenario_lib.Scenario.load(conf.scenario)
+    server_url = "https://" + conf.url
+    # the scripts run by the phases read the URL with the scheme
+    os.environ["URL"] = server_url
+    mender.authenticate(
+        email=conf.username, password=conf.password, server_url=server_url
+    )
+
+    orchestrator = orchestration.Orchestrator(conf.state_file)
+    index, start_count = first_step(orchestrator)
+    log.info(
+        "Scenario '%s': starting at step %d with instance %d"
+        % (scenario.name, index, start_count)
+    )
+    try:
+        while index < scenario.steps:
+            # kept in the state file to wait for the same deployment on resume
+            deployment_name = orchestrator.state.step(index).get(
+                "deployment_name", "depl_name_%d_%d" % (index, randint(1000, 9999))
+            )
+            orchestrator.run_step(
+                index,
+                step_phases(index, start_count, deployment_name),
+                deployment_name=deployment_name,
+                start_count=start_count,
+                devices_qty=scenario.devices_qty(index),
+                expected_devices=scenario.expected_devices(index),
+            )
+            index += 1
+            start_count += 1
+    except KeyboardInterrupt:
+        log.info("Interrupted, run again to resume from the state file")
+    finally:
+        orchestrator.log_durations()
+
+    failures = scenario_lib.check_thresholds(scenario.thresholds, stats.statistics)
+    for failure in failures:
+        log.error("Threshold exceeded: %s" % failure)
+    log.info("Execution finished.")
+    if failures:
+        exit(1)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+import configargparse
+import logging
+
+import mender
+
+from mender import identity
+from mender import ratelimit
+from mender import seeding
+
+
+def parse_config():
+    parser = configargparse.ArgumentParser()
+    parser.add_argument(
+        "--username", type=str, required=True, env_var="USERNAME", help="Username"
+    )
+    parser.add_argument(
+        "--password", type=str, required=True, env_var="PASSWORD", help="Password"
+    )
+    parser.add_argument(
+        "--url",
+        type=str,
+        required=True,
+        env_var="URL",
+        help="URL of the Mender server",
+    )
+    parser.add_argument(
+        "--keys",
+        type=str,
+        required=True,
+        env_var="KEYSTORE",
+        help="Key store file or directory with the private keys of the devices",
+    )
+    parser.add_argument(
+        "--devices-qty",
+        type=int,
+        required=True,
+        env_var="DEVICES_QTY",
+        help="Number of devices to preauthorize",
+    )
+    parser.add_argument(
+        "--start-count",
+        type=int,
+        required=False,
+        default=0,
+        env_var="START_COUNT",
+        help="Sequence number of the first instance of stress clients",
+    )
+    parser.add_argument(
+        "--devices-per-instance",
+        type=int,
+        required=False,
+        default=identity.DEVICES_PER_INSTANCE,
+        env_var="DEVICES_PER_INSTANCE",
+        help="Number of device identities reserved for each instance",
+    )
+    parser.add_argument(
+        "--identity-fields",
+        type=str,
+        required=False,
+        default=",".join(identity.DEFAULT_FIELDS),
+        env_var="IDENTITY_FIELDS",
+        help="Identity attributes of the devices, among mac, sku and sn",
+    )
+    parser.add_argument(
+        "--identity-sku",
+        type=str,
+        required=False,
+        default=identity.DEFAULT_SKU,
+        env_var="IDENTITY_SKU",
+        help="Value of the sku identity attribute",
+    )
+    parser.add_argument(
+        "--identity-layout",
+        type=str,
+        required=False,
+        default="sequential",
+        choices=identity.LAYOUTS,
+        env_var="IDENTITY_LAYOUT",
+        help="MAC addresses of the devices, see the predefined filters",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        required=False,
+        default=32,
+        env_var="PREAUTHORIZE_WORKERS",
+        help="Devices preauthorized at the same time",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        required=False,
+        default=0,
+        env_var="PREAUTHORIZE_PROCESSES",
+        help="Processes reading the keys, 0 for one per CPU core",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        required=False,
+        default=None,
+        env_var="CHECKPOINT_FILE",
+        help="File keeping the progress, to resume an interrupted run",
+    )
+    ratelimit.add_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    conf = parse_config()
+
+    logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+    logging.basicConfig(format=logs_format, level=logging.INFO)
+    log = logging.getLogger()
+
+    ratelimit.configure_from_args(conf)
+    mender.authenticate(
+        email=conf.username, password=conf.password, server_url=conf.url
+    )
+
+    start_index = conf.start_count * conf.devices_per_instance
+    log.info(
+        "Preauthorizing devices %d..%d" % (start_index, start_index + conf.devices_qty)
+    )
+    report = seeding.PreauthSeeder(
+        mender.dev_auth,
+        conf.keys,
+        start_index,
+        conf.devices_qty,
+        identity_fields=identity.parse_fields(conf.identity_fields),
+        identity_sku=conf.identity_sku,
+        layout=identity.get_layout(conf.identity_layout, conf.devices_per_instance),
+        workers=conf.workers,
+        processes=conf.processes or None,
+        checkpoint=conf.checkpoint,
+    ).run()
+    report.log()
+    if report.failed > 0:
+        exit(1)
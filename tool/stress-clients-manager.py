@@ -21,6 +21,8 @@ from time import strftime
 
 from boto3 import session
 
+from mender import identity
+
 
 logs_format = "[%(asctime)s] [%(levelname)-8s] %(message)s"
 logging.basicConfig(format=logs_format, level=logging.INFO)
@@ -174,6 +176,11 @@ aws_ssh_key_name = ""
 tenant_key = ""
 start_count = 0
 devices_qty = 1
+layout = None
+stress_test_client_wait = 30
+current_artifact = "base-image-1019"
+current_device = "cl-som-imx8"
+inventory = "device_type:cl-som-imx8,image_id:base-image-1019"
 
 user_data_template = """#!/bin/bash
 set -e
@@ -188,10 +195,47 @@ wget -O $FILE_NAME "{download_url}"
 tar -zxf $FILE_NAME
 mv $(echo $FILE_NAME | sed 's/\\.tgz//g') /keys
 docker run -d -v /keys:/keys {image} -count {count} -startup-interval {start_interval} -backend {server_url} \
-    -invfreq {inventory_interval} -pollfreq {poll_interval} -wait 30 -current_artifact base-image-1019 \
-    -current_device cl-som-imx8 -inventory device_type:cl-som-imx8,image_id:base-image-1019 -tenant {tenant_key}
+    -invfreq {inventory_interval} -pollfreq {poll_interval} -wait {wait} -current_artifact {current_artifact} \
+    -current_device {current_device} -inventory {inventory} -tenant {tenant_key}
 """
-# TODO: make the following options configurable: wait, current_artifact, current_device and inventory
+
+
+def get_inventory(count):
+    """
+    Inventory of the stress clients of an instance, with the layout of the
+    predefined filters all of them are in the group of the instance
+    :param count: 'int' sequence number of the instance
+    """
+    if layout is None:
+        return inventory
+    return "%s,device_group:%s" % (
+        inventory,
+        layout.instance(count)["device_group"],
+    )
+
+
+def layout_error(count, qty=None):
+    """
+    :param count: 'int' sequence number of the instance
+    :param qty: 'int' number of stress clients of the instance, None to check
+                only the sequence number
+    :return: 'string' why the instance doesn't fit the identity layout, None
+             if it does
+    """
+    if layout is None:
+        return None
+    if qty is not None and qty != layout.devices_per_instance:
+        return (
+            "the identity layout needs %d stress clients per instance, not %d, "
+            "see --devices-per-instance" % (layout.devices_per_instance, qty)
+        )
+    if count >= layout.instances:
+        return "the identity layout has %d instances (0..%d), not %d" % (
+            layout.instances,
+            layout.instances - 1,
+            count,
+        )
+    return None
 
 
 def terminate_instances(instances_list_to_delete_file, aws_ec2_region):
@@ -233,6 +277,10 @@ def start_instances_in_non_interactive_session():
         server_url=server_url,
         inventory_interval=stress_test_client_inventory_freq,
         poll_interval=stress_test_client_poll_interval_freq,
+        wait=stress_test_client_wait,
+        current_artifact=current_artifact,
+        current_device=current_device,
+        inventory=get_inventory(count),
         tenant_key=tenant_key,
     )
 
@@ -274,6 +322,10 @@ def start_interactive_session():
                 if command != "":
                     log.warning(e)
                 continue
+            _error = layout_error(count, devices_qty)
+            if _error is not None:
+                log.warning(_error)
+                continue
 
             log.info("Starting instance with '%s' stress clients." % devices_qty)
 
@@ -292,6 +344,10 @@ def start_interactive_session():
                 server_url=server_url,
                 inventory_interval=stress_test_client_inventory_freq,
                 poll_interval=stress_test_client_poll_interval_freq,
+                wait=stress_test_client_wait,
+                current_artifact=current_artifact,
+                current_device=current_device,
+                inventory=get_inventory(count),
                 tenant_key=tenant_key,
             )
 
@@ -366,6 +422,38 @@ def get_config():
         help="Poll interval.",
         env_var="STRESS_TEST_CLIENT_POLL_INTERVAL_FREQ",
     )
+    parser.add_argument(
+        "--wait",
+        type=int,
+        required=False,
+        default=stress_test_client_wait,
+        help="Max seconds to wait between the steps of a deployment.",
+        env_var="STRESS_TEST_CLIENT_WAIT",
+    )
+    parser.add_argument(
+        "--current-artifact",
+        type=str,
+        required=False,
+        default=current_artifact,
+        help="Artifact name reported by the stress test clients.",
+        env_var="STRESS_TEST_CLIENT_CURRENT_ARTIFACT",
+    )
+    parser.add_argument(
+        "--current-device",
+        type=str,
+        required=False,
+        default=current_device,
+        help="Device type reported by the stress test clients.",
+        env_var="STRESS_TEST_CLIENT_CURRENT_DEVICE",
+    )
+    parser.add_argument(
+        "--inventory",
+        type=str,
+        required=False,
+        default=inventory,
+        help="Inventory attributes of the stress test clients, as key:value,...",
+        env_var="STRESS_TEST_CLIENT_INVENTORY",
+    )
     parser.add_argument(
         "--aws-instance-type",
         type=str,
@@ -454,6 +542,24 @@ def get_config():
         help="Number of devices to start.",
         env_var="DEVICES_QTY",
     )
+    parser.add_argument(
+        "--identity-layout",
+        type=str,
+        required=False,
+        default="sequential",
+        choices=identity.LAYOUTS,
+        help="Puts the stress clients of every instance in the device group of "
+        "the predefined filters.",
+        env_var="IDENTITY_LAYOUT",
+    )
+    parser.add_argument(
+        "--devices-per-instance",
+        type=int,
+        required=False,
+        default=identity.DEVICES_PER_INSTANCE,
+        help="Number of devices of an instance in the identity layout.",
+        env_var="DEVICES_PER_INSTANCE",
+    )
     parser.add_argument(
         "--non-interactive-mode",
         type=bool,
@@ -481,6 +587,11 @@ def process_config(config):
     global tenant_key
     global start_count
     global devices_qty
+    global layout
+    global stress_test_client_wait
+    global current_artifact
+    global current_device
+    global inventory
 
     stress_test_client_image = config.stress_test_client_image
     stress_test_client_startup_interval = config.stress_test_client_startup_interval
@@ -497,10 +608,29 @@ def process_config(config):
     tenant_key = config.tenant_key
     start_count = config.start_count
     devices_qty = config.devices_qty
+    stress_test_client_wait = config.wait
+    current_artifact = config.current_artifact
+    current_device = config.current_device
+    inventory = config.inventory
+    try:
+        layout = identity.get_layout(
+            config.identity_layout, config.devices_per_instance
+        )
+    except ValueError as e:
+        log.error(e)
+        exit(1)
 
     if start_count is None:
         start_count = 0
 
+    # the quantity of the interactive session is checked for every instance
+    _error = layout_error(
+        start_count, devices_qty if config.non_interactive_mode else None
+    )
+    if _error is not None:
+        log.error(_error)
+        exit(1)
+
 
 if __name__ == "__main__":
     conf = get_config()
@@ -19,6 +19,8 @@ import mender
 import json
 import sys
 
+from mender import identity
+
 import urllib3
 
 urllib3.disable_warnings()
@@ -38,131 +40,18 @@ if username is None or password is None or base_url is None:
 
 
 def create_all_filters():
-    for mac_prefix in ["ff", "ee", "dd", "cc"]:
-        # 4 groups of 12500 devices
-        filter_group1_mac_prefix = {
-            "name": "12.5k_group1_mac_" + mac_prefix,
-            "terms": [
-                {
-                    "attribute": "device_group",
-                    "scope": "inventory",
-                    "type": "$eq",
-                    "value": "group1",
-                },
-                {
-                    "attribute": "mac",
-                    "scope": "identity",
-                    "type": "$regex",
-                    "value": mac_prefix + ":00:00:.*",
-                },
-            ],
-        }
-        mender.inventory_v2.post_filter(filter_group1_mac_prefix)
-
-    for mac_prefix in ["ff", "ee", "dd", "cc"]:
-        # 4 groups of 25000 devices
-        filter_group23_mac_prefix = {
-            "name": "25k_group23_mac_" + mac_prefix,
-            "terms": [
-                {
-                    "attribute": "device_group",
-                    "scope": "inventory",
-                    "type": "$in",
-                    "value": ["group2", "group3"],
-                },
-                {
-                    "attribute": "mac",
-                    "scope": "identity",
-                    "type": "$regex",
-                    "value": mac_prefix + ":00:00:.*",
-                },
-            ],
-        }
-        mender.inventory_v2.post_filter(filter_group23_mac_prefix)
-
-    for mac_prefix in ["bb", "aa", "99", "88"]:
-        # 4 groups of 37500 devices
-        filter_group23_mac_prefix = {
-            "name": "37.5k_group23_mac_" + mac_prefix,
-            "terms": [
-                {
-                    "attribute": "device_group",
-                    "scope": "inventory",
-                    "type": "$in",
-                    "value": ["group1", "group2", "group3"],
-                },
-                {
-                    "attribute": "mac",
-                    "scope": "identity",
-                    "type": "$regex",
-                    "value": mac_prefix + ":00:00:.*",
-                },
-            ],
-        }
-        mender.inventory_v2.post_filter(filter_group23_mac_prefix)
-
-    for mac_prefix in ["ff", "ee", "dd", "cc"]:
-        # 4 groups of 50000 devices
-        filter_group4567_mac_prefix = {
-            "name": "50k_group4567_mac_" + mac_prefix,
-            "terms": [
-                {
-                    "attribute": "device_group",
-                    "scope": "inventory",
-                    "type": "$in",
-                    "value": ["group4", "group5", "group6", "group7"],
-                },
-                {
-                    "attribute": "mac",
-                    "scope": "identity",
-                    "type": "$regex",
-                    "value": mac_prefix + ":00:00:.*",
-                },
-            ],
-        }
-        mender.inventory_v2.post_filter(filter_group4567_mac_prefix)
-
-    for mac_prefix in ["bb", "aa", "99", "88"]:
-        # 4 groups of 75000 devices
-        filter_group4567_mac_prefix = {
-            "name": "75k_group4567_mac_" + mac_prefix,
-            "terms": [
-                {
-                    "attribute": "device_group",
-                    "scope": "inventory",
-                    "type": "$in",
-                    "value": [
-                        "group4",
-                        "group5",
-                        "group6",
-                        "group7",
-                        "group8",
-                        "group9",
-                    ],
-                },
-                {
-                    "attribute": "mac",
-                    "scope": "identity",
-                    "type": "$regex",
-                    "value": mac_prefix + ":00:00:.*",
-                },
-            ],
-        }
-        mender.inventory_v2.post_filter(filter_group4567_mac_prefix)
-
-    # 1 group of 100000 devices
-    filter_group8_100k = {
-        "name": "100k_group10",
-        "terms": [
-            {
-                "attribute": "device_group",
-                "scope": "inventory",
-                "type": "$eq",
-                "value": "group10",
-            }
-        ],
-    }
-    mender.inventory_v2.post_filter(filter_group8_100k)
+    # the filters are sized for the devices laid out by mender.identity, check
+    # that the sizes in their names still hold before creating them
+    identity.FiltersLayout().validate()
+    _failed = []
+    for spec in identity.PREDEFINED_FILTERS:
+        for mac_prefix in spec.prefixes():
+            _filter = spec.to_filter(mac_prefix)
+            if mender.inventory_v2.post_filter(_filter) is None:
+                _failed.append(_filter["name"])
+    if _failed:
+        log.error("failed to create %d filters: %s" % (len(_failed), _failed))
+    return not _failed
 
 
 def delete_all_filters():
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import os
+import sys
+
+import pytest
+
+# the tests import the mender module of the tool directory, as the scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MENDER_STATS_REPORT", "false")
+
+from mender import mock_server  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    """
+    Mock Mender server running in the background, with an empty state
+    """
+    _server = mock_server.MockServer(mock_server.MockState())
+    _server.url = _server.start()
+    yield _server
+    _server.stop()
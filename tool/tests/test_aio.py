@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import asyncio
+import gc
+import warnings
+
+import pytest
+
+from mender.aio import common
+
+
+@pytest.fixture
+def session():
+    yield
+    asyncio.run(common.close_session())
+
+
+def test_session_of_a_previous_loop_is_closed(server, session):
+    _url = "%s/api/management/v2/devauth/devices" % server.url
+
+    async def _call():
+        _status, _ = await common.do_raw_call("GET", _url)
+        return _status, common.get_session()
+
+    with warnings.catch_warnings(record=True) as _warnings:
+        warnings.simplefilter("always")
+        _status, _first = asyncio.run(_call())
+        assert _status == 401
+        assert not _first.closed
+        # a new event loop gets its own session, the previous one is closed
+        _status, _second = asyncio.run(_call())
+        assert _status == 401
+        assert _second is not _first
+        assert _first.closed and not _second.closed
+        del _first
+        gc.collect()
+    assert not [_w for _w in _warnings if "Unclosed client session" in str(_w.message)]
+
+
+def test_concurrency_of_an_open_session(session):
+    async def _open():
+        common.get_session()
+        with pytest.raises(RuntimeError):
+            common.set_concurrency(10)
+        await common.close_session()
+        common.set_concurrency(10)
+
+    asyncio.run(_open())
+    assert common.concurrency == 10
+    common.set_concurrency(500)
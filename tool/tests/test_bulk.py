@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import pytest
+
+from mender import bulk
+from mender.device_authentication import DeviceAuthentication
+from mender.inventory import Inventory
+from mender.user_administration import UserAdministration
+
+
+@pytest.fixture
+def user_adm(server):
+    return UserAdministration("user", "password", server_url=server.url)
+
+
+@pytest.fixture
+def dev_auth(user_adm):
+    return DeviceAuthentication(user_adm=user_adm)
+
+
+def test_batches():
+    assert list(bulk.batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(bulk.batches([], 2)) == []
+
+
+def test_accept_all_pending_devices(server, dev_auth):
+    # several pages of pending devices, read again while they are accepted
+    server.state.seed(1000, status="pending")
+    _report = bulk.BulkAccept(dev_auth, workers=8, page_size=100).run()
+    assert (_report.done, _report.skipped, _report.failed) == (1000, 0, 0)
+    assert not server.state.by_status["pending"]
+    assert len(server.state.by_status["accepted"]) == 1000
+
+
+def test_accept_with_limit(server, dev_auth):
+    server.state.seed(500, status="pending")
+    _report = bulk.BulkAccept(dev_auth, workers=4, page_size=100).run(limit=120)
+    assert _report.done == 120
+    assert len(server.state.by_status["pending"]) == 380
+
+
+def test_failed_accepts_are_not_retried_forever(server, dev_auth):
+    server.state.seed(300, status="pending")
+    _broken = set(list(server.state.by_status["pending"])[:10])
+
+    def _fault(request):
+        if request.method == "PUT" and request.match_info.get("id") in _broken:
+            return 500
+        return None
+
+    server.fault = _fault
+    _report = bulk.BulkAccept(
+        dev_auth, workers=8, page_size=50, retries=1, backoff=0.01
+    ).run()
+    assert (_report.done, _report.failed, _report.retried) == (290, 10, 10)
+    assert set(server.state.by_status["pending"]) == _broken
+
+
+def _group_calls(calls, status=None):
+    """
+    :return: function(request) counting the PATCH calls of the groups, failing
+             them with 'status' when given
+    """
+
+    def _fault(request):
+        if request.method == "PATCH":
+            calls.append(request)
+            return status
+        return None
+
+    return _fault
+
+
+def test_group_assignment_in_batches(server, user_adm):
+    server.state.seed(2500)
+    _calls = []
+    server.fault = _group_calls(_calls)
+    # the ids are consumed lazily, unknown ones are not matched
+    _ids = (_id for _id in list(server.state.devices) + ["unknown-1", "unknown-2"])
+    _report = Inventory(user_adm=user_adm).add_devices_to_group(
+        "stress", _ids, batch_size=1000, concurrency=2
+    )
+    assert (_report.done, _report.skipped, _report.failed) == (2500, 2, 0)
+    assert len(_calls) == 3
+    assert len(server.state.groups["stress"]) == 2500
+
+
+def test_failed_group_assignment(server, user_adm):
+    server.state.seed(300)
+    _calls = []
+    server.fault = _group_calls(_calls, status=500)
+    _report = Inventory(user_adm=user_adm).add_devices_to_group(
+        "stress", list(server.state.devices), batch_size=100
+    )
+    assert (_report.done, _report.failed) == (0, 300)
+    assert len(_calls) == 3
+    assert "stress" not in server.state.groups
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import pytest
+
+from mender import forecast
+from mender import stats
+
+
+DEVICES = 100000
+WEEK = 604800
+
+
+def _fleet(**kwargs):
+    _options = dict(
+        startup_interval=1800,
+        poll_interval=1800,
+        inventory_interval=28800,
+        token_lifetime=WEEK,
+    )
+    _options.update(kwargs)
+    return forecast.LoadForecast(DEVICES, **_options)
+
+
+def _rates(report):
+    return {
+        _name: report["endpoints"][_key] for _name, _key in forecast.ENDPOINTS.items()
+    }
+
+
+def test_steady_rates():
+    _report = _fleet().report()
+    _rates_ = _rates(_report)
+    # polls, plus the poll sent again after every token renewal
+    assert _rates_["next"]["steady_rps"] == pytest.approx(
+        DEVICES / 1800.0 + DEVICES / WEEK, abs=1e-3
+    )
+    assert _rates_["inventory"]["steady_rps"] == pytest.approx(
+        DEVICES / 28800.0, abs=1e-3
+    )
+    assert _rates_["auth"]["steady_rps"] == pytest.approx(DEVICES / WEEK, abs=1e-3)
+    assert _rates_["status"]["steady_rps"] == 0
+    assert _report["steady_after"] == 1800
+
+
+def test_peaks():
+    _report = _fleet().report()
+    _rates_ = _rates(_report)
+    # every device authenticates and sends its inventory once over the startup
+    assert _rates_["auth"]["peak_rps"] == pytest.approx(DEVICES / 1800.0, abs=1e-3)
+    assert _rates_["inventory"]["peak_rps"] == pytest.approx(DEVICES / 1800.0, abs=1e-3)
+    # the polls double while the whole fleet renews its tokens
+    assert _rates_["next"]["peak_rps"] == pytest.approx(2 * DEVICES / 1800.0, abs=1e-3)
+    assert _rates_["next"]["peak_at"] == WEEK
+
+
+def test_renew_interval_is_a_multiple_of_the_poll():
+    assert _fleet(token_lifetime=3600).renew_interval == 3600
+    assert _fleet(token_lifetime=3601).renew_interval == 5400
+
+
+def test_burst_start_is_spread_over_the_window():
+    _report = _fleet(startup_interval=0, window=1).report()
+    assert _rates(_report)["auth"]["peak_rps"] == DEVICES
+
+
+def test_pending_devices_retry_auth():
+    _load = _fleet(accept_delay=300, auth_retry=60)
+    # the first auth request and one every minute until accepted
+    assert _load.calls(3600)["auth"] == pytest.approx(6 * DEVICES)
+    assert _load.steady_after == 2100
+
+
+def test_expected_calls():
+    _calls = _fleet().calls(3600)
+    assert _calls["next"] == pytest.approx(2 * DEVICES)
+    assert _calls["inventory"] == pytest.approx(DEVICES)
+    assert _calls["auth"] == pytest.approx(DEVICES)
+    assert _fleet().calls(900)["auth"] == pytest.approx(DEVICES / 2)
+
+
+def test_deployment():
+    _load = _fleet(deployment_devices=1000, wait=30)
+    _calls = _load.calls(10 * 3600)
+    assert _calls["status"] == pytest.approx(4 * 1000)
+    # picked up over the next poll interval, the last step after 4 * wait / 2
+    assert _load.deployment_end == pytest.approx(1800 + 1800 + 60)
+    assert _rates(_load.report())["status"]["peak_rps"] > 0
+
+
+def _statistics(calls, duration=3600):
+    _statistics = stats.Statistics()
+    _statistics.started = 0
+    _statistics.finished = duration
+    for _name, _count in calls.items():
+        _key = forecast.ENDPOINTS[_name]
+        _statistics.histograms[_key] = stats.Histogram()
+        _statistics.histograms[_key].record(1000, count=_count)
+    return _statistics
+
+
+def test_compare_matching_run():
+    _rows = forecast.compare(
+        _fleet(),
+        _statistics({"next": 2 * DEVICES, "inventory": DEVICES, "auth": DEVICES}),
+    )
+    assert not any(_row["short"] for _row in _rows)
+
+
+def test_compare_flags_short_endpoints():
+    _rows = forecast.compare(
+        _fleet(),
+        _statistics({"next": DEVICES, "inventory": DEVICES, "auth": DEVICES}),
+        tolerance=0.1,
+    )
+    _short = [_row["endpoint"] for _row in _rows if _row["short"]]
+    assert _short == [forecast.ENDPOINTS["next"]]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import pytest
+
+from mender import identity
+
+
+def test_predefined_filters_match_their_size():
+    _layout = identity.FiltersLayout()
+    _results = _layout.check()
+    assert len(_results) == 21
+    for _name, _size, _matched in _results:
+        assert _matched == _size, _name
+    _layout.validate()
+
+
+def test_layout_size_and_instances():
+    _layout = identity.FiltersLayout()
+    assert _layout.count == 900000
+    assert _layout.devices_per_instance == identity.DEVICES_PER_INSTANCE
+    assert _layout.instances == 144
+    assert sum(_block.count for _block in _layout.blocks) == _layout.count
+
+
+def test_blocks_are_contiguous_and_mac_addresses_unique():
+    _layout = identity.FiltersLayout()
+    _index = 0
+    _macs = set()
+    for _block in _layout.blocks:
+        assert _block.start_index == _index
+        _index += _block.count
+        for _device in (_block.start_index, _block.start_index + _block.count - 1):
+            assert _layout.device_group(_device) == _block.group
+            _mac = _layout.mac_address(_device)
+            assert _mac.startswith(_block.mac_prefix + ":00:00:")
+            assert _mac not in _macs
+            _macs.add(_mac)
+
+
+def test_instance_stays_in_one_block():
+    _layout = identity.FiltersLayout()
+    for _start_count in range(_layout.instances):
+        _instance = _layout.instance(_start_count)
+        _first = _instance["start_index"]
+        _last = _first + _instance["count"] - 1
+        assert _layout.block(_first) is _layout.block(_last)
+
+
+def test_devices_per_instance_must_divide_blocks():
+    with pytest.raises(ValueError):
+        identity.FiltersLayout(devices_per_instance=10000)
+
+
+def test_index_out_of_layout():
+    _layout = identity.FiltersLayout()
+    with pytest.raises(IndexError):
+        _layout.mac_address(_layout.count)
+
+
+def test_sequential_layout():
+    assert identity.get_layout("sequential") is None
+    assert isinstance(identity.get_layout("filters"), identity.FiltersLayout)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import pytest
+
+from mender import openloop
+from mender import scenario
+from mender import stats
+
+
+def _run(result, calls=20):
+    _statistics = stats.Statistics()
+    _engine = openloop.OpenLoop(1000, record=_statistics.record)
+    _engine.run(lambda _index: ("workload list", result), duration=calls / 1000.0)
+    return _engine, _statistics
+
+
+def test_arrival_times():
+    assert list(openloop.arrival_times(4, duration=1)) == [0, 0.25, 0.5, 0.75]
+    _poisson = list(openloop.arrival_times(1000, duration=10, distribution="poisson"))
+    assert len(_poisson) == pytest.approx(10000, rel=0.05)
+    with pytest.raises(ValueError):
+        next(openloop.arrival_times(0))
+
+
+@pytest.mark.parametrize(
+    "result, status",
+    [
+        ([{"id": "a"}], stats.STATUS_OK),
+        ({}, stats.STATUS_OK),
+        (None, stats.STATUS_FAILED),
+        (204, 204),
+        ((401, None), 401),
+    ],
+)
+def test_status_of(result, status):
+    assert openloop.status_of(result) == status
+
+
+def test_successful_workload_passes_thresholds():
+    _engine, _statistics = _run(lambda: [{"id": "a"}])
+    assert _engine.failed == 0
+    assert _statistics.status_codes["workload list"] == {"200": _engine.sent}
+    _thresholds = {"workload list": {"error_rate": 0.01, "min_count": 10}}
+    assert scenario.check_thresholds(_thresholds, _statistics) == []
+
+
+def test_failed_workload_exceeds_thresholds():
+    def _raise():
+        raise RuntimeError("connection reset")
+
+    _thresholds = {"workload list": {"error_rate": 0.01}}
+    for _call in (lambda: None, _raise):
+        _engine, _statistics = _run(_call)
+        assert _engine.failed == _engine.sent
+        assert scenario.check_thresholds(_thresholds, _statistics) == [
+            "workload list: error_rate 1.000 above 0.01"
+        ]
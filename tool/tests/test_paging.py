@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import pytest
+
+from mender.device_authentication import DeviceAuthentication
+from mender.paging import PagedFetcher, PagingError
+from mender.user_administration import UserAdministration
+
+
+def _listing(total, failed=(), duplicated=()):
+    """
+    :return: function(page, per_page) serving 'total' items, None for the
+             'failed' pages, and the first item again on the 'duplicated' ones
+    """
+
+    def _fetch_page(page, per_page):
+        if page in failed:
+            return None
+        _items = [
+            {"id": _index}
+            for _index in range((page - 1) * per_page, min(page * per_page, total))
+        ]
+        if page in duplicated and _items:
+            _items[-1] = {"id": 0}
+        return _items
+
+    return _fetch_page
+
+
+def test_pages_in_order():
+    _fetcher = PagedFetcher(_listing(1050), lambda: 1050, per_page=100, window=4)
+    _ids = [_item["id"] for _page in _fetcher for _item in _page]
+    assert _ids == list(range(1050))
+    assert _fetcher.pages == 11
+    assert _fetcher.consistent
+
+
+def test_duplicates_are_dropped():
+    _fetcher = PagedFetcher(
+        _listing(300, duplicated=(2,)), lambda: 300, per_page=100, window=2
+    )
+    _ids = [_item["id"] for _page in _fetcher for _item in _page]
+    assert len(_ids) == len(set(_ids)) == 299
+    assert _fetcher.duplicates == 1
+    assert not _fetcher.consistent
+
+
+def test_failed_page_raises():
+    _fetcher = PagedFetcher(_listing(500, failed=(3,)), lambda: 500, per_page=100)
+    with pytest.raises(PagingError):
+        list(_fetcher)
+    assert _fetcher.failed_pages == [3]
+
+
+def test_failed_count_raises():
+    _fetcher = PagedFetcher(_listing(500), lambda: None, per_page=100)
+    with pytest.raises(PagingError):
+        list(_fetcher)
+
+
+def test_failed_page_skipped_when_not_strict():
+    _fetcher = PagedFetcher(
+        _listing(500, failed=(3,)), lambda: 500, per_page=100, strict=False
+    )
+    _ids = [_item["id"] for _page in _fetcher for _item in _page]
+    assert len(_ids) == 400
+    assert _fetcher.failed_pages == [3]
+    assert _fetcher.missing == 100
+    assert not _fetcher.consistent
+
+
+def _failing_page(page):
+    def _fault(request):
+        if request.path.endswith("/devices") and request.query.get("page") == page:
+            return 500
+        return None
+
+    return _fault
+
+
+@pytest.fixture
+def dev_auth(server):
+    server.state.seed(5000, status="accepted")
+    return DeviceAuthentication(
+        user_adm=UserAdministration("user", "password", server_url=server.url)
+    )
+
+
+def test_listing_of_the_server(dev_auth):
+    assert len(dev_auth.get_all_devices(status="accepted")) == 5000
+
+
+def test_failed_page_of_the_server(server, dev_auth):
+    # a 500 is not retried, the page is lost
+    server.fault = _failing_page("3")
+    with pytest.raises(PagingError):
+        dev_auth.get_all_devices(status="accepted")
+    with pytest.raises(PagingError):
+        list(dev_auth.iter_devices(status="accepted"))
+
+    _fetcher = dev_auth.device_fetcher(status="accepted", strict=False)
+    _devices = [_device for _page in _fetcher for _device in _page]
+    assert len(_devices) == 4500
+    assert _fetcher.failed_pages == [3]
+    assert not _fetcher.consistent
+
+
+def test_failed_count_of_the_server(server, dev_auth):
+    server.fault = lambda request: (
+        500 if request.path.endswith("/devices/count") else None
+    )
+    assert dev_auth.get_devices_count(status="accepted") is None
+    with pytest.raises(PagingError):
+        dev_auth.get_all_devices(status="accepted")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import threading
+import time
+
+import pytest
+
+from mender import common
+from mender import ratelimit
+from mender import stats
+from mender.user_administration import UserAdministration
+
+
+def test_burst_then_paced():
+    _bucket = ratelimit.TokenBucket(10, burst=3)
+    assert [_bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    # callers are given their turn one after the other
+    _delays = [_bucket.reserve() for _ in range(3)]
+    assert _delays == pytest.approx([0.1, 0.2, 0.3], abs=0.01)
+
+
+def test_default_burst():
+    assert ratelimit.TokenBucket(20).burst == 20
+    assert ratelimit.TokenBucket(0.5).burst == 1
+
+
+def test_acquire_blocks_at_the_rate():
+    _bucket = ratelimit.TokenBucket(50, burst=1)
+    _start = time.monotonic()
+    for _ in range(26):
+        _bucket.acquire()
+    assert time.monotonic() - _start == pytest.approx(0.5, abs=0.1)
+
+
+def test_rate_shared_between_threads():
+    _bucket = ratelimit.TokenBucket(100, burst=1)
+
+    def _calls():
+        for _ in range(10):
+            _bucket.acquire()
+
+    _threads = [threading.Thread(target=_calls) for _ in range(4)]
+    _start = time.monotonic()
+    for _thread in _threads:
+        _thread.start()
+    for _thread in _threads:
+        _thread.join()
+    assert time.monotonic() - _start == pytest.approx(0.39, abs=0.1)
+
+
+def test_limiter_buckets():
+    assert not ratelimit.RateLimiter().enabled
+    assert ratelimit.RateLimiter().acquire("devauth") == 0
+    _limiter = ratelimit.RateLimiter(
+        rate=1000, service_rates={"devauth": 10, "inventory": None}, burst=1
+    )
+    assert _limiter.enabled
+    assert _limiter.reserve("devauth") == 0
+    assert _limiter.reserve("devauth") == pytest.approx(0.1, abs=0.01)
+    # other services only wait for the global bucket
+    assert _limiter.reserve("inventory") == pytest.approx(0.002, abs=0.001)
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("MENDER_RATE_LIMIT_DEVAUTH", "5")
+    monkeypatch.setenv("MENDER_RATE_LIMIT_BURST", "2")
+    _limiter = ratelimit.from_env()
+    assert _limiter._global is None
+    assert _limiter._services["devauth"].rate == 5
+    assert _limiter._services["devauth"].burst == 2
+
+
+@pytest.fixture
+def limited():
+    yield ratelimit.configure
+    ratelimit.configure()
+
+
+def test_calls_are_paced(server, limited):
+    server.state.seed(10)
+    _url = "%s/api/management/v2/devauth/devices" % server.url
+    _headers = UserAdministration("user", "password", server.url).get_auth_header()
+    limited(service_rates={"devauth": 40}, burst=1)
+    stats.statistics.reset()
+    _start = time.monotonic()
+    for _ in range(11):
+        assert common.do_get_call(_url, headers=_headers) is not None
+    assert time.monotonic() - _start >= 0.24
+    # the waits are counted apart from the latencies of the endpoints
+    assert list(stats.statistics.histograms) == ["devauth GET /devices"]
+    assert stats.statistics.counters["ratelimit throttled: devauth"] == 10
+    assert stats.statistics.counters["ratelimit wait ms: devauth"] <= 250
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import time
+
+from email.utils import formatdate
+
+import pytest
+
+from mender import common
+from mender import retry
+from mender.user_administration import UserAdministration
+
+
+FAST = retry.RetryPolicy(attempts=5, backoff=0.001, budget=10)
+
+
+def test_parse_retry_after():
+    assert retry.parse_retry_after("2") == 2.0
+    assert retry.parse_retry_after("-1") == 0.0
+    assert retry.parse_retry_after(formatdate(time.time() + 60)) == pytest.approx(
+        60, abs=2
+    )
+    assert retry.parse_retry_after("soon") is None
+    assert retry.parse_retry_after(None) is None
+
+
+def test_next_delay():
+    _policy = retry.RetryPolicy(attempts=3, backoff=1, max_backoff=2)
+    _started = time.monotonic()
+    assert 0 <= _policy.next_delay("GET", 1, _started) <= 1
+    assert 0 <= _policy.next_delay("GET", 2, _started) <= 2
+    assert _policy.next_delay("GET", 3, _started) is None
+    # Retry-After replaces the backoff
+    assert _policy.next_delay("GET", 1, _started, retry_after="1.5") == 1.5
+    # POST and PATCH only when told they can be repeated
+    assert _policy.next_delay("POST", 1, _started) is None
+    assert _policy.next_delay("POST", 1, _started, idempotent=True) is not None
+    # never beyond the budget of the call
+    assert retry.RetryPolicy(budget=1).next_delay("GET", 1, 0, retry_after="5") is None
+
+
+class _Failures:
+    """
+    Fails the first 'count' calls of the devices listing, counting the calls
+    """
+
+    def __init__(self, count, status, headers=None):
+        self.count = count
+        self.status = status
+        self.headers = headers
+        self.calls = 0
+
+    def __call__(self, request):
+        if not request.path.endswith("/devauth/devices"):
+            return None
+        self.calls += 1
+        if self.calls > self.count:
+            return None
+        return self.status, self.headers
+
+
+@pytest.fixture
+def devices_url(server):
+    server.state.seed(10)
+    return "%s/api/management/v2/devauth/devices" % server.url
+
+
+@pytest.fixture
+def headers(server):
+    return UserAdministration("user", "password", server.url).get_auth_header()
+
+
+@pytest.mark.parametrize("status", [429, 502, 503, 504])
+def test_transient_failures_are_retried(server, devices_url, headers, status):
+    server.fault = _Failures(2, status)
+    _devices = common.do_get_call(devices_url, headers=headers, retry=FAST)
+    assert len(_devices) == 10
+    assert server.fault.calls == 3
+
+
+def test_retry_after_is_honoured(server, devices_url, headers):
+    server.fault = _Failures(1, 429, {"Retry-After": "0.3"})
+    _start = time.monotonic()
+    assert common.do_get_call(devices_url, headers=headers, retry=FAST) is not None
+    assert time.monotonic() - _start >= 0.3
+    assert server.fault.calls == 2
+
+
+def test_gives_up_after_the_attempts(server, devices_url, headers):
+    server.fault = _Failures(10, 503)
+    assert common.do_get_call(devices_url, headers=headers, retry=FAST) is None
+    assert server.fault.calls == 5
+
+
+def test_other_failures_are_not_retried(server, devices_url, headers):
+    server.fault = _Failures(1, 500)
+    assert common.do_get_call(devices_url, headers=headers, retry=FAST) is None
+    assert server.fault.calls == 1
+
+
+def test_post_is_retried_only_when_idempotent(server, devices_url, headers):
+    server.fault = _Failures(1, 503)
+    common.do_post_call(devices_url, headers=headers, retry=FAST)
+    assert server.fault.calls == 1
+    server.fault = _Failures(1, 503)
+    common.do_post_call(devices_url, headers=headers, retry=FAST, idempotent=True)
+    assert server.fault.calls == 2
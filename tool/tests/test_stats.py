@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import random
+
+import pytest
+
+from mender import stats
+
+
+def test_small_values_are_exact():
+    _histogram = stats.Histogram()
+    for _value in range(stats._SUB_BUCKETS):
+        _histogram.record(_value)
+    assert _histogram.percentile(100) == stats._SUB_BUCKETS - 1
+    assert _histogram.percentile(50) == stats._SUB_BUCKETS // 2 - 1
+    assert _histogram.min == 0
+
+
+def test_bucket_relative_error():
+    for _value in [1000, 4095, 4096, 123456, 10**7, 2**40 + 12345]:
+        _highest = stats._bucket_highest_value(stats._bucket_index(_value))
+        assert _value <= _highest
+        assert (_highest - _value) / _value < 2.0 / stats._SUB_BUCKETS
+
+
+def test_percentiles_within_one_percent():
+    _values = list(range(1, 100001))
+    random.Random(1).shuffle(_values)
+    _histogram = stats.Histogram()
+    for _value in _values:
+        _histogram.record(_value)
+    for _percentile in (50, 90, 99, 99.9):
+        _exact = _percentile / 100.0 * len(_values)
+        assert _histogram.percentile(_percentile) == pytest.approx(_exact, rel=0.01)
+    assert _histogram.percentile(100) == 100000
+    assert _histogram.mean() == pytest.approx(50000.5)
+
+
+def test_percentile_never_above_max():
+    _histogram = stats.Histogram()
+    _histogram.record(100001)
+    assert _histogram.percentile(50) == 100001
+
+
+def test_empty_histogram():
+    _histogram = stats.Histogram()
+    assert _histogram.percentile(99) == 0
+    assert _histogram.mean() == 0
+
+
+def test_merge_is_recording_together():
+    _first, _second, _both = stats.Histogram(), stats.Histogram(), stats.Histogram()
+    _random = random.Random(2)
+    for _ in range(1000):
+        _value = _random.expovariate(1 / 5000.0)
+        (_first if _random.random() < 0.5 else _second).record(_value)
+        _both.record(_value)
+    _first.merge(_second)
+    assert _first.to_dict() == _both.to_dict()
+
+
+def test_statistics_round_trip(tmp_path):
+    _statistics = stats.Statistics()
+    _statistics.record("devauth GET /devices", 0.120, 200)
+    _statistics.record("devauth GET /devices", 0.250, 500)
+    _statistics.increment("accept.accepted", 3)
+    _file = str(tmp_path / "stats.json")
+    _statistics.save(_file)
+    _loaded = stats.Statistics.load(_file)
+    _histogram = _loaded.histograms["devauth GET /devices"]
+    assert _histogram.count == 2
+    assert _histogram.max == 250000
+    assert _loaded.status_codes["devauth GET /devices"] == {"200": 1, "500": 1}
+    assert _loaded.counters == {"accept.accepted": 3}
+
+
+def test_precision_mismatch():
+    _data = stats.Histogram().to_dict()
+    _data["sub_bucket_bits"] = stats.SUB_BUCKET_BITS + 1
+    with pytest.raises(ValueError):
+        stats.Histogram.from_dict(_data)
+
+
+@pytest.mark.parametrize(
+    "method,path,key",
+    [
+        (
+            "PUT",
+            "/api/management/v2/devauth/devices/abc/auth/def/status",
+            "devauth PUT /devices/{id}/auth/{id}/status",
+        ),
+        (
+            "GET",
+            "/api/management/v1/deployments/deployments/abc/statistics",
+            "deployments GET /deployments/{id}/statistics",
+        ),
+        (
+            "GET",
+            "/api/devices/v1/deployments/device/deployments/next",
+            "deployments GET /device/deployments/next",
+        ),
+        (
+            "PATCH",
+            "/api/management/v1/inventory/groups/group1/devices",
+            "inventory PATCH /groups/{name}/devices",
+        ),
+    ],
+)
+def test_route_key(method, path, key):
+    assert stats.route_key(method, "https://mender.example.com" + path) == key
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import base64
+import json
+import threading
+import time
+
+import pytest
+
+from mender import common
+from mender import stats
+from mender import user_administration
+from mender.user_administration import UserAdministration
+
+
+def _jwt(payload):
+    _part = base64.urlsafe_b64encode(json.dumps(payload).encode()).rstrip(b"=")
+    return "e30.%s.signature" % _part.decode()
+
+
+def test_token_expiry():
+    assert user_administration.token_expiry(_jwt({"exp": 1700000000})) == 1700000000
+    assert user_administration.token_expiry(_jwt({"sub": "user"})) is None
+    assert user_administration.token_expiry("not a token") is None
+    assert user_administration.token_expiry(None) is None
+
+
+class _Logins:
+    """
+    Counts the logins, and the calls to the devices listing
+    """
+
+    def __init__(self):
+        self.logins = 0
+        self.calls = 0
+
+    def __call__(self, request):
+        if request.path.endswith("/auth/login"):
+            self.logins += 1
+        elif request.path.endswith("/devauth/devices"):
+            self.calls += 1
+        return None
+
+
+@pytest.fixture
+def logins(server):
+    server.state.seed(10)
+    server.fault = _Logins()
+    stats.statistics.reset()
+    return server.fault
+
+
+@pytest.fixture
+def user_adm(server):
+    return UserAdministration("user", "password", server_url=server.url)
+
+
+def _list_devices(server, user_adm):
+    _url = "%s/api/management/v2/devauth/devices" % server.url
+    return common.do_get_call(_url, headers=user_adm.get_auth_header())
+
+
+def test_token_is_cached_until_it_expires(server, logins, user_adm):
+    _header = user_adm.get_auth_header()
+    assert user_adm._expires_at == pytest.approx(time.time() + 3600, abs=5)
+    assert user_adm.get_auth_header() is _header
+    assert logins.logins == 1
+    # within the refresh margin of the "exp" claim: logs in again beforehand
+    user_adm._expires_at = time.time() + user_administration.refresh_margin - 1
+    assert user_adm.get_auth_header().token != _header.token
+    assert logins.logins == 2
+
+
+def test_single_login_for_concurrent_callers(server, logins, user_adm):
+    _headers = []
+    _threads = [
+        threading.Thread(target=lambda: _headers.append(user_adm.get_auth_header()))
+        for _ in range(16)
+    ]
+    for _thread in _threads:
+        _thread.start()
+    for _thread in _threads:
+        _thread.join()
+    assert logins.logins == 1
+    assert len({_header.token for _header in _headers}) == 1
+
+
+def test_rejected_token_is_renewed_once(server, logins, user_adm):
+    assert _list_devices(server, user_adm) is not None
+    # the server forgets the token before its expiration
+    server._user_tokens.clear()
+    assert len(_list_devices(server, user_adm)) == 10
+    assert (logins.logins, logins.calls) == (2, 3)
+    assert stats.statistics.counters["auth.renewed"] == 1
+    # the next calls use the renewed token
+    assert _list_devices(server, user_adm) is not None
+    assert logins.logins == 2
+
+
+def test_wrong_credentials_do_not_loop(server, logins, user_adm):
+    assert _list_devices(server, user_adm) is not None
+    server._user_tokens.clear()
+    server.username = "admin"
+    server.password = "secret"
+    # one renewal, whose login fails, and the call is given up
+    assert _list_devices(server, user_adm) is None
+    assert (logins.logins, logins.calls) == (2, 3)
+    assert stats.statistics.counters["auth.renewed"] == 1